@@ -0,0 +1,327 @@
+"""API HTTP assíncrona (ASGI) para os cálculos do mapa astral.
+
+Executar com::
+
+    uvicorn api:app --workers 1
+
+Endpoints (todos ``GET``, respostas JSON):
+
+- ``/location?q=São Paulo, Brasil``
+- ``/positions?jd=2451545.0`` ou ``?date=AAAA-MM-DD&time=HH:MM&timezone=...``
+- ``/houses?jd=...&lat=...&lon=...[&system=P]``
+- ``/chart?date=...&time=...&place=...`` (ou ``lat``/``lon``/``timezone``)
+- ``/health``
+- ``/metrics`` (texto do Prometheus; tempos medidos com ``ASTRO_METRICS=1``,
+  inclusive os do pool de processos)
+
+Na inicialização, ``ephe_manager.ensure_ephemeris`` confere (e baixa, se
+preciso) os arquivos de efemérides; se falhar, a aplicação não sobe.
+
+O cálculo de efemérides vai para um pool de processos, a geocodificação
+(I/O bloqueante) para threads, e o loop de eventos nunca bloqueia. Requisições
+idênticas simultâneas são agrupadas numa única execução e um semáforo limita
+quantos cálculos ficam em andamento.
+
+Parâmetros fora do domínio (latitude além de ±90°, dia juliano não finito
+ou fora do período das efemérides instaladas, sistema de casas fora de
+``houses.SYSTEMS``) retornam 400; erros do próprio Swiss Ephemeris, como
+Placidus dentro dos círculos polares, retornam 422.
+"""
+
+import asyncio
+import datetime
+import math
+import os
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Hashable, Optional, Tuple
+
+import swisseph as swe
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, PlainTextResponse
+from starlette.routing import Route
+
+from chart_cache import CHART_CACHE, chart_key
+from chart_model import Chart
+from ephe_manager import DEFAULT_YEARS, EphemerisError, ensure_ephemeris
+from ephemeris import EPHE_DIR, init_worker
+from houses import SYSTEMS
+from instrumentation import is_enabled, record, render_prometheus, run_measured
+from utils import calculate_houses, calculate_julian_day, get_location_data, get_planet_positions
+
+MAX_CONCURRENCY = int(os.environ.get("CHART_API_MAX_CONCURRENCY", "32"))
+POOL_WORKERS = int(os.environ.get("CHART_API_WORKERS", "0")) or (os.cpu_count() or 1)
+# Período coberto pelos arquivos de efemérides que o processo instala
+JD_MIN = swe.julday(DEFAULT_YEARS[0], 1, 1, 0.0)
+JD_MAX = swe.julday(DEFAULT_YEARS[1] + 1, 1, 1, 0.0)
+
+
+class BadRequest(ValueError):
+    """Parâmetro ausente ou inválido na requisição."""
+
+
+def _houses_json(houses: Dict[str, Any]) -> Dict[str, Any]:
+    """Converte a tupla de cúspides em lista para serialização."""
+    return dict(houses, cusps=list(houses['cusps']))
+
+
+def compute_chart(jd: float, lat: float, lon: float, house_system: bytes) -> Chart:
+    """Posições e casas de um instante (executa nos workers).
+
+    O ``Chart`` volta do worker como buffer compacto e é guardado assim no
+    ``CHART_CACHE``, o mesmo formato que ``chart_cache.get_chart`` usa.
+    """
+    return Chart.compute(jd, lat, lon, house_system)
+
+
+def compute_houses(jd: float, lat: float, lon: float, house_system: bytes) -> Dict[str, Any]:
+    """Casas de um instante (executa nos workers)."""
+    return calculate_houses(jd, lat, lon, house_system)
+
+
+class ChartService:
+    """Pool de processos, agrupamento de requisições e limite de concorrência."""
+
+    def __init__(self, workers: int = POOL_WORKERS, max_concurrency: int = MAX_CONCURRENCY) -> None:
+        """Configura o serviço; o pool só é criado em ``start``."""
+        self.workers = workers
+        self.max_concurrency = max_concurrency
+        self.pool: Optional[ProcessPoolExecutor] = None
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._inflight: Dict[Hashable, asyncio.Future] = {}
+
+    def start(self) -> None:
+        """Cria o pool; cada worker configura as efemérides uma vez."""
+        self.pool = ProcessPoolExecutor(max_workers=self.workers, initializer=init_worker,
+                                        initargs=(str(EPHE_DIR),))
+        self._semaphore = asyncio.Semaphore(self.max_concurrency)
+
+    def stop(self) -> None:
+        """Encerra o pool."""
+        if self.pool is not None:
+            self.pool.shutdown(cancel_futures=True)
+            self.pool = None
+
+    async def coalesce(self, key: Hashable, call: Callable[[], Awaitable[Any]]) -> Any:
+        """Executa ``call`` uma vez por chave; requisições iguais aguardam o mesmo resultado."""
+        future = self._inflight.get(key)
+        if future is not None:
+            return await asyncio.shield(future)
+
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[key] = future
+        try:
+            async with self._semaphore:
+                result = await call()
+        except BaseException as e:
+            future.set_exception(e)
+            # Evita o aviso de exceção não recuperada quando não há seguidores
+            future.exception()
+            raise
+        else:
+            future.set_result(result)
+            return result
+        finally:
+            del self._inflight[key]
+
+    async def in_pool(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Executa ``fn`` no pool de processos, trazendo de volta as etapas medidas lá."""
+        result, observations = await asyncio.get_running_loop().run_in_executor(
+            self.pool, run_measured, is_enabled(), fn, *args)
+        record(observations)
+        return result
+
+    async def in_thread(self, fn: Callable[..., Any], *args: Any) -> Any:
+        """Executa ``fn`` (I/O bloqueante) numa thread."""
+        return await asyncio.get_running_loop().run_in_executor(None, fn, *args)
+
+    async def location(self, query: str) -> Dict[str, Any]:
+        """Localização via gazetteer/cache de geocodificação."""
+        return await self.coalesce(("location", query),
+                                   lambda: self.in_thread(get_location_data, query))
+
+    async def chart(self, jd: float, lat: float, lon: float, house_system: bytes) -> Chart:
+        """Mapa completo, reaproveitando o cache de mapas do processo."""
+        key = chart_key(jd, lat, lon, house_system)
+        cached = CHART_CACHE.get(key)
+        if cached is not None:
+            return cached
+
+        async def compute() -> Chart:
+            chart = await self.in_pool(compute_chart, jd, lat, lon, house_system)
+            CHART_CACHE.put(key, chart)
+            return chart
+
+        return await self.coalesce(("chart",) + key, compute)
+
+
+service = ChartService()
+
+
+def _param(request: Request, name: str) -> str:
+    """Parâmetro obrigatório da query string."""
+    value = request.query_params.get(name)
+    if value is None or value == "":
+        raise BadRequest(f"Parâmetro obrigatório ausente: {name}")
+    return value
+
+
+def _float_param(request: Request, name: str) -> float:
+    """Parâmetro numérico obrigatório e finito."""
+    value = _param(request, name)
+    try:
+        number = float(value)
+    except ValueError:
+        raise BadRequest(f"Parâmetro inválido: {name}") from None
+    if not math.isfinite(number):
+        raise BadRequest(f"Parâmetro inválido: {name}")
+    return number
+
+
+def _coordinates(request: Request) -> Tuple[float, float]:
+    """Latitude (±90°) e longitude dos parâmetros ``lat`` e ``lon``."""
+    lat, lon = _float_param(request, "lat"), _float_param(request, "lon")
+    if not -90.0 <= lat <= 90.0:
+        raise BadRequest("Parâmetro inválido: lat deve estar entre -90 e 90")
+    return lat, lon
+
+
+def _check_jd(jd: float) -> float:
+    """Rejeita instantes fora do período das efemérides instaladas."""
+    if not JD_MIN <= jd < JD_MAX:
+        raise BadRequest(f"Instante fora do período das efemérides "
+                         f"({DEFAULT_YEARS[0]}–{DEFAULT_YEARS[1]})")
+    return jd
+
+
+def _house_system(request: Request) -> bytes:
+    """Sistema de casas de ``houses.SYSTEMS`` (padrão Placidus)."""
+    system = request.query_params.get("system", "P")
+    code = system.encode("ascii", "replace")
+    if code not in SYSTEMS:
+        raise BadRequest(f"Sistema de casas não suportado: {system} "
+                         f"(use {', '.join(c.decode('ascii') for c in SYSTEMS)})")
+    return code
+
+
+def _date_time(request: Request) -> Tuple[datetime.date, datetime.time]:
+    """Data e hora locais dos parâmetros ``date`` e ``time``."""
+    date_str, time_str = _param(request, "date"), _param(request, "time")
+    try:
+        return datetime.date.fromisoformat(date_str), datetime.time.fromisoformat(time_str)
+    except ValueError as e:
+        raise BadRequest(f"Data ou hora inválida: {e}") from None
+
+
+def _jd_from_request(request: Request, timezone_str: Optional[str] = None) -> float:
+    """Dia juliano a partir de ``jd`` ou de ``date``/``time``/``timezone``."""
+    if "jd" in request.query_params:
+        return _check_jd(_float_param(request, "jd"))
+    date, birth_time = _date_time(request)
+    timezone_str = timezone_str or _param(request, "timezone")
+    try:
+        jd = calculate_julian_day(date, birth_time, timezone_str)
+    except Exception as e:
+        raise BadRequest(f"Fuso horário inválido: {e}") from None
+    return _check_jd(jd)
+
+
+def _handler(endpoint: Callable[[Request], Awaitable[Dict[str, Any]]]) -> Callable[[Request], Awaitable[JSONResponse]]:
+    """Converte exceções conhecidas em respostas JSON de erro."""
+    async def wrapped(request: Request) -> JSONResponse:
+        try:
+            return JSONResponse(await endpoint(request))
+        except BadRequest as e:
+            return JSONResponse({"error": str(e)}, status_code=400)
+        except ValueError as e:
+            return JSONResponse({"error": str(e)}, status_code=404)
+        except swe.Error as e:
+            # Parâmetros válidos, mas sem solução (ex.: Placidus acima do círculo polar)
+            return JSONResponse({"error": f"Cálculo impossível: {e}"}, status_code=422)
+    return wrapped
+
+
+async def health(request: Request) -> Dict[str, Any]:
+    """Verificação de saúde, com as estatísticas do cache de mapas."""
+    return {"status": "ok", "chart_cache": CHART_CACHE.stats()}
+
+
+async def metrics(request: Request) -> PlainTextResponse:
+    """Métricas do processo da API no formato texto do Prometheus.
+
+    Inclui as etapas medidas no pool de processos, que ``in_pool`` traz de
+    volta dos workers, além dos caches e da geocodificação.
+    """
+    return PlainTextResponse(render_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+async def location(request: Request) -> Dict[str, Any]:
+    """``GET /location?q=...``."""
+    return await service.location(_param(request, "q"))
+
+
+async def positions(request: Request) -> Dict[str, Any]:
+    """``GET /positions``: posições planetárias de um instante."""
+    jd = _jd_from_request(request)
+    return {"jd": jd, "positions": await service.coalesce(
+        ("positions", round(jd, 6)), lambda: service.in_pool(get_planet_positions, jd))}
+
+
+async def houses(request: Request) -> Dict[str, Any]:
+    """``GET /houses``: cúspides e ângulos para instante e local."""
+    jd = _jd_from_request(request)
+    lat, lon = _coordinates(request)
+    system = _house_system(request)
+    result = await service.coalesce(
+        ("houses",) + chart_key(jd, lat, lon, system),
+        lambda: service.in_pool(compute_houses, jd, lat, lon, system))
+    return {"jd": jd, "houses": _houses_json(result)}
+
+
+async def chart(request: Request) -> Dict[str, Any]:
+    """``GET /chart``: mapa completo a partir de data, hora e local."""
+    # Valida antes de gastar uma geocodificação
+    if "jd" not in request.query_params:
+        _date_time(request)
+    system = _house_system(request)
+    if "place" in request.query_params:
+        loc = await service.location(_param(request, "place"))
+    else:
+        lat, lon = _coordinates(request)
+        loc = {"latitude": lat, "longitude": lon, "timezone": _param(request, "timezone")}
+    jd = _jd_from_request(request, loc["timezone"])
+    result = await service.chart(jd, loc["latitude"], loc["longitude"], system)
+    return {"jd": jd, "location": loc, "positions": result['positions'],
+            "houses": _houses_json(result['houses'])}
+
+
+@asynccontextmanager
+async def lifespan(app: Starlette) -> AsyncIterator[None]:
+    """Garante as efemérides verificadas e sobe o pool de processos.
+
+    Sem os arquivos do período padrão a aplicação não sobe: responder com o
+    que houver em ``EPHE_DIR`` (ou cair no Moshier) daria posições erradas
+    em silêncio.
+    """
+    if not await asyncio.to_thread(ensure_ephemeris):
+        raise EphemerisError(f"Efemérides de {DEFAULT_YEARS[0]}–{DEFAULT_YEARS[1]} "
+                             f"ausentes ou inválidas em {EPHE_DIR}")
+    service.start()
+    try:
+        yield
+    finally:
+        service.stop()
+
+
+app = Starlette(
+    routes=[
+        Route("/health", _handler(health)),
+        Route("/metrics", metrics),
+        Route("/location", _handler(location)),
+        Route("/positions", _handler(positions)),
+        Route("/houses", _handler(houses)),
+        Route("/chart", _handler(chart)),
+    ],
+    lifespan=lifespan
+)
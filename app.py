@@ -1,13 +1,20 @@
 import streamlit as st
 import datetime
-from utils import (
-    download_ephe_files, get_location_data, calculate_julian_day,
-    get_planet_positions, calculate_houses
-)
-from chart_generator import create_wheel_chart, PLANET_NAMES
-import requests
 import json
-from pathlib import Path
+import os
+from chat_client import get_client
+from chat_history import ChatHistory
+from response_cache import RESPONSE_CACHE, chart_context
+from instrumentation import start_metrics_server, timed, timer, trace
+
+# O Streamlit não tem rota /metrics: com ASTRO_METRICS_PORT, as métricas são
+# servidas nessa porta (um servidor por processo, mantido entre as execuções)
+if os.environ.get("ASTRO_METRICS_PORT"):
+    start_metrics_server(int(os.environ["ASTRO_METRICS_PORT"]))
+
+# utils, chart_generator e chart_cache (Swiss Ephemeris, NumPy, geocodificação,
+# fusos horários e Plotly) só são importados quando um mapa é pedido, para que
+# a aba Sobre e o chat não paguem por eles na inicialização.
 
 # Símbolos e nomes dos signos do zodíaco
 ZODIAC_SYMBOLS = {
@@ -53,8 +60,21 @@ def calcular_signo(longitude):
         signo = "Peixes"
     return signo
 
+SAMARA_PROMPT = """Você é Samara Lambertucci, uma cigana espiritualista especialista em mapas astrais, signos e espiritualidade. 
+            Seja direta e concisa em suas respostas, mantendo-as curtas (máximo 2-3 frases).
+            Você tem temperamento forte e é impaciente com perguntas sobre amor."""
+
+# Limite aproximado de tokens do contexto enviado a cada mensagem
+CHAT_TOKEN_BUDGET = 1500
+
 # Função para o chat com Samara
-def chat_with_samara(message):
+@timed("chat.samara")
+def chat_with_samara(message, placeholder=None):
+    """Envia a mensagem para a Samara e retorna a resposta.
+
+    Com ``placeholder`` (ex.: ``st.empty()``) o texto é exibido
+    progressivamente, conforme os tokens chegam.
+    """
     if "messages" not in st.session_state:
         st.session_state.messages = []
         # Adicionar mensagem de boas-vindas
@@ -63,45 +83,54 @@ def chat_with_samara(message):
             "content": "Olá, sou Samara Lambertucci. Como posso ajudar você hoje?"
         }
         st.session_state.messages.append(welcome_message)
+        # Contexto enviado à API: sistema, resumo das mensagens antigas e as recentes
+        st.session_state.chat_history = ChatHistory(SAMARA_PROMPT, budget=CHAT_TOKEN_BUDGET)
+        st.session_state.chat_history.append(welcome_message["role"], welcome_message["content"])
     
     if message:
         # Adicionar mensagem do usuário
         st.session_state.messages.append({"role": "user", "content": message})
+        history = st.session_state.chat_history
+        history.append("user", message)
         
-        # Preparar o contexto para a API
-        messages = [
-            {"role": "system", "content": """Você é Samara Lambertucci, uma cigana espiritualista especialista em mapas astrais, signos e espiritualidade. 
-            Seja direta e concisa em suas respostas, mantendo-as curtas (máximo 2-3 frases).
-            Você tem temperamento forte e é impaciente com perguntas sobre amor."""},
-        ] + [
-            {"role": m["role"], "content": m["content"]} 
-            for m in st.session_state.messages
-        ]
-
-        # Fazer a requisição para a API do OpenRouter
+        # Fazer a requisição para a API do OpenRouter (sessão persistente, streaming)
         try:
             if "OPENROUTER_API_KEY" not in st.secrets:
                 return "Erro: API não configurada."
 
-            response = requests.post(
-                "https://openrouter.ai/api/v1/chat/completions",
-                headers={
-                    "Authorization": f"Bearer {st.secrets['OPENROUTER_API_KEY']}",
-                    "HTTP-Referer": "https://psicologaemoutradimensao.streamlit.app",
-                    "Content-Type": "application/json"
-                },
-                json={
-                    "model": "anthropic/claude-3-opus",
-                    "messages": messages
-                }
-            )
-            
-            response.raise_for_status()
-            response_json = response.json()
-            assistant_message = response_json['choices'][0]['message']['content']
+            # Perguntas repetidas (no mesmo contexto de mapa) são servidas do cache;
+            # só a primeira da conversa, pois as seguintes dependem do histórico
+            context = st.session_state.get("chart_context", chart_context())
+            follow_up = sum(m["role"] == "user" for m in st.session_state.messages) > 1
+            with timer("chat.cache"):
+                cached = RESPONSE_CACHE.get(message, context, follow_up)
+            if cached is not None:
+                assistant_message = cached.response
+                if placeholder is not None:
+                    placeholder.markdown(assistant_message)
+                st.session_state.setdefault("chat_metrics", []).append(
+                    {"cache_hit": True, "latency_saved": cached.latency_saved})
+            else:
+                # Preparar o contexto para a API, dentro do orçamento de tokens
+                messages = history.messages()
+
+                client = get_client(st.secrets['OPENROUTER_API_KEY'])
+                with timer("chat.upstream"):
+                    response = client.stream(messages)
+                    for _ in response:
+                        if placeholder is not None:
+                            placeholder.markdown(response.text)
+                assistant_message = response.text
+                RESPONSE_CACHE.put(message, context, assistant_message, response.metrics.total,
+                                   follow_up)
+
+                # Por mensagem: tempo até o primeiro token, latência total e tokens economizados
+                st.session_state.setdefault("chat_metrics", []).append(
+                    dict(response.metrics._asdict(), cache_hit=False, **history.last_stats._asdict()))
             
             # Adicionar resposta ao histórico
             st.session_state.messages.append({"role": "assistant", "content": assistant_message})
+            history.append("assistant", assistant_message)
             return assistant_message
         
         except Exception as e:
@@ -124,11 +153,6 @@ except Exception as e:
     st.error("Erro ao carregar o estilo personalizado. Por favor, verifique se o arquivo styles/custom.css existe.")
     st.stop()
 
-# Inicializar arquivos de efemérides
-if not download_ephe_files():
-    st.error("Falha ao inicializar dados astronômicos. Por favor, tente novamente.")
-    st.stop()
-
 # Título e imagem
 st.markdown("""
 <div class='title-container'>
@@ -177,21 +201,34 @@ with tab1:
     st.markdown("</div>", unsafe_allow_html=True)
 
     if generate_button:
+        from utils import download_ephe_files, get_location_data, calculate_julian_day
+        from chart_generator import PLANET_NAMES
+        from chart_cache import get_chart, get_wheel_chart
+
+        # Inicializar arquivos de efemérides (uma vez por processo)
+        if not download_ephe_files():
+            st.error("Falha ao inicializar dados astronômicos. Por favor, tente novamente.")
+            st.stop()
+
         try:
-            with st.spinner("Calculando posições celestiais..."):
+            # Com ASTRO_TRACE=1 (que liga também as métricas), registra uma linha
+            # de log em stderr com as etapas do cálculo
+            with trace("gerar_mapa", local=birth_place), st.spinner("Calculando posições celestiais..."):
                 location_data = get_location_data(birth_place)
                 jd = calculate_julian_day(birth_date, birth_time, location_data['timezone'])
-                planet_positions = get_planet_positions(jd)
-                houses = calculate_houses(
-                    jd,
-                    location_data['latitude'],
-                    location_data['longitude']
-                )
+                # Resultados compartilhados entre sessões: dados idênticos não são recalculados
+                chart = get_chart(jd, location_data['latitude'], location_data['longitude'])
+                planet_positions = chart['positions']
+                houses = chart['houses']
 
                 # Calcular signo solar
                 signo_solar = calcular_signo(planet_positions['Sun']['longitude'])
                 simbolo_solar = ZODIAC_SYMBOLS[signo_solar]
 
+                # Contexto do mapa usado pelo cache de respostas da Samara
+                st.session_state.chart_context = chart_context(
+                    signo_solar, calcular_signo(houses['ascendant']))
+
                 st.markdown(f"""
                 <div class='section'>
                     <h2>{simbolo_solar} Seu Sol está em {signo_solar}</h2>
@@ -203,7 +240,7 @@ with tab1:
 
                 with chart_col:
                     st.markdown("<div class='chart-container'>", unsafe_allow_html=True)
-                    fig = create_wheel_chart(planet_positions, houses)
+                    fig = get_wheel_chart(jd, location_data['latitude'], location_data['longitude'])
                     st.plotly_chart(fig, use_container_width=True)
                     st.markdown("</div>", unsafe_allow_html=True)
 
@@ -445,16 +482,19 @@ popup_message = st.empty()
 
 # Processar mensagem se houver
 if st.session_state.popup_message:
-    response = chat_with_samara(st.session_state.popup_message)
+    with trace("chat"):
+        response = chat_with_samara(st.session_state.popup_message, placeholder=popup_message)
     
     # Enviar resposta de volta para o JavaScript
     if response:
+        # Literal JavaScript seguro (aspas, quebras de linha e "</script>")
+        response_js = json.dumps(response).replace("</", "<\\/")
         st.markdown(
             f"""
             <script>
             window.parent.postMessage({{
                 type: 'samaraResponse',
-                message: '{response.replace("'", "\\'")}'
+                message: {response_js}
             }}, '*');
             </script>
             """,
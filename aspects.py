@@ -0,0 +1,236 @@
+"""Aspectos dentro de um mapa e sinastria entre mapas.
+
+As diferenças angulares são calculadas de uma vez com NumPy. Para conjuntos
+grandes de pontos, ``find_aspects`` usa uma varredura sobre as longitudes
+ordenadas (``np.searchsorted``), com custo O(n log n + k) em vez de O(n²).
+A sinastria em lote compara um mapa com milhares de outros numa única
+chamada vetorizada.
+"""
+
+from typing import Dict, List, Mapping, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+
+from ephemeris import BODY_NAMES
+
+ASPECT_ANGLES = {
+    "conjunction": 0.0,
+    "sextile": 60.0,
+    "square": 90.0,
+    "trine": 120.0,
+    "opposition": 180.0
+}
+
+DEFAULT_ORBS = {
+    "conjunction": 8.0,
+    "sextile": 4.0,
+    "square": 6.0,
+    "trine": 6.0,
+    "opposition": 8.0
+}
+
+# Pesos da pontuação de compatibilidade: aspectos harmônicos somam, tensos subtraem
+SYNASTRY_WEIGHTS = {
+    "conjunction": 1.0,
+    "sextile": 0.6,
+    "square": -0.7,
+    "trine": 1.0,
+    "opposition": -0.5
+}
+
+# Abaixo disso a matriz completa de pares é mais rápida que a varredura
+SWEEP_THRESHOLD = 64
+SYNASTRY_CHUNK = 4096
+
+Positions = Union[Mapping[str, Mapping[str, float]], Mapping[str, float], Sequence[float], np.ndarray]
+
+
+class Aspect(NamedTuple):
+    """Aspecto entre dois pontos; ``deviation`` é a distância ao ângulo exato."""
+
+    first: str
+    second: str
+    aspect: str
+    separation: float
+    deviation: float
+
+
+def _as_longitudes(positions: Positions,
+                   names: Optional[Sequence[str]] = None) -> Tuple[List[str], np.ndarray]:
+    """Converte posições em (nomes, longitudes).
+
+    Aceita a saída de ``get_planet_positions``, ``{nome: longitude}`` ou um
+    array de longitudes (com ``names`` opcionais; por padrão ``BODY_NAMES``
+    ou índices).
+    """
+    if isinstance(positions, Mapping):
+        keys = list(positions)
+        values = [
+            v['longitude'] if isinstance(v, Mapping) else v
+            for v in positions.values()
+        ]
+        return keys, np.asarray(values, dtype=np.float64) % 360.0
+
+    longitudes = np.asarray(positions, dtype=np.float64) % 360.0
+    if names is None:
+        n = longitudes.shape[-1]
+        names = BODY_NAMES if n == len(BODY_NAMES) else [str(i) for i in range(n)]
+    return list(names), longitudes
+
+
+def angular_separation(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """Separação circular em [0, 180] entre longitudes (com broadcasting)."""
+    return np.abs((np.asarray(a) - np.asarray(b) + 180.0) % 360.0 - 180.0)
+
+
+def _resolve_orbs(orbs: Optional[Mapping[str, float]]) -> Dict[str, float]:
+    """Orbes efetivos: ``DEFAULT_ORBS`` atualizados com ``orbs``."""
+    resolved = dict(DEFAULT_ORBS)
+    if orbs:
+        unknown = set(orbs) - set(ASPECT_ANGLES)
+        if unknown:
+            raise ValueError(f"Aspectos desconhecidos: {sorted(unknown)}")
+        resolved.update(orbs)
+    return resolved
+
+
+PairIndices = List[Tuple[str, np.ndarray, np.ndarray]]
+
+
+def _pairs_dense(longitudes: np.ndarray, orbs: Dict[str, float]) -> PairIndices:
+    """Todos os pares por matriz completa de separações."""
+    separation = angular_separation(longitudes[:, None], longitudes[None, :])
+    upper = np.triu(np.ones(separation.shape, dtype=bool), k=1)
+    pairs = []
+    for aspect, orb in orbs.items():
+        first, second = np.nonzero(upper & (np.abs(separation - ASPECT_ANGLES[aspect]) <= orb))
+        pairs.append((aspect, first, second))
+    return pairs
+
+
+def _pairs_sweep(longitudes: np.ndarray, orbs: Dict[str, float]) -> PairIndices:
+    """Pares por varredura das longitudes ordenadas.
+
+    Para cada ponto e aspecto, os parceiros estão numa janela contígua
+    ``[L + A - orb, L + A + orb]`` do array ordenado (duplicado com +360° para
+    tratar a volta do círculo), localizada por busca binária.
+    """
+    n = len(longitudes)
+    order = np.argsort(longitudes, kind="stable")
+    ordered = longitudes[order]
+    doubled = np.concatenate([ordered, ordered + 360.0])
+    positions = np.arange(n)
+
+    pairs = []
+    for aspect, orb in orbs.items():
+        angle = ASPECT_ANGLES[aspect]
+        lo_angle = max(angle - orb, 0.0)
+        hi_angle = angle + orb
+        lo = np.searchsorted(doubled, ordered + lo_angle, side="left")
+        hi = np.searchsorted(doubled, ordered + hi_angle, side="right")
+        # Só parceiros à frente no array duplicado, e nunca o próprio ponto
+        lo = np.maximum(lo, positions + 1)
+        hi = np.minimum(hi, positions + n)
+        counts = np.clip(hi - lo, 0, None)
+        if not counts.any():
+            continue
+        first = np.repeat(positions, counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        second = (np.repeat(lo, counts) + offsets) % n
+        a, b = order[first], order[second]
+        canonical = np.unique(np.stack([np.minimum(a, b), np.maximum(a, b)], axis=1), axis=0)
+        pairs.append((aspect, canonical[:, 0], canonical[:, 1]))
+    return pairs
+
+
+def find_aspects(positions: Positions, orbs: Optional[Mapping[str, float]] = None,
+                 names: Optional[Sequence[str]] = None) -> List[Aspect]:
+    """Aspectos entre todos os pares de pontos de um mapa.
+
+    Args:
+        positions: Saída de ``get_planet_positions``, ``{nome: longitude}`` ou
+            array de longitudes.
+        orbs: Orbes por tipo de aspecto; os ausentes usam ``DEFAULT_ORBS``.
+        names: Nomes dos pontos quando ``positions`` é um array.
+
+    Returns:
+        Aspectos ordenados pelo desvio em relação ao ângulo exato.
+    """
+    keys, longitudes = _as_longitudes(positions, names)
+    resolved = _resolve_orbs(orbs)
+    if len(longitudes) <= SWEEP_THRESHOLD:
+        pairs = _pairs_dense(longitudes, resolved)
+    else:
+        pairs = _pairs_sweep(longitudes, resolved)
+
+    aspects = []
+    for aspect, first, second in pairs:
+        separation = angular_separation(longitudes[first], longitudes[second])
+        deviation = np.abs(separation - ASPECT_ANGLES[aspect])
+        aspects.extend(
+            Aspect(keys[i], keys[j], aspect, sep, dev)
+            for i, j, sep, dev in zip(first.tolist(), second.tolist(),
+                                      separation.tolist(), deviation.tolist())
+        )
+    aspects.sort(key=lambda a: a.deviation)
+    return aspects
+
+
+def synastry(chart_a: Positions, chart_b: Positions,
+             orbs: Optional[Mapping[str, float]] = None) -> List[Aspect]:
+    """Aspectos cruzados entre os pontos de dois mapas."""
+    keys_a, lon_a = _as_longitudes(chart_a)
+    keys_b, lon_b = _as_longitudes(chart_b)
+    separation = angular_separation(lon_a[:, None], lon_b[None, :])
+
+    aspects = []
+    for aspect, orb in _resolve_orbs(orbs).items():
+        deviation = np.abs(separation - ASPECT_ANGLES[aspect])
+        for i, j in zip(*np.nonzero(deviation <= orb)):
+            aspects.append(Aspect(keys_a[i], keys_b[j], aspect,
+                                  float(separation[i, j]), float(deviation[i, j])))
+    aspects.sort(key=lambda a: a.deviation)
+    return aspects
+
+
+def synastry_scores(base: Positions, others: np.ndarray,
+                    orbs: Optional[Mapping[str, float]] = None,
+                    weights: Optional[Mapping[str, float]] = None,
+                    chunk_size: int = SYNASTRY_CHUNK) -> np.ndarray:
+    """Pontua um mapa contra muitos outros de uma vez.
+
+    Cada aspecto cruzado contribui com ``peso * (1 - desvio / orbe)``, de modo
+    que aspectos exatos contam mais que os que estão no limite do orbe.
+
+    Args:
+        base: Mapa de referência (mesmos formatos aceitos por ``find_aspects``).
+        others: Longitudes ``(m, n_pontos)`` ou posições ``(m, n_pontos, 6)``
+            de ``planet_positions_batch``.
+        orbs: Orbes por tipo de aspecto.
+        weights: Pesos por tipo; por padrão ``SYNASTRY_WEIGHTS``.
+        chunk_size: Mapas processados por bloco, para limitar a memória.
+
+    Returns:
+        Array ``(m,)`` com a pontuação de cada mapa.
+    """
+    _, lon_base = _as_longitudes(base)
+    others = np.asarray(others, dtype=np.float64)
+    if others.ndim == 3:
+        others = others[..., 0]
+    others = others % 360.0
+
+    resolved = _resolve_orbs(orbs)
+    weights = dict(SYNASTRY_WEIGHTS, **(weights or {}))
+    angles = np.array([ASPECT_ANGLES[a] for a in resolved])
+    orb_values = np.array([resolved[a] for a in resolved])
+    weight_values = np.array([weights.get(a, 0.0) for a in resolved])
+
+    scores = np.empty(len(others), dtype=np.float64)
+    for start in range(0, len(others), chunk_size):
+        block = others[start:start + chunk_size]
+        # (m, n_base, n_outro)
+        separation = angular_separation(lon_base[None, :, None], block[:, None, :])
+        closeness = 1.0 - np.abs(separation[..., None] - angles) / orb_values
+        np.clip(closeness, 0.0, None, out=closeness)
+        scores[start:start + len(block)] = (closeness * weight_values).sum(axis=(1, 2, 3))
+    return scores
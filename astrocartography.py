@@ -0,0 +1,183 @@
+"""Astrocartografia: onde cada corpo está no ASC, DSC, MC ou IC.
+
+A partir de um instante natal, cada corpo de ``get_planet_positions`` tem
+ascensão reta α e declinação δ, e a Terra tem tempo sideral θ₀ em
+Greenwich. O corpo está:
+
+- no MC/IC onde o tempo sideral local é α (ou α + 180°): meridianos, com
+  longitude fixa α − θ₀, calculados analiticamente;
+- no ASC/DSC onde o ângulo horário H satisfaz cos H = −tan φ · tan δ:
+  curvas calculadas de uma vez, em NumPy, sobre uma grade de latitudes.
+
+Juntas, as linhas de ASC e DSC formam o grande círculo a 90° do ponto
+subplanetário, e MC e IC o meridiano que passa por ele. Por isso a distância
+de uma cidade a cada linha é exata e vetorizada (sem grade), o que torna a
+consulta "quais linhas passam a até X km dos 5565 municípios" instantânea.
+O horizonte é o geométrico, sem refração.
+"""
+
+from typing import Dict, List, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import swisseph as swe
+
+import gazetteer
+from ephemeris import BODY_NAMES, CALC_FLAGS, planet_positions_batch
+
+ANGLES = ("ASC", "DSC", "MC", "IC")
+EARTH_RADIUS_KM = 6371.0088
+# Acima disso as curvas de ASC/DSC ficam quase horizontais e pouco úteis no mapa
+LAT_LIMIT = 80.0
+LAT_STEP = 0.5
+
+
+class AstroLine(NamedTuple):
+    """Linha de um corpo num ângulo, como polilinhas ``(m, 2)`` de (lat, lon)."""
+
+    body: str
+    angle: str
+    segments: List[np.ndarray]
+
+
+class LineHit(NamedTuple):
+    """Linha que passa perto de um município."""
+
+    place: gazetteer.Place
+    body: str
+    angle: str
+    distance_km: float
+
+
+def _wrap180(degrees: np.ndarray) -> np.ndarray:
+    """Longitudes em [-180, 180)."""
+    return (np.asarray(degrees) + 180.0) % 360.0 - 180.0
+
+
+def equatorial_positions(jd: float, bodies: Optional[Sequence[str]] = None) -> Tuple[np.ndarray, np.ndarray, float]:
+    """Ascensão reta e declinação aparentes (graus) dos corpos e o tempo sideral de Greenwich (graus)."""
+    positions = planet_positions_batch([jd], bodies, workers=1,
+                                       flags=CALC_FLAGS | swe.FLG_EQUATORIAL)[0]
+    return positions[:, 0], positions[:, 1], swe.sidtime(jd) * 15.0
+
+
+def _latitude_grid(declinations: np.ndarray, lat_limit: float, step: float) -> np.ndarray:
+    """Grade de latitudes com os extremos exatos das curvas de ASC/DSC incluídos."""
+    grid = np.arange(-lat_limit, lat_limit + step / 2, step)
+    turning = 90.0 - np.abs(declinations)
+    extra = np.concatenate([turning, -turning])
+    extra = extra[np.abs(extra) <= lat_limit]
+    return np.unique(np.concatenate([grid, extra]))
+
+
+def horizon_longitudes(ra: np.ndarray, dec: np.ndarray, gst: float,
+                       lats: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Longitudes das linhas de ASC e DSC, ``(n_corpos, n_lat)``, NaN onde o corpo não nasce/põe."""
+    tan_product = np.tan(np.radians(lats))[None, :] * np.tan(np.radians(dec))[:, None]
+    defined = np.abs(tan_product) <= 1.0 + 1e-12
+    semi_arc = np.degrees(np.arccos(np.clip(-tan_product, -1.0, 1.0)))
+    semi_arc[~defined] = np.nan
+    meridian = (ra - gst)[:, None]
+    # Nascendo a leste do meridiano (H = −H₀), pondo a oeste (H = +H₀)
+    return _wrap180(meridian - semi_arc), _wrap180(meridian + semi_arc)
+
+
+def _split(lats: np.ndarray, lons: np.ndarray) -> List[np.ndarray]:
+    """Polilinhas contínuas: corta em NaN e onde a longitude cruza ±180°."""
+    points = np.column_stack([lats, lons])
+    valid = ~np.isnan(lons)
+    breaks = np.zeros(len(lons), dtype=bool)
+    breaks[1:] = (valid[1:] != valid[:-1]) | (np.abs(np.diff(lons)) > 180.0)
+    segments = []
+    for chunk, chunk_valid in zip(np.split(points, np.flatnonzero(breaks)),
+                                  np.split(valid, np.flatnonzero(breaks))):
+        if len(chunk) > 1 and chunk_valid[0]:
+            segments.append(chunk)
+    return segments
+
+
+def astrocartography_lines(jd: float, bodies: Optional[Sequence[str]] = None,
+                           lat_limit: float = LAT_LIMIT, step: float = LAT_STEP) -> List[AstroLine]:
+    """Linhas de ASC, DSC, MC e IC de cada corpo para o instante natal ``jd`` (UT).
+
+    Args:
+        jd: Dia juliano (UT) do nascimento.
+        bodies: Corpos de ``PLANETS``; por padrão, os de ``get_planet_positions``.
+        lat_limit: Latitude máxima (em módulo) das linhas.
+        step: Passo, em graus, da grade de latitudes das curvas de ASC/DSC.
+    """
+    names = BODY_NAMES if bodies is None else tuple(bodies)
+    ra, dec, gst = equatorial_positions(jd, names)
+    lats = _latitude_grid(dec, lat_limit, step)
+    asc, dsc = horizon_longitudes(ra, dec, gst, lats)
+    mc = _wrap180(ra - gst)
+    meridian_lats = np.array([-lat_limit, lat_limit])
+
+    lines = []
+    for i, name in enumerate(names):
+        lines.append(AstroLine(name, "ASC", _split(lats, asc[i])))
+        lines.append(AstroLine(name, "DSC", _split(lats, dsc[i])))
+        for angle, lon in (("MC", mc[i]), ("IC", _wrap180(mc[i] + 180.0))):
+            lines.append(AstroLine(name, angle, [np.column_stack([meridian_lats, np.full(2, lon)])]))
+    return lines
+
+
+def line_distances(jd: float, lats: Sequence[float], lons: Sequence[float],
+                   bodies: Optional[Sequence[str]] = None) -> Tuple[np.ndarray, np.ndarray]:
+    """Distância (km) de cada local à linha de horizonte e à de meridiano de cada corpo.
+
+    Returns:
+        ``(distâncias, ângulos)``, ambos ``(n_locais, n_corpos, 2)``: a coluna 0
+        é o horizonte (ASC ou DSC) e a 1 o meridiano (MC ou IC); ``ângulos``
+        traz o índice em ``ANGLES`` do trecho mais próximo.
+    """
+    names = BODY_NAMES if bodies is None else tuple(bodies)
+    ra, dec, gst = equatorial_positions(jd, names)
+    phi = np.radians(np.asarray(lats, dtype=np.float64))[:, None]
+    # Ângulo horário do corpo em cada local (positivo a oeste do meridiano)
+    hour_angle = np.radians(_wrap180(gst + np.asarray(lons, dtype=np.float64)[:, None] - ra[None, :]))
+    delta = np.radians(dec)[None, :]
+
+    # Altitude do corpo no local = 90° − distância ao ponto subplanetário
+    sin_altitude = (np.sin(phi) * np.sin(delta) +
+                    np.cos(phi) * np.cos(delta) * np.cos(hour_angle))
+    horizon = np.abs(np.arcsin(np.clip(sin_altitude, -1.0, 1.0)))
+    # Distância ao grande círculo do meridiano do corpo
+    meridian = np.arcsin(np.clip(np.cos(phi) * np.abs(np.sin(hour_angle)), 0.0, 1.0))
+
+    distances = np.stack([horizon, meridian], axis=-1) * EARTH_RADIUS_KM
+    angles = np.empty(distances.shape, dtype=np.int8)
+    angles[..., 0] = np.where(np.sin(hour_angle) < 0, ANGLES.index("ASC"), ANGLES.index("DSC"))
+    angles[..., 1] = np.where(np.cos(hour_angle) >= 0, ANGLES.index("MC"), ANGLES.index("IC"))
+    return distances, angles
+
+
+def lines_near_municipalities(jd: float, radius_km: float,
+                              bodies: Optional[Sequence[str]] = None) -> List[LineHit]:
+    """Linhas que passam a até ``radius_km`` de cada município do gazetteer.
+
+    Ordenadas pela distância. Requer ``data/gazetteer.idx``.
+    """
+    index = gazetteer.get_index()
+    if index is None:
+        raise RuntimeError(f"Gazetteer ausente: gere {gazetteer.INDEX_PATH}")
+    names = BODY_NAMES if bodies is None else tuple(bodies)
+    lats = np.frombuffer(index.latitudes, dtype=np.float64)
+    lons = np.frombuffer(index.longitudes, dtype=np.float64)
+    distances, angles = line_distances(jd, lats, lons, names)
+
+    rows, body_idx, kind = np.nonzero(distances <= radius_km)
+    order = np.argsort(distances[rows, body_idx, kind], kind="stable")
+    return [
+        LineHit(index.place(int(rows[k])), names[body_idx[k]],
+                ANGLES[angles[rows[k], body_idx[k], kind[k]]],
+                float(distances[rows[k], body_idx[k], kind[k]]))
+        for k in order
+    ]
+
+
+def lines_by_municipality(hits: Sequence[LineHit]) -> Dict[int, List[LineHit]]:
+    """Agrupa o resultado de ``lines_near_municipalities`` pelo geocódigo do IBGE."""
+    grouped: Dict[int, List[LineHit]] = {}
+    for hit in hits:
+        grouped.setdefault(hit.place.geocode, []).append(hit)
+    return grouped
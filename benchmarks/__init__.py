@@ -0,0 +1,7 @@
+"""Benchmarks dos caminhos críticos, com baselines em JSON.
+
+Executar a partir da raiz do projeto::
+
+    python -m benchmarks.bench run --output resultados.json
+    python -m benchmarks.bench compare benchmarks/baseline.json
+"""
@@ -0,0 +1,498 @@
+"""Suíte de benchmarks dos caminhos críticos, com baselines em JSON.
+
+Cobre as funções chamadas a cada mapa (``calculate_julian_day``,
+``get_planet_positions``, ``calculate_houses``, ``calcular_signo``,
+``create_wheel_chart`` e a geocodificação, contra um Nominatim falso local)
+e três cargas fixas: um mapa completo, um lote de 10 mil mapas e uma
+varredura diária de trânsitos de 10 anos. As entradas são geradas com
+semente fixa, então duas execuções medem exatamente o mesmo trabalho.
+
+Cada benchmark roda ``repeat`` vezes; o resultado principal é o melhor
+tempo (o menos afetado por ruído da máquina), e a mediana vai junto. Para a
+roda também é registrado o tamanho da figura serializada.
+
+Uso::
+
+    python -m benchmarks.bench run
+    python -m benchmarks.bench run --output benchmarks/baseline.json
+    python -m benchmarks.bench compare benchmarks/baseline.json
+    python -m benchmarks.bench compare benchmarks/baseline.json atual.json --tolerance 0.2
+
+``compare`` roda a suíte (ou lê um resultado já salvo) e termina com código
+1 se algum caminho ficar mais lento, ou a roda maior, que a baseline além
+da tolerância. Baselines só são comparáveis na mesma máquina.
+"""
+
+import argparse
+import datetime
+import json
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import threading
+import time
+from contextlib import ExitStack, contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import Any, Callable, Dict, Iterator, List, NamedTuple, Optional, Sequence
+
+import numpy as np
+import swisseph as swe
+
+import gazetteer
+import geocoding
+from aspects import synastry_scores
+from bulk_charts import CHUNK_SIZE, compute_charts
+from chart_generator import calcular_signo, create_wheel_chart
+from ephemeris import EPHE_DIR, init_worker, planet_positions_batch
+from utils import calculate_houses, calculate_julian_day, get_location_data, get_planet_positions
+
+FORMAT_VERSION = 1
+DEFAULT_TOLERANCE = 0.25
+# Caminhos com mais ruído (rede local, coletor de lixo do Plotly)
+TOLERANCES = {
+    "create_wheel_chart": 0.4,
+    "geocoding.stub_miss": 0.5,
+    "workload.single_chart": 0.4
+}
+DEFAULT_REPEAT = 5
+# Cargas grandes repetem menos (o melhor de 3 já é estável)
+WORKLOAD_REPEAT = 3
+SEED = 20240501
+
+BATCH_SIZE = 10000
+SCAN_YEARS = 10
+
+# Mapa de referência
+REFERENCE_DATE = datetime.date(1990, 5, 1)
+REFERENCE_TIME = datetime.time(12, 0)
+REFERENCE_PLACE = "São Paulo, SP"
+# Fora do gazetteer: passa pelo geocodificador (aqui, o falso local)
+STUB_PLACE = "Lisboa, Portugal"
+STUB_RESULT = {"lat": "38.7077507", "lon": "-9.1365919", "display_name": "Lisboa, Portugal"}
+
+Setup = Callable[[ExitStack], Callable[[], Any]]
+
+
+class Benchmark(NamedTuple):
+    """Benchmark registrado: ``setup`` prepara as entradas e retorna a função medida."""
+
+    name: str
+    description: str
+    setup: Setup
+    number: int
+    items: int
+    repeat: Optional[int]
+    size: Optional[Callable[[Any], int]]
+
+
+BENCHMARKS: Dict[str, Benchmark] = {}
+
+
+def benchmark(name: str, number: int = 1, items: int = 1, repeat: Optional[int] = None,
+              size: Optional[Callable[[Any], int]] = None) -> Callable[[Setup], Setup]:
+    """Registra um benchmark.
+
+    Args:
+        name: Nome estável (é a chave na baseline).
+        number: Chamadas por repetição; o tempo registrado é por chamada.
+        items: Itens processados por chamada (para o tempo por item).
+        repeat: Repetições fixas, ignorando ``--repeat``.
+        size: Função que mede, em bytes, o resultado da última chamada.
+    """
+    def register(setup: Setup) -> Setup:
+        description = (setup.__doc__ or "").strip().splitlines()[0]
+        BENCHMARKS[name] = Benchmark(name, description, setup, number, items, repeat, size)
+        return setup
+    return register
+
+
+def _reference_chart() -> Dict[str, Any]:
+    """Dia juliano, local, posições e casas do mapa de referência."""
+    location = get_location_data(REFERENCE_PLACE)
+    jd = calculate_julian_day(REFERENCE_DATE, REFERENCE_TIME, location["timezone"])
+    return {
+        "jd": jd,
+        "location": location,
+        "positions": get_planet_positions(jd),
+        "houses": calculate_houses(jd, location["latitude"], location["longitude"])
+    }
+
+
+class _StubNominatim(BaseHTTPRequestHandler):
+    """Responde como o ``/search`` do Nominatim, sempre com o mesmo lugar."""
+
+    body = json.dumps([STUB_RESULT]).encode()
+
+    def do_GET(self) -> None:
+        """Resposta JSON fixa."""
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.body)))
+        self.end_headers()
+        self.wfile.write(self.body)
+
+    def log_message(self, *args: Any) -> None:
+        """Sem log por requisição."""
+
+
+def _stub_geocoder(stack: ExitStack) -> geocoding.CachedGeocoder:
+    """``CachedGeocoder`` real (geopy, cache SQLite) apontado para um servidor local."""
+    from geopy.geocoders import Nominatim
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), _StubNominatim)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    stack.callback(server.server_close)
+    stack.callback(server.shutdown)
+
+    workdir = Path(stack.enter_context(tempfile.TemporaryDirectory()))
+    nominatim = Nominatim(user_agent="benchmarks", domain=f"127.0.0.1:{server.server_port}",
+                          scheme="http", timeout=5)
+    cache = geocoding.GeocodeCache(workdir / "geocoding.sqlite3")
+    stack.callback(cache._conn.close)
+    # Sem limite de taxa: mede o caminho, não o Nominatim
+    return geocoding.CachedGeocoder(nominatim, cache, geocoding.TokenBucket(rate=1e9, capacity=1e9))
+
+
+@contextmanager
+def _shared_geocoder(geocoder: geocoding.CachedGeocoder) -> Iterator[None]:
+    """Usa ``geocoder`` como o geocodificador do processo enquanto ativo."""
+    previous = geocoding._geocoder
+    geocoding._geocoder = geocoder
+    try:
+        yield
+    finally:
+        geocoding._geocoder = previous
+
+
+@benchmark("calculate_julian_day", number=2000)
+def _julian_day(stack: ExitStack) -> Callable[[], Any]:
+    """Data e hora locais para dia juliano (pytz + swe.utc_to_jd)."""
+    return lambda: calculate_julian_day(REFERENCE_DATE, REFERENCE_TIME, "America/Sao_Paulo")
+
+
+@benchmark("get_planet_positions", number=500)
+def _planet_positions(stack: ExitStack) -> Callable[[], Any]:
+    """Posições dos dez corpos num instante."""
+    jd = _reference_chart()["jd"]
+    return lambda: get_planet_positions(jd)
+
+
+@benchmark("calculate_houses", number=2000)
+def _houses(stack: ExitStack) -> Callable[[], Any]:
+    """Cúspides Placidus e ângulos."""
+    chart = _reference_chart()
+    lat, lon = chart["location"]["latitude"], chart["location"]["longitude"]
+    return lambda: calculate_houses(chart["jd"], lat, lon)
+
+
+@benchmark("calcular_signo", number=100, items=3600)
+def _signs(stack: ExitStack) -> Callable[[], Any]:
+    """Signo de 3600 longitudes (passo de 0,1°)."""
+    longitudes = [i / 10 for i in range(3600)]
+    return lambda: [calcular_signo(lon) for lon in longitudes]
+
+
+@benchmark("create_wheel_chart", number=10, size=lambda fig: len(fig.to_json().encode()))
+def _wheel_chart(stack: ExitStack) -> Callable[[], Any]:
+    """Figura Plotly da roda (tempo de montagem e tamanho serializado)."""
+    chart = _reference_chart()
+    return lambda: create_wheel_chart(chart["positions"], chart["houses"])
+
+
+@benchmark("geocoding.gazetteer", number=2000)
+def _geocoding_gazetteer(stack: ExitStack) -> Callable[[], Any]:
+    """``get_location_data`` de um município brasileiro (gazetteer offline)."""
+    return lambda: get_location_data(REFERENCE_PLACE)
+
+
+@benchmark("geocoding.stub_miss", number=50)
+def _geocoding_miss(stack: ExitStack) -> Callable[[], Any]:
+    """Consulta inédita: HTTP ao Nominatim falso, parse do geopy e gravação no cache."""
+    geocoder = _stub_geocoder(stack)
+    counter = iter(range(10 ** 9))
+    return lambda: geocoder.geocode(f"{STUB_PLACE} {next(counter)}")
+
+
+@benchmark("geocoding.stub_hit", number=500)
+def _geocoding_hit(stack: ExitStack) -> Callable[[], Any]:
+    """``get_location_data`` fora do gazetteer, com a consulta já no cache."""
+    stack.enter_context(_shared_geocoder(_stub_geocoder(stack)))
+    get_location_data(STUB_PLACE)
+    return lambda: get_location_data(STUB_PLACE)
+
+
+@benchmark("workload.single_chart", number=5)
+def _single_chart(stack: ExitStack) -> Callable[[], Any]:
+    """Mapa completo como no app: local, dia juliano, posições, casas, signos e roda."""
+    def run() -> Any:
+        chart = _reference_chart()
+        signs = [calcular_signo(p["longitude"]) for p in chart["positions"].values()]
+        signs += [calcular_signo(cusp) for cusp in chart["houses"]["cusps"]]
+        return create_wheel_chart(chart["positions"], chart["houses"]), signs
+    return run
+
+
+def _random_births(count: int) -> List[Dict[str, Any]]:
+    """Nascimentos reprodutíveis entre 1940 e 2010 em municípios do gazetteer."""
+    rng = np.random.default_rng(SEED)
+    index = gazetteer.get_index()
+    if index is None:
+        raise RuntimeError(f"Gazetteer ausente: gere {gazetteer.INDEX_PATH}")
+    first = datetime.date(1940, 1, 1).toordinal()
+    days = rng.integers(0, datetime.date(2010, 12, 31).toordinal() - first, count)
+    minutes = rng.integers(0, 24 * 60, count)
+    rows = rng.integers(0, len(index), count)
+    births = []
+    for i in range(count):
+        place = index.place(int(rows[i]))
+        births.append({
+            "id": str(i),
+            "date": datetime.date.fromordinal(first + int(days[i])).isoformat(),
+            "time": f"{minutes[i] // 60:02d}:{minutes[i] % 60:02d}",
+            "latitude": place.latitude,
+            "longitude": place.longitude,
+            "timezone": place.timezone
+        })
+    return births
+
+
+@benchmark("workload.batch_10k", items=BATCH_SIZE, repeat=WORKLOAD_REPEAT)
+def _batch(stack: ExitStack) -> Callable[[], Any]:
+    """Lote de 10 mil mapas pelo caminho do ``bulk_charts`` (num só processo)."""
+    births = _random_births(BATCH_SIZE)
+
+    def run() -> Any:
+        charts = []
+        for start in range(0, len(births), CHUNK_SIZE):
+            charts.extend(compute_charts(births[start:start + CHUNK_SIZE]))
+        return charts
+    return run
+
+
+@benchmark("workload.transit_scan_10y", items=int(SCAN_YEARS * 365.25), repeat=WORKLOAD_REPEAT)
+def _transit_scan(stack: ExitStack) -> Callable[[], Any]:
+    """Varredura diária de 10 anos: posições, ingressos em signos e aspectos ao mapa natal."""
+    natal = _reference_chart()["positions"]
+    start = swe.julday(2025, 1, 1, 0.0)
+    jds = start + np.arange(int(SCAN_YEARS * 365.25), dtype=np.float64)
+
+    def run() -> Any:
+        positions = planet_positions_batch(jds, workers=1)
+        signs = (positions[..., 0] // 30).astype(np.int8)
+        ingresses = np.count_nonzero(np.diff(signs, axis=0), axis=0)
+        return ingresses, synastry_scores(natal, positions)
+    return run
+
+
+def measure(bench: Benchmark, repeat: int) -> Dict[str, Any]:
+    """Roda um benchmark e retorna seus tempos (segundos por chamada)."""
+    with ExitStack() as stack:
+        fn = bench.setup(stack)
+        # Aquecimento: importações tardias, caches de fusos e de efemérides
+        result = fn()
+        times = []
+        for _ in range(bench.repeat or repeat):
+            started = time.perf_counter()
+            for _ in range(bench.number):
+                result = fn()
+            times.append((time.perf_counter() - started) / bench.number)
+        entry: Dict[str, Any] = {
+            "seconds": min(times),
+            "median": statistics.median(times),
+            "items": bench.items,
+            "per_item": min(times) / bench.items,
+            "runs": len(times)
+        }
+        if bench.size is not None:
+            entry["bytes"] = bench.size(result)
+    return entry
+
+
+def environment() -> Dict[str, Any]:
+    """Máquina e versões em que os números foram medidos."""
+    return {
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "machine": platform.machine(),
+        "cpu_count": os.cpu_count(),
+        "numpy": np.__version__,
+        "swisseph": swe.version
+    }
+
+
+def run_suite(names: Optional[Sequence[str]] = None, repeat: int = DEFAULT_REPEAT,
+              progress: Optional[Callable[[str], None]] = None) -> Dict[str, Any]:
+    """Roda os benchmarks pedidos (todos por padrão) e monta o relatório."""
+    unknown = set(names or ()) - set(BENCHMARKS)
+    if unknown:
+        raise ValueError(f"Benchmarks desconhecidos: {sorted(unknown)}")
+    init_worker(str(EPHE_DIR))
+    results = {}
+    for name, bench in BENCHMARKS.items():
+        if names and name not in names:
+            continue
+        if progress is not None:
+            progress(name)
+        results[name] = measure(bench, repeat)
+    return {
+        "version": FORMAT_VERSION,
+        "created": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+        "environment": environment(),
+        "tolerance": DEFAULT_TOLERANCE,
+        "tolerances": dict(TOLERANCES),
+        "results": results
+    }
+
+
+class Comparison(NamedTuple):
+    """Uma métrica de um benchmark comparada com a baseline."""
+
+    name: str
+    metric: str
+    baseline: float
+    current: Optional[float]
+    tolerance: float
+
+    @property
+    def ratio(self) -> Optional[float]:
+        """Atual / baseline (``None`` se o benchmark não rodou)."""
+        if self.current is None or not self.baseline:
+            return None
+        return self.current / self.baseline
+
+    @property
+    def regressed(self) -> bool:
+        """Passou da tolerância."""
+        return self.ratio is not None and self.ratio > 1.0 + self.tolerance
+
+
+def compare(baseline: Dict[str, Any], current: Dict[str, Any],
+            tolerance: Optional[float] = None,
+            overrides: Optional[Dict[str, float]] = None) -> List[Comparison]:
+    """Compara tempo (``seconds``) e tamanho (``bytes``) de cada benchmark.
+
+    A tolerância de cada benchmark vem, em ordem de prioridade, de
+    ``overrides``, de ``tolerances`` na baseline, de ``tolerance`` e do
+    ``tolerance`` da baseline. Benchmarks ausentes do resultado atual são
+    listados sem razão (e não reprovam); novos são ignorados.
+    """
+    if baseline.get("version") != FORMAT_VERSION:
+        raise ValueError(f"Versão de baseline não suportada: {baseline.get('version')}")
+    default = tolerance if tolerance is not None else baseline.get("tolerance", DEFAULT_TOLERANCE)
+    per_name = dict(baseline.get("tolerances", {}), **(overrides or {}))
+    rows = []
+    for name, base in baseline["results"].items():
+        now = current["results"].get(name, {})
+        for metric in ("seconds", "bytes"):
+            if metric in base:
+                rows.append(Comparison(name, metric, base[metric], now.get(metric),
+                                       per_name.get(name, default)))
+    return rows
+
+
+def _format_value(metric: str, value: Optional[float]) -> str:
+    """Tempo em µs/ms/s ou tamanho em kB."""
+    if value is None:
+        return "-"
+    if metric == "bytes":
+        return f"{value / 1024:.1f} kB"
+    if value < 1e-3:
+        return f"{value * 1e6:.1f} µs"
+    if value < 1:
+        return f"{value * 1e3:.2f} ms"
+    return f"{value:.3f} s"
+
+
+def format_results(report: Dict[str, Any]) -> str:
+    """Tabela dos resultados de ``run_suite``."""
+    lines = [f"{'benchmark':<28} {'melhor':>10} {'mediana':>10} {'por item':>10}  tamanho"]
+    for name, entry in report["results"].items():
+        size = _format_value("bytes", entry["bytes"]) if "bytes" in entry else ""
+        lines.append(
+            f"{name:<28} {_format_value('seconds', entry['seconds']):>10} "
+            f"{_format_value('seconds', entry['median']):>10} "
+            f"{_format_value('seconds', entry['per_item']):>10}  {size}".rstrip())
+    return "\n".join(lines)
+
+
+def format_comparison(rows: Sequence[Comparison]) -> str:
+    """Tabela da comparação, com as regressões marcadas."""
+    lines = [f"{'benchmark':<28} {'métrica':<8} {'baseline':>10} {'atual':>10} {'razão':>7}  situação"]
+    for row in rows:
+        if row.ratio is None:
+            status, ratio = "ausente", "-"
+        else:
+            status = "REGRESSÃO" if row.regressed else "ok"
+            ratio = f"{row.ratio:.2f}x"
+        lines.append(
+            f"{row.name:<28} {row.metric:<8} {_format_value(row.metric, row.baseline):>10} "
+            f"{_format_value(row.metric, row.current):>10} {ratio:>7}  {status} "
+            f"(tolerância {row.tolerance:.0%})")
+    return "\n".join(lines)
+
+
+def _tolerance_override(text: str) -> tuple:
+    """Converte ``nome=0.5`` de ``--tolerance-for``."""
+    name, _, value = text.partition("=")
+    try:
+        return name, float(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"Esperado nome=tolerância, recebido: {text}")
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Ponto de entrada da linha de comando."""
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    run_parser = commands.add_parser("run", help="Roda a suíte e imprime (ou grava) os resultados")
+    compare_parser = commands.add_parser("compare", help="Compara com uma baseline")
+    compare_parser.add_argument("baseline", type=Path, help="JSON gerado por 'run --output'")
+    compare_parser.add_argument("current", type=Path, nargs="?",
+                                help="Resultado já salvo (padrão: roda a suíte agora)")
+    compare_parser.add_argument("--tolerance", type=float,
+                                help=f"Aumento relativo aceito (padrão: o da baseline, {DEFAULT_TOLERANCE})")
+    compare_parser.add_argument("--tolerance-for", type=_tolerance_override, action="append",
+                                default=[], metavar="NOME=TOL",
+                                help="Tolerância de um benchmark específico")
+    for sub in (run_parser, compare_parser):
+        sub.add_argument("--only", action="append", choices=sorted(BENCHMARKS), metavar="NOME",
+                         help="Roda só este benchmark (pode repetir)")
+        sub.add_argument("--repeat", type=int, default=DEFAULT_REPEAT,
+                         help="Repetições de cada benchmark")
+        sub.add_argument("--output", type=Path, help="Grava os resultados neste JSON")
+    args = parser.parse_args(argv)
+
+    def progress(name: str) -> None:
+        print(f"  {name}...", file=sys.stderr, flush=True)
+
+    if args.command == "compare" and args.current is not None:
+        current = json.loads(args.current.read_text(encoding="utf-8"))
+    else:
+        current = run_suite(args.only, args.repeat, progress)
+        print(format_results(current))
+    if args.output:
+        args.output.write_text(json.dumps(current, indent=2, ensure_ascii=False) + "\n",
+                               encoding="utf-8")
+    if args.command == "run":
+        return 0
+
+    baseline = json.loads(args.baseline.read_text(encoding="utf-8"))
+    if args.only:
+        baseline = dict(baseline, results={name: value for name, value in baseline["results"].items()
+                                           if name in args.only})
+    rows = compare(baseline, current, args.tolerance, dict(args.tolerance_for))
+    print()
+    print(format_comparison(rows))
+    regressions = [row for row in rows if row.regressed]
+    if regressions:
+        print(f"\n{len(regressions)} regressão(ões) além da tolerância.", file=sys.stderr)
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,378 @@
+"""Geração de mapas em lote a partir de um CSV ou JSONL de nascimentos.
+
+Uso::
+
+    python bulk_charts.py nascimentos.csv mapas.jsonl --workers 4
+    python bulk_charts.py nascimentos.jsonl mapas.parquet --offline --resume
+
+Cada registro de entrada tem ``id``, ``date`` (AAAA-MM-DD), ``time`` (HH:MM[:SS])
+e ``place`` ou, alternativamente, ``latitude``, ``longitude`` e ``timezone``.
+A leitura é em fluxo, os locais são resolvidos no processo principal (gazetteer
+offline, depois o cache de geocodificação) e os cálculos são distribuídos por
+um pool de processos. A saída é gravada de forma incremental, na ordem da
+entrada, e um checkpoint permite retomar um job interrompido.
+"""
+
+import argparse
+import csv
+import datetime
+import json
+import logging
+import os
+import sys
+import time
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Deque, Dict, Iterable, Iterator, List, Optional, Tuple
+
+import gazetteer
+import geocoding
+from timezones import timezone_at
+from ephemeris import BODY_NAMES, EPHE_DIR, init_worker
+from julian import julian_days_batch, transition_table
+from utils import calculate_houses, get_location_data, get_planet_positions
+
+logger = logging.getLogger("bulk_charts")
+
+CHUNK_SIZE = 256
+REPORT_INTERVAL = 5.0
+
+
+def read_births(path: Path, fmt: Optional[str] = None) -> Iterator[Dict[str, Any]]:
+    """Lê os nascimentos em fluxo, um registro por vez."""
+    fmt = fmt or ("jsonl" if path.suffix.lower() in (".jsonl", ".ndjson") else "csv")
+    with open(path, newline="", encoding="utf-8") as f:
+        if fmt == "csv":
+            yield from csv.DictReader(f)
+        elif fmt == "jsonl":
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            raise ValueError(f"Formato de entrada desconhecido: {fmt}")
+
+
+@lru_cache(maxsize=65536)
+def _resolve_place(place: str, offline: bool) -> Tuple[float, float, str]:
+    """Resolve um local pelo caminho mais barato disponível.
+
+    Ordem: gazetteer offline, cache de geocodificação em disco e, só se
+    ``offline`` for falso, o geocodificador externo (com limite de taxa).
+    """
+    found = gazetteer.lookup(place)
+    if found is not None:
+        return found.latitude, found.longitude, found.timezone
+
+    if offline:
+        cached = geocoding.get_geocoder().cache.get(geocoding.cache_key(place))
+        if cached is None or cached is geocoding.NOT_FOUND:
+            raise ValueError(f"Local fora do gazetteer e do cache: {place}")
+        timezone_str = timezone_at(cached.latitude, cached.longitude)
+        if not timezone_str:
+            raise ValueError(f"Fuso horário não encontrado para {place}")
+        return cached.latitude, cached.longitude, timezone_str
+
+    location = get_location_data(place)
+    return location['latitude'], location['longitude'], location['timezone']
+
+
+def prepare_record(record: Dict[str, Any], offline: bool) -> Dict[str, Any]:
+    """Normaliza um registro de entrada e resolve o local."""
+    prepared = {"id": record.get("id")}
+    try:
+        if record.get("latitude") not in (None, "") and record.get("timezone"):
+            lat, lon = float(record["latitude"]), float(record["longitude"])
+            timezone_str = record["timezone"]
+        else:
+            lat, lon, timezone_str = _resolve_place(str(record["place"]), offline)
+        prepared.update(
+            date=str(record["date"]), time=str(record["time"]),
+            latitude=lat, longitude=lon, timezone=timezone_str
+        )
+    except (KeyError, ValueError) as e:
+        prepared["error"] = str(e)
+    return prepared
+
+
+def compute_charts(batch: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """Calcula os mapas de um bloco de registros (executa nos workers).
+
+    Os dias julianos do bloco inteiro são convertidos de uma vez por
+    ``julian_days_batch``.
+    """
+    results: List[Optional[Dict[str, Any]]] = [None] * len(batch)
+    pending = []
+    for i, record in enumerate(batch):
+        if "error" in record:
+            results[i] = record
+            continue
+        try:
+            date = datetime.date.fromisoformat(record["date"])
+            birth_time = datetime.time.fromisoformat(record["time"])
+            # Valida o fuso aqui, para o erro ficar só neste registro
+            transition_table(record["timezone"])
+        except Exception as e:
+            results[i] = {"id": record["id"], "error": str(e)}
+            continue
+        pending.append((i, date, birth_time))
+
+    jds = julian_days_batch([p[1] for p in pending], [p[2] for p in pending],
+                            [batch[p[0]]["timezone"] for p in pending]) if pending else []
+    for (i, _, _), jd in zip(pending, list(jds)):
+        record = batch[i]
+        try:
+            jd = float(jd)
+            houses = calculate_houses(jd, record["latitude"], record["longitude"])
+            results[i] = {
+                "id": record["id"],
+                "jd": jd,
+                "latitude": record["latitude"],
+                "longitude": record["longitude"],
+                "timezone": record["timezone"],
+                "positions": get_planet_positions(jd),
+                "houses": dict(houses, cusps=list(houses["cusps"]))
+            }
+        except Exception as e:
+            results[i] = {"id": record["id"], "error": str(e)}
+    return results
+
+
+def flatten_chart(chart: Dict[str, Any]) -> Dict[str, Any]:
+    """Achata um mapa em colunas para a saída Parquet."""
+    row = {key: chart.get(key) for key in ("id", "jd", "latitude", "longitude", "timezone")}
+    row["id"] = None if row["id"] is None else str(row["id"])
+    positions = chart.get("positions") or {}
+    houses = chart.get("houses") or {}
+    for name in BODY_NAMES:
+        data = positions.get(name, {})
+        for field in ("longitude", "latitude", "distance"):
+            row[f"{name}_{field}"] = data.get(field)
+    cusps = houses.get("cusps") or [None] * 12
+    for i, cusp in enumerate(cusps, 1):
+        row[f"cusp_{i}"] = cusp
+    for key in ("ascendant", "mc", "armc", "vertex"):
+        row[key] = houses.get(key)
+    row["error"] = chart.get("error")
+    return row
+
+
+class JsonlSink:
+    """Saída JSONL em modo append; o offset em bytes é o ponto de retomada."""
+
+    def __init__(self, path: Path, offset: int = 0) -> None:
+        """Abre ``path`` truncando-o em ``offset`` (0 inicia do zero)."""
+        if offset and not path.exists():
+            raise FileNotFoundError(f"Saída do checkpoint não encontrada: {path}")
+        self.path = path
+        self._file = open(path, "r+b" if offset else "wb")
+        self._file.truncate(offset)
+        self._file.seek(offset)
+
+    def write(self, charts: List[Dict[str, Any]]) -> None:
+        """Grava os mapas e força a escrita em disco."""
+        for chart in charts:
+            self._file.write(json.dumps(chart, ensure_ascii=False).encode("utf-8") + b"\n")
+        self._file.flush()
+        os.fsync(self._file.fileno())
+
+    def state(self) -> Dict[str, Any]:
+        """Estado a gravar no checkpoint."""
+        return {"offset": self._file.tell()}
+
+    def close(self) -> None:
+        """Fecha o arquivo."""
+        self._file.close()
+
+
+def _parquet_schema() -> "pyarrow.Schema":
+    """Esquema fixo das partes, para que blocos só com erros sejam compatíveis."""
+    import pyarrow as pa
+
+    columns = flatten_chart({})
+    text = {"id", "timezone", "error"}
+    return pa.schema([(name, pa.string() if name in text else pa.float64()) for name in columns])
+
+
+class ParquetSink:
+    """Saída Parquet particionada: cada bloco vira um arquivo ``part-NNNNN``."""
+
+    def __init__(self, path: Path, parts: int = 0) -> None:
+        """Usa ``path`` como diretório; ``parts`` é o próximo índice de parte."""
+        import pyarrow  # noqa: F401 - falha cedo se o pyarrow não estiver instalado
+
+        self.path = path
+        self.parts = parts
+        path.mkdir(parents=True, exist_ok=True)
+        if parts == 0:
+            for old in path.glob("part-*.parquet"):
+                old.unlink()
+        else:
+            # Partes gravadas depois do último checkpoint seriam duplicadas
+            for old in path.glob("part-*.parquet"):
+                if int(old.stem.split("-")[1]) >= parts:
+                    old.unlink()
+
+    def write(self, charts: List[Dict[str, Any]]) -> None:
+        """Grava os mapas como uma nova parte."""
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+
+        table = pa.Table.from_pylist([flatten_chart(c) for c in charts], schema=_parquet_schema())
+        pq.write_table(table, self.path / f"part-{self.parts:05d}.parquet")
+        self.parts += 1
+
+    def state(self) -> Dict[str, Any]:
+        """Estado a gravar no checkpoint."""
+        return {"parts": self.parts}
+
+    def close(self) -> None:
+        """Nada a fechar: cada parte é um arquivo completo."""
+
+
+def _load_checkpoint(path: Path) -> Optional[Dict[str, Any]]:
+    """Lê o checkpoint, se existir."""
+    try:
+        return json.loads(path.read_text(encoding="utf-8"))
+    except FileNotFoundError:
+        return None
+
+
+def _input_identity(path: Path) -> Dict[str, Any]:
+    """Caminho absoluto, tamanho e mtime da entrada, gravados no checkpoint."""
+    stat = path.stat()
+    return {"input": str(path.resolve()), "input_size": stat.st_size,
+            "input_mtime_ns": stat.st_mtime_ns}
+
+
+def _check_resume(checkpoint: Dict[str, Any], identity: Dict[str, Any]) -> None:
+    """Recusa retomar um checkpoint de outra entrada (ou da mesma, alterada).
+
+    Raises:
+        ValueError: Caminho, tamanho ou mtime diferentes dos gravados.
+    """
+    changed = [key for key, value in identity.items() if checkpoint.get(key) != value]
+    if changed:
+        raise ValueError(f"Checkpoint de outra entrada ({checkpoint.get('input')}) ou entrada "
+                         f"alterada ({', '.join(changed)}); rode sem --resume para recomeçar")
+
+
+def _save_checkpoint(path: Path, state: Dict[str, Any]) -> None:
+    """Grava o checkpoint de forma atômica."""
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(state), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def _chunks(records: Iterable[Dict[str, Any]], size: int) -> Iterator[List[Dict[str, Any]]]:
+    """Agrupa um fluxo de registros em listas de até ``size`` itens."""
+    batch: List[Dict[str, Any]] = []
+    for record in records:
+        batch.append(record)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def run(input_path: Path, output_path: Path, output_format: Optional[str] = None,
+        input_format: Optional[str] = None, workers: Optional[int] = None,
+        chunk_size: int = CHUNK_SIZE, offline: bool = False, resume: bool = False,
+        checkpoint_path: Optional[Path] = None) -> Dict[str, float]:
+    """Executa o job e retorna estatísticas (mapas, erros, segundos, mapas/s).
+
+    Com ``resume``, o checkpoint só é usado se a entrada for a mesma que o
+    gravou (caminho, tamanho e mtime); senão, ``ValueError``.
+    """
+    output_format = output_format or ("parquet" if output_path.suffix.lower() == ".parquet" else "jsonl")
+    checkpoint_path = checkpoint_path or output_path.with_name(output_path.name + ".checkpoint.json")
+    workers = workers or os.cpu_count() or 1
+
+    identity = _input_identity(input_path)
+    checkpoint = _load_checkpoint(checkpoint_path) if resume else None
+    if checkpoint:
+        # Antes de abrir a saída, que seria truncada no ponto de retomada
+        _check_resume(checkpoint, identity)
+    skip = checkpoint["records"] if checkpoint else 0
+    sink_state = checkpoint["sink"] if checkpoint else {}
+    if output_format == "parquet":
+        sink = ParquetSink(output_path, sink_state.get("parts", 0))
+    else:
+        sink = JsonlSink(output_path, sink_state.get("offset", 0))
+    if skip:
+        logger.info("Retomando após %d registros", skip)
+
+    def records() -> Iterator[Dict[str, Any]]:
+        for i, record in enumerate(read_births(input_path, input_format)):
+            if i >= skip:
+                yield prepare_record(record, offline)
+
+    done = skip
+    charts = errors = 0
+    started = last_report = time.monotonic()
+    # Janela limitada de blocos em andamento: a memória não cresce com a entrada
+    max_inflight = workers * 2
+    pending: Deque[Future] = deque()
+
+    def drain_one() -> None:
+        nonlocal done, charts, errors, last_report
+        results = pending.popleft().result()
+        sink.write(results)
+        done += len(results)
+        failed = sum(1 for r in results if "error" in r)
+        errors += failed
+        charts += len(results) - failed
+        _save_checkpoint(checkpoint_path, dict(identity, records=done, sink=sink.state()))
+        now = time.monotonic()
+        if now - last_report >= REPORT_INTERVAL:
+            logger.info("%d mapas, %.1f mapas/s", charts, charts / (now - started))
+            last_report = now
+
+    try:
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(str(EPHE_DIR),)) as pool:
+            for batch in _chunks(records(), chunk_size):
+                pending.append(pool.submit(compute_charts, batch))
+                if len(pending) >= max_inflight:
+                    drain_one()
+            while pending:
+                drain_one()
+    finally:
+        sink.close()
+
+    elapsed = time.monotonic() - started
+    stats = {"charts": charts, "errors": errors, "records": done, "seconds": elapsed,
+             "charts_per_second": charts / elapsed if elapsed else 0.0}
+    logger.info("Concluído: %d mapas, %d erros em %.1fs (%.1f mapas/s)",
+                charts, errors, elapsed, stats["charts_per_second"])
+    checkpoint_path.unlink(missing_ok=True)
+    return stats
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    """Ponto de entrada da linha de comando."""
+    parser = argparse.ArgumentParser(description="Gera mapas astrais em lote.")
+    parser.add_argument("input", type=Path, help="CSV ou JSONL de nascimentos")
+    parser.add_argument("output", type=Path, help="Arquivo JSONL ou diretório Parquet")
+    parser.add_argument("--input-format", choices=("csv", "jsonl"))
+    parser.add_argument("--format", dest="output_format", choices=("jsonl", "parquet"))
+    parser.add_argument("--workers", type=int, help="Processos de cálculo (padrão: CPUs)")
+    parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE,
+                        help="Registros por tarefa enviada aos workers")
+    parser.add_argument("--offline", action="store_true",
+                        help="Não consultar o geocodificador externo")
+    parser.add_argument("--resume", action="store_true",
+                        help="Retomar a partir do checkpoint")
+    parser.add_argument("--checkpoint", type=Path, help="Caminho do checkpoint")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s %(message)s", stream=sys.stderr)
+    stats = run(args.input, args.output, args.output_format, args.input_format,
+                args.workers, args.chunk_size, args.offline, args.resume, args.checkpoint)
+    return 1 if stats["errors"] and not stats["charts"] else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,131 @@
+"""Cache de mapas calculados, compartilhado por todas as sessões do processo.
+
+Cada rerun do Streamlit refaz o pipeline inteiro; com este cache, dados de
+nascimento idênticos (do mesmo usuário ou de outros) são servidos sem chamar
+o Swiss Ephemeris nem reconstruir a figura do Plotly.
+"""
+
+import threading
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Hashable, Tuple
+
+from chart_generator import create_wheel_chart
+from chart_model import Chart
+from instrumentation import register_cache
+
+# ~1e-6 dia ≈ 0,09 s; 1e-4 grau ≈ 11 m
+JD_DECIMALS = 6
+COORD_DECIMALS = 4
+
+CHART_CACHE_SIZE = 4096
+FIGURE_CACHE_SIZE = 256
+
+_MISSING = object()
+
+
+class LRUCache:
+    """Cache LRU limitado por número de entradas, seguro para threads."""
+
+    def __init__(self, max_entries: int) -> None:
+        """Cria um cache vazio com capacidade ``max_entries``."""
+        self.max_entries = max_entries
+        self._data: "OrderedDict[Hashable, Any]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Retorna o valor de ``key`` (marcando-o como recente) ou ``default``."""
+        with self._lock:
+            try:
+                value = self._data[key]
+            except KeyError:
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key: Hashable, value: Any) -> None:
+        """Insere ``value`` e despeja as entradas menos usadas se necessário."""
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self.evictions += 1
+
+    def get_or_compute(self, key: Hashable, compute: Callable[[], Any]) -> Any:
+        """Retorna o valor em cache ou calcula, grava e retorna ``compute()``."""
+        value = self.get(key, _MISSING)
+        if value is _MISSING:
+            value = compute()
+            self.put(key, value)
+        return value
+
+    def clear(self) -> None:
+        """Esvazia o cache e zera as estatísticas."""
+        with self._lock:
+            self._data.clear()
+            self.hits = self.misses = self.evictions = 0
+
+    def __len__(self) -> int:
+        """Quantidade de entradas armazenadas."""
+        return len(self._data)
+
+    def stats(self) -> Dict[str, float]:
+        """Contadores de acerto, falta e despejo, e a taxa de acerto."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "size": len(self._data),
+                "max_entries": self.max_entries,
+                "hit_ratio": self.hits / lookups if lookups else 0.0
+            }
+
+
+CHART_CACHE = LRUCache(CHART_CACHE_SIZE)
+FIGURE_CACHE = LRUCache(FIGURE_CACHE_SIZE)
+register_cache("charts", CHART_CACHE.stats)
+register_cache("figures", FIGURE_CACHE.stats)
+
+
+def chart_key(jd: float, lat: float, lon: float, house_system: bytes = b'P') -> Tuple:
+    """Chave do cache: JD e coordenadas arredondados, mais o sistema de casas."""
+    return (round(jd, JD_DECIMALS), round(lat, COORD_DECIMALS),
+            round(lon, COORD_DECIMALS), house_system)
+
+
+def get_chart(jd: float, lat: float, lon: float, house_system: bytes = b'P') -> Chart:
+    """Retorna o ``Chart`` do instante e local.
+
+    O cache guarda o buffer compacto; ``chart['positions']`` e
+    ``chart['houses']`` continuam devolvendo os dicionários de antes. O
+    resultado é compartilhado entre chamadas e não deve ser modificado.
+    """
+    return CHART_CACHE.get_or_compute(chart_key(jd, lat, lon, house_system),
+                                      lambda: Chart.compute(jd, lat, lon, house_system))
+
+
+def get_wheel_chart(jd: float, lat: float, lon: float, theme: str = 'dark',
+                    house_system: bytes = b'P') -> Any:
+    """Retorna a figura da roda do mapa, reaproveitando figuras já montadas.
+
+    A figura é compartilhada entre sessões e não deve ser modificada.
+    """
+    key = chart_key(jd, lat, lon, house_system) + (theme,)
+
+    def compute() -> Any:
+        chart = get_chart(jd, lat, lon, house_system)
+        return create_wheel_chart(chart['positions'], chart['houses'], theme, consolidated=True)
+
+    return FIGURE_CACHE.get_or_compute(key, compute)
+
+
+def cache_stats() -> Dict[str, Dict[str, float]]:
+    """Estatísticas dos caches de mapas e de figuras."""
+    return {"charts": CHART_CACHE.stats(), "figures": FIGURE_CACHE.stats()}
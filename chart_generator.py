@@ -1,5 +1,12 @@
-import plotly.graph_objects as go
+import hashlib
+import math
+import threading
 import numpy as np
+import time
+from collections import OrderedDict
+from functools import lru_cache
+from xml.sax.saxutils import escape
+from instrumentation import register_cache, timed
 
 THEME_COLORS = {
     'dark': {
@@ -58,8 +65,74 @@ def calcular_signo(graus):
     indice = int(grau_normalizado // 30)
     return signos[indice]
 
-def create_wheel_chart(planet_positions, houses, theme='dark'):
-    """Gera um gráfico interativo do mapa astral usando Plotly."""
+def _wheel_layout(colors):
+    """Layout polar da roda (eixos, signos, legenda) para as cores do tema."""
+    return dict(
+        polar=dict(
+            radialaxis=dict(
+                visible=False,
+                range=[0, 1]
+            ),
+            angularaxis=dict(
+                direction="clockwise",
+                period=360,
+                rotation=90,
+                tickmode='array',
+                ticktext=['♈', '♉', '♊', '♋', '♌', '♍', '♎', '♏', '♐', '♑', '♒', '♓'],
+                tickvals=np.arange(0, 360, 30),
+                tickfont=dict(
+                    size=24,  # Aumentado o tamanho dos símbolos zodiacais
+                    color=colors['text']
+                ),
+                gridcolor=colors['grid'],
+                linecolor=colors['line']
+            ),
+            bgcolor=colors['background']
+        ),
+        paper_bgcolor='rgba(0,0,0,0)',
+        plot_bgcolor='rgba(0,0,0,0)',
+        showlegend=True,
+        legend=dict(
+            bgcolor=colors['background'],
+            bordercolor=colors['primary'],
+            borderwidth=1,
+            font=dict(
+                color=colors['text'],
+                size=14,
+                family="Arial"
+            ),
+            itemsizing='constant',
+            yanchor="top",
+            y=0.99,
+            xanchor="left",
+            x=1.1,
+            title=dict(
+                text="Planetas",
+                font=dict(
+                    size=16,
+                    family="Arial",
+                    color=colors['text']
+                )
+            )
+        ),
+        margin=dict(l=20, r=120, t=20, b=20),  # Ajustado para acomodar a legenda
+        height=800
+    )
+
+@timed('chart_generator.create_wheel_chart')
+def create_wheel_chart(planet_positions, houses, theme='dark', consolidated=False):
+    """Gera um gráfico interativo do mapa astral usando Plotly.
+
+    Com ``consolidated=True`` a parte estática (círculo, signos e layout) vem
+    de um modelo em cache por tema e o mapa usa só três traces: todas as
+    cúspides, o signo solar e todos os planetas.
+    """
+    if consolidated:
+        return _create_consolidated_wheel_chart(planet_positions, houses, theme)
+
+    # Importado sob demanda: o backend SVG não deve pagar pelo Plotly
+    import plotly.graph_objects as go
+
     colors = THEME_COLORS[theme]
 
     # Criar o círculo base
@@ -138,56 +211,239 @@ def create_wheel_chart(planet_positions, houses, theme='dark'):
             ))
 
     # Atualizar layout
-    fig.update_layout(
-        polar=dict(
-            radialaxis=dict(
-                visible=False,
-                range=[0, 1]
-            ),
-            angularaxis=dict(
-                direction="clockwise",
-                period=360,
-                rotation=90,
-                tickmode='array',
-                ticktext=['♈', '♉', '♊', '♋', '♌', '♍', '♎', '♏', '♐', '♑', '♒', '♓'],
-                tickvals=np.arange(0, 360, 30),
-                tickfont=dict(
-                    size=24,  # Aumentado o tamanho dos símbolos zodiacais
-                    color=colors['text']
-                ),
-                gridcolor=colors['grid'],
-                linecolor=colors['line']
-            ),
-            bgcolor=colors['background']
-        ),
-        paper_bgcolor='rgba(0,0,0,0)',
-        plot_bgcolor='rgba(0,0,0,0)',
-        showlegend=True,
-        legend=dict(
-            bgcolor=colors['background'],
-            bordercolor=colors['primary'],
-            borderwidth=1,
-            font=dict(
-                color=colors['text'],
-                size=14,
-                family="Arial"
-            ),
-            itemsizing='constant',
-            yanchor="top",
-            y=0.99,
-            xanchor="left",
-            x=1.1,
-            title=dict(
-                text="Planetas",
-                font=dict(
-                    size=16,
-                    family="Arial",
-                    color=colors['text']
-                )
-            )
-        ),
-        margin=dict(l=20, r=120, t=20, b=20),  # Ajustado para acomodar a legenda
-        height=800
-    )
+    fig.update_layout(**_wheel_layout(colors))
+
+    return fig
+
+@lru_cache(maxsize=None)
+def _base_figure(theme):
+    """Modelo validado da parte estática da roda, montado uma vez por tema."""
+    import plotly.graph_objects as go
+    colors = THEME_COLORS[theme]
+    fig = go.Figure()
+    fig.add_trace(go.Scatterpolar(
+        # Passo de 3°: a corda difere do arco em menos de um pixel
+        r=np.ones(121),
+        theta=np.arange(0, 361, 3),
+        mode='lines',
+        line=dict(color=colors['primary'], width=2),
+        showlegend=False,
+        fill='toself',
+        fillcolor=colors['background'],
+        hoverinfo='skip'
+    ))
+    layout = _wheel_layout(colors)
+    # Entradas da legenda não têm dados próprios: clicar nelas não esconderia nada
+    layout['legend'].update(itemclick=False, itemdoubleclick=False)
+    fig.update_layout(**layout)
+    return fig.to_dict()
+
+def _create_consolidated_wheel_chart(planet_positions, houses, theme):
+    """Roda do mapa com traces consolidados sobre o modelo em cache."""
+    import plotly.graph_objects as go
+    colors = THEME_COLORS[theme]
+    base = _base_figure(theme)
+
+    # Todas as cúspides num único trace, separadas por None
+    cusp_r, cusp_theta = [], []
+    for cusp in houses['cusps']:
+        cusp_r += [0, 1, None]
+        cusp_theta += [cusp, cusp, None]
+
+    sun_longitude = planet_positions['Sun']['longitude']
+    sun_sign = calcular_signo(sun_longitude)
+
+    names, longitudes, hover = [], [], []
+    for planet, data in planet_positions.items():
+        if planet != 'Sun':
+            planet_name = PLANET_NAMES.get(planet, planet)
+            names.append(planet_name)
+            longitudes.append(data['longitude'])
+            hover.append(f"{planet_name}: {data['longitude']:.2f}° em {calcular_signo(data['longitude'])}")
+
+    traces = [
+        dict(type='scatterpolar', r=cusp_r, theta=cusp_theta, mode='lines',
+             line=dict(color=colors['line'], width=1), showlegend=False,
+             hoverinfo='skip'),
+        dict(type='scatterpolar', r=[0.9], theta=[sun_longitude], mode='text',
+             text=[f"{sun_sign} {ZODIAC_SYMBOLS[sun_sign]}"],
+             textposition='middle center',
+             textfont=dict(color=colors['text'], size=24, family='Arial'),
+             showlegend=False),
+        dict(type='scatterpolar', r=[0.8] * len(longitudes), theta=longitudes,
+             mode='markers+text', name='Planetas', text=names,
+             hovertext=hover, hoverinfo='text', textposition='top center',
+             textfont=dict(color=colors['text'], size=16, family='Arial'),
+             marker=dict(size=18, color=colors['accent'], symbol='star',
+                         line=dict(color=colors['text'], width=1)),
+             showlegend=False)
+    ]
+    # Legenda "Planetas" como no modo clássico: uma entrada por planeta, sem pontos
+    traces += [
+        dict(type='scatterpolar', r=[None], theta=[None], mode='markers', name=name,
+             marker=dict(size=18, color=colors['accent'], symbol='star',
+                         line=dict(color=colors['text'], width=1)),
+             hoverinfo='skip', showlegend=True)
+        for name in names
+    ]
+
+    # O modelo já foi validado; os traces novos têm propriedades fixas
+    return go.Figure(dict(data=base['data'] + traces, layout=base['layout']),
+                     _validate=False)
+
+def measure_wheel_chart(planet_positions, houses, theme='dark', repeat=20):
+    """Compara tempo de montagem e tamanho do JSON dos dois modos da roda.
+
+    Retorna ``{modo: {'build_ms': ..., 'payload_bytes': ..., 'traces': ...}}``.
+    """
+    results = {}
+    for mode, consolidated in (('classic', False), ('consolidated', True)):
+        create_wheel_chart(planet_positions, houses, theme, consolidated)
+        start = time.perf_counter()
+        for _ in range(repeat):
+            fig = create_wheel_chart(planet_positions, houses, theme, consolidated)
+        build_ms = (time.perf_counter() - start) / repeat * 1000
+        results[mode] = {
+            'build_ms': build_ms,
+            'payload_bytes': len(fig.to_json().encode('utf-8')),
+            'traces': len(fig.data)
+        }
+    return results
+
+# --- Backend SVG: a mesma roda sem Plotly, montada por templates de texto ---
+
+SVG_CACHE_SIZE = 1024
+SVG_SIZE = 600
+
+_SVG_SIGN_GLYPHS = ['♈', '♉', '♊', '♋', '♌', '♍', '♎', '♏', '♐', '♑', '♒', '♓']
+_SVG_OPEN = ('<svg xmlns="http://www.w3.org/2000/svg" width="{size}" height="{size}" '
+             'viewBox="0 0 {size} {size}" font-family="Arial, sans-serif">')
+_SVG_LINE = '<line x1="{x1:.1f}" y1="{y1:.1f}" x2="{x2:.1f}" y2="{y2:.1f}" stroke="{color}" stroke-width="{width}"/>'
+_SVG_TEXT = ('<text x="{x:.1f}" y="{y:.1f}" fill="{color}" font-size="{font}" '
+             'text-anchor="middle" dominant-baseline="central">{text}</text>')
+_SVG_STAR = '<polygon points="{points}" fill="{fill}" stroke="{stroke}" stroke-width="1"/>'
+
+# Estrela de cinco pontas com o diâmetro do marcador do Plotly (18 px)
+_STAR_UNIT = [
+    (math.sin(math.radians(36 * k)) * (9.0 if k % 2 == 0 else 3.6),
+     -math.cos(math.radians(36 * k)) * (9.0 if k % 2 == 0 else 3.6))
+    for k in range(10)
+]
+
+_svg_cache = OrderedDict()
+_svg_cache_lock = threading.Lock()
+_svg_cache_stats = {'hits': 0, 'misses': 0}
+
+def _svg_point(center, radius, longitude):
+    """Coordenadas na tela: 0° de Áries no topo, sentido horário (como no Plotly)."""
+    angle = math.radians(longitude)
+    return center + radius * math.sin(angle), center - radius * math.cos(angle)
+
+@lru_cache(maxsize=None)
+def _svg_base(theme, size):
+    """Parte estática da roda em SVG (fundo, divisões e glifos dos signos)."""
+    colors = THEME_COLORS[theme]
+    center = size / 2
+    radius = size * 0.41
+    parts = [
+        f'<circle cx="{center:.1f}" cy="{center:.1f}" r="{radius:.1f}" '
+        f'fill="{colors["background"]}" stroke="{colors["primary"]}" stroke-width="2"/>'
+    ]
+    for i, glyph in enumerate(_SVG_SIGN_GLYPHS):
+        x, y = _svg_point(center, radius, 30 * i)
+        parts.append(_SVG_LINE.format(x1=center, y1=center, x2=x, y2=y,
+                                      color=colors['grid'], width=1))
+        x, y = _svg_point(center, radius + size * 0.05, 30 * i)
+        parts.append(_SVG_TEXT.format(x=x, y=y, color=colors['text'],
+                                      font=round(size * 0.04), text=glyph))
+    return ''.join(parts)
+
+def wheel_svg_key(planet_positions, houses, theme='dark', size=SVG_SIZE, fmt='svg'):
+    """Hash SHA-256 do conteúdo da roda: posições, cúspides, tema, tamanho e formato."""
+    longitudes = [(planet, round(data['longitude'], 6)) for planet, data in planet_positions.items()]
+    cusps = [round(cusp, 6) for cusp in houses['cusps']]
+    payload = repr((longitudes, cusps, theme, size, fmt)).encode('utf-8')
+    return hashlib.sha256(payload).hexdigest()
+
+def _svg_cached(key, render):
+    """Serve ``key`` do cache de renderizações ou renderiza e guarda."""
+    with _svg_cache_lock:
+        if key in _svg_cache:
+            _svg_cache.move_to_end(key)
+            _svg_cache_stats['hits'] += 1
+            return _svg_cache[key]
+        _svg_cache_stats['misses'] += 1
+    output = render()
+    with _svg_cache_lock:
+        _svg_cache[key] = output
+        while len(_svg_cache) > SVG_CACHE_SIZE:
+            _svg_cache.popitem(last=False)
+    return output
+
+def _render_wheel_svg(planet_positions, houses, theme, size):
+    """Monta o documento SVG da roda."""
+    colors = THEME_COLORS[theme]
+    center = size / 2
+    radius = size * 0.41
+    parts = [_SVG_OPEN.format(size=size), _svg_base(theme, size)]
+
+    for cusp in houses['cusps']:
+        x, y = _svg_point(center, radius, cusp)
+        parts.append(_SVG_LINE.format(x1=center, y1=center, x2=x, y2=y,
+                                      color=colors['line'], width=1))
+
+    sun_longitude = planet_positions['Sun']['longitude']
+    sun_sign = calcular_signo(sun_longitude)
+    x, y = _svg_point(center, radius * 0.9, sun_longitude)
+    parts.append(_SVG_TEXT.format(x=x, y=y, color=colors['text'], font=round(size * 0.04),
+                                  text=escape(f"{sun_sign} {ZODIAC_SYMBOLS[sun_sign]}")))
+
+    for planet, data in planet_positions.items():
+        if planet != 'Sun':
+            x, y = _svg_point(center, radius * 0.8, data['longitude'])
+            points = ' '.join(f'{x + dx:.1f},{y + dy:.1f}' for dx, dy in _STAR_UNIT)
+            parts.append(_SVG_STAR.format(points=points, fill=colors['accent'],
+                                          stroke=colors['text']))
+            parts.append(_SVG_TEXT.format(x=x, y=y - 18, color=colors['text'],
+                                          font=round(size * 0.027),
+                                          text=escape(PLANET_NAMES.get(planet, planet))))
+
+    parts.append('</svg>')
+    return ''.join(parts)
+
+@timed('chart_generator.render_wheel_svg')
+def render_wheel_svg(planet_positions, houses, theme='dark', size=SVG_SIZE):
+    """Gera a roda do mapa como SVG (texto), sem carregar o Plotly.
+
+    Desenha o mesmo conteúdo de ``create_wheel_chart`` (cúspides, glifos dos
+    signos, signo solar e planetas) e serve do cache quando a mesma
+    combinação de posições, cúspides, tema e tamanho já foi renderizada.
+    """
+    key = wheel_svg_key(planet_positions, houses, theme, size)
+    return _svg_cached(key, lambda: _render_wheel_svg(planet_positions, houses, theme, size))
+
+@timed('chart_generator.render_wheel_png')
+def render_wheel_png(planet_positions, houses, theme='dark', size=SVG_SIZE):
+    """Gera a roda do mapa como PNG (bytes), rasterizando o SVG.
+
+    Requer o pacote opcional ``cairosvg``.
+    """
+    try:
+        import cairosvg
+    except ImportError:
+        raise ImportError("Exportar PNG requer o pacote opcional 'cairosvg' (pip install cairosvg)") from None
+
+    def render():
+        svg = render_wheel_svg(planet_positions, houses, theme, size)
+        return cairosvg.svg2png(bytestring=svg.encode('utf-8'))
+
+    return _svg_cached(wheel_svg_key(planet_positions, houses, theme, size, 'png'), render)
+
+def svg_cache_stats():
+    """Acertos, faltas e tamanho do cache de renderizações SVG/PNG."""
+    with _svg_cache_lock:
+        lookups = _svg_cache_stats['hits'] + _svg_cache_stats['misses']
+        return dict(_svg_cache_stats, size=len(_svg_cache), max_entries=SVG_CACHE_SIZE,
+                    hit_ratio=_svg_cache_stats['hits'] / lookups if lookups else 0.0)
 
-    return fig
\ No newline at end of file
+register_cache('svg', svg_cache_stats)
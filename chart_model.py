@@ -0,0 +1,264 @@
+"""Modelo compacto de mapa natal, com serialização binária.
+
+``get_planet_positions`` e ``calculate_houses`` devolvem dicionários de
+dicionários, caros em memória quando há milhares de mapas em cache e lentos
+para serializar (``st.session_state``, processos do pool). ``Chart`` usa
+``__slots__`` e guarda tudo num único ``array('d')`` de layout fixo:
+
+====================  ==========  ==========================================
+campo                 posição     conteúdo
+====================  ==========  ==========================================
+jd, latitude,         0–2         instante (UT) e local
+longitude
+positions             3–32        ``BODY_NAMES`` x (longitude, latitude,
+                                  distância)
+cusps                 33–44       cúspides das casas 1 a 12
+angles                45–48       ``ANGLES`` (ascendente, MC, ARMC, vértice)
+====================  ==========  ==========================================
+
+``values`` é uma visão NumPy sem cópia desse buffer e ``buffer`` um
+``memoryview``. ``to_bytes`` gera um registro versionado de ``RECORD_SIZE``
+(204) bytes: ângulos em ponto fixo de 32 bits (resolução de 0,0003″),
+coordenadas geográficas em ponto fixo (~1 cm) e distâncias em ``float32``;
+só o dia juliano fica em ``float64``. Registros de vários mapas podem ser
+concatenados e lidos de uma vez com ``charts_from_bytes``.
+
+Para quem ainda usa os dicionários, ``chart['positions']`` e
+``chart['houses']`` (ou ``to_dict``) reproduzem os formatos de
+``get_planet_positions`` e ``calculate_houses``.
+"""
+
+import struct
+from array import array
+from typing import Any, Dict, List, Mapping, Sequence, Tuple
+
+import numpy as np
+import swisseph as swe
+
+from ephemeris import BODY_NAMES, planet_positions_batch
+from instrumentation import timed, timer
+
+POSITION_FIELDS = ("longitude", "latitude", "distance")
+ANGLES = ("ascendant", "mc", "armc", "vertex")
+N_CUSPS = 12
+
+_JD, _LAT, _LON = 0, 1, 2
+_POSITIONS = 3
+_CUSPS = _POSITIONS + len(BODY_NAMES) * len(POSITION_FIELDS)
+_ANGLES = _CUSPS + N_CUSPS
+LAYOUT_SIZE = _ANGLES + len(ANGLES)
+
+_MAGIC = b"CH"
+_VERSION = 1
+# Cabeçalho, jd, latitude e longitude geográficas, longitudes eclípticas
+# (corpos, cúspides, ângulos), latitudes eclípticas e distâncias
+_RECORD = struct.Struct(f"<2sBcdii{len(BODY_NAMES) + N_CUSPS + len(ANGLES)}I"
+                        f"{len(BODY_NAMES)}i{len(BODY_NAMES)}f")
+RECORD_SIZE = _RECORD.size
+RECORD_DTYPE = np.dtype([
+    ("magic", "S2"), ("version", "u1"), ("house_system", "S1"), ("jd", "<f8"),
+    ("geo", "<i4", 2), ("longitudes", "<u4", len(BODY_NAMES) + N_CUSPS + len(ANGLES)),
+    ("latitudes", "<i4", len(BODY_NAMES)), ("distances", "<f4", len(BODY_NAMES))
+])
+
+# Ponto fixo: uma volta inteira em 32 bits; latitudes em ±90° e longitudes
+# geográficas em ±180° em 31 bits com sinal
+_TURN = 2.0 ** 32 / 360.0
+_LAT_SCALE = (2.0 ** 31 - 1) / 90.0
+_LON_SCALE = (2.0 ** 31 - 1) / 180.0
+
+
+class Chart:
+    """Mapa natal (posições, cúspides e ângulos) num buffer ``array('d')``."""
+
+    __slots__ = ("_values", "house_system")
+
+    def __init__(self, values: Sequence[float], house_system: bytes = b'P') -> None:
+        """Cria o mapa a partir de ``LAYOUT_SIZE`` valores no layout do módulo."""
+        self._values = values if isinstance(values, array) and values.typecode == 'd' else array('d', values)
+        if len(self._values) != LAYOUT_SIZE:
+            raise ValueError(f"Mapa deve ter {LAYOUT_SIZE} valores, recebeu {len(self._values)}")
+        self.house_system = bytes(house_system)
+
+    @classmethod
+    @timed("chart.compute")
+    def compute(cls, jd: float, lat: float, lon: float, house_system: bytes = b'P') -> "Chart":
+        """Calcula posições e casas para o instante e local.
+
+        Mede as mesmas etapas ``swe.calc_ut`` e ``swe.houses`` que
+        ``get_planet_positions`` e ``calculate_houses``.
+        """
+        values = array('d', bytes(8 * LAYOUT_SIZE))
+        view = np.frombuffer(values, dtype=np.float64)
+        view[:_POSITIONS] = (jd, lat, lon)
+        with timer("swe.calc_ut"):
+            positions = planet_positions_batch([jd], workers=1)[0]
+        view[_POSITIONS:_CUSPS] = positions[:, :len(POSITION_FIELDS)].ravel()
+        with timer("swe.houses"):
+            cusps, ascmc = swe.houses(jd, lat, lon, house_system)
+        view[_CUSPS:_ANGLES] = cusps
+        view[_ANGLES:] = ascmc[:len(ANGLES)]
+        return cls(values, house_system)
+
+    @classmethod
+    def from_dicts(cls, jd: float, lat: float, lon: float,
+                   positions: Mapping[str, Mapping[str, float]],
+                   houses: Mapping[str, Any], house_system: bytes = b'P') -> "Chart":
+        """Adaptador a partir das saídas de ``get_planet_positions`` e ``calculate_houses``."""
+        values = [jd, lat, lon]
+        for name in BODY_NAMES:
+            values.extend(positions[name][field] for field in POSITION_FIELDS)
+        values.extend(houses['cusps'])
+        values.extend(houses[angle] for angle in ANGLES)
+        return cls(values, house_system)
+
+    @property
+    def values(self) -> np.ndarray:
+        """Visão NumPy (sem cópia) de todo o buffer."""
+        return np.frombuffer(self._values, dtype=np.float64)
+
+    @property
+    def buffer(self) -> memoryview:
+        """``memoryview`` do buffer, para escrever ou enviar sem cópia."""
+        return memoryview(self._values)
+
+    @property
+    def jd(self) -> float:
+        """Dia juliano (UT)."""
+        return self._values[_JD]
+
+    @property
+    def latitude(self) -> float:
+        """Latitude geográfica."""
+        return self._values[_LAT]
+
+    @property
+    def longitude(self) -> float:
+        """Longitude geográfica (leste positivo)."""
+        return self._values[_LON]
+
+    @property
+    def positions(self) -> np.ndarray:
+        """Visão ``(n_corpos, 3)`` na ordem de ``BODY_NAMES`` e ``POSITION_FIELDS``."""
+        return self.values[_POSITIONS:_CUSPS].reshape(len(BODY_NAMES), len(POSITION_FIELDS))
+
+    @property
+    def cusps(self) -> np.ndarray:
+        """Visão das 12 cúspides."""
+        return self.values[_CUSPS:_ANGLES]
+
+    @property
+    def angles(self) -> np.ndarray:
+        """Visão dos ângulos na ordem de ``ANGLES``."""
+        return self.values[_ANGLES:]
+
+    @property
+    def ascendant(self) -> float:
+        """Ascendente."""
+        return self._values[_ANGLES]
+
+    @property
+    def mc(self) -> float:
+        """Meio do Céu."""
+        return self._values[_ANGLES + 1]
+
+    def positions_dict(self) -> Dict[str, Dict[str, float]]:
+        """Posições no formato de ``get_planet_positions``."""
+        rows = self.positions.tolist()
+        return {name: dict(zip(POSITION_FIELDS, row)) for name, row in zip(BODY_NAMES, rows)}
+
+    def houses_dict(self) -> Dict[str, Any]:
+        """Casas no formato de ``calculate_houses``."""
+        houses: Dict[str, Any] = {'cusps': tuple(self.cusps.tolist())}
+        houses.update(zip(ANGLES, self.angles.tolist()))
+        return houses
+
+    def to_dict(self) -> Dict[str, Any]:
+        """``{'positions': ..., 'houses': ...}``, como o cache de mapas retornava."""
+        return {'positions': self.positions_dict(), 'houses': self.houses_dict()}
+
+    def __getitem__(self, key: str) -> Any:
+        """Compatibilidade com ``chart['positions']`` e ``chart['houses']``."""
+        if key == 'positions':
+            return self.positions_dict()
+        if key == 'houses':
+            return self.houses_dict()
+        raise KeyError(key)
+
+    def keys(self) -> Tuple[str, str]:
+        """Chaves aceitas por ``__getitem__``."""
+        return ('positions', 'houses')
+
+    def to_bytes(self) -> bytes:
+        """Registro binário versionado de ``RECORD_SIZE`` bytes."""
+        values = self.values
+        positions = self.positions
+        longitudes = np.concatenate([positions[:, 0], self.cusps, self.angles])
+        # 360° arredonda para 2**32: o módulo de 32 bits o leva de volta a 0°
+        return _RECORD.pack(
+            _MAGIC, _VERSION, self.house_system, values[_JD],
+            int(round(values[_LAT] * _LAT_SCALE)), int(round(values[_LON] * _LON_SCALE)),
+            *np.round(longitudes % 360.0 * _TURN).astype(np.uint64).astype(np.uint32).tolist(),
+            *np.round(positions[:, 1] * _LAT_SCALE).astype(np.int32).tolist(),
+            *positions[:, 2].tolist())
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "Chart":
+        """Lê um registro de ``to_bytes``."""
+        if len(data) != RECORD_SIZE:
+            raise ValueError(f"Registro de mapa deve ter {RECORD_SIZE} bytes, recebeu {len(data)}")
+        return charts_from_bytes(data)[0]
+
+    def __reduce__(self) -> Tuple[Any, ...]:
+        """Pickle do buffer bruto, sem perda e sem os dicionários."""
+        return (_from_raw, (self._values.tobytes(), self.house_system))
+
+    def __eq__(self, other: object) -> bool:
+        """Mesmo sistema de casas e mesmos valores."""
+        if not isinstance(other, Chart):
+            return NotImplemented
+        return self.house_system == other.house_system and self._values == other._values
+
+    def __repr__(self) -> str:
+        """Resumo com instante, local e ascendente."""
+        return (f"Chart(jd={self.jd:.6f}, lat={self.latitude:.4f}, lon={self.longitude:.4f}, "
+                f"house_system={self.house_system!r}, ascendant={self.ascendant:.4f})")
+
+
+def _from_raw(raw: bytes, house_system: bytes) -> Chart:
+    """Reconstrói um ``Chart`` a partir dos bytes do buffer."""
+    values = array('d')
+    values.frombytes(raw)
+    return Chart(values, house_system)
+
+
+def charts_to_bytes(charts: Sequence[Chart]) -> bytes:
+    """Registros de vários mapas concatenados."""
+    return b"".join(chart.to_bytes() for chart in charts)
+
+
+def charts_from_bytes(data: bytes) -> List[Chart]:
+    """Lê registros concatenados de uma vez, com NumPy.
+
+    Raises:
+        ValueError: Tamanho que não é múltiplo de ``RECORD_SIZE``, assinatura
+            inválida ou versão incompatível.
+    """
+    if len(data) % RECORD_SIZE:
+        raise ValueError(f"Tamanho não é múltiplo do registro de mapa ({RECORD_SIZE} bytes)")
+    records = np.frombuffer(data, dtype=RECORD_DTYPE)
+    if len(records) and (np.any(records["magic"] != _MAGIC) or np.any(records["version"] != _VERSION)):
+        raise ValueError("Registro de mapa inválido ou de versão incompatível")
+
+    n_bodies = len(BODY_NAMES)
+    out = np.empty((len(records), LAYOUT_SIZE), dtype=np.float64)
+    out[:, _JD] = records["jd"]
+    out[:, _LAT] = records["geo"][:, 0] / _LAT_SCALE
+    out[:, _LON] = records["geo"][:, 1] / _LON_SCALE
+    longitudes = records["longitudes"] / _TURN
+    positions = out[:, _POSITIONS:_CUSPS].reshape(-1, n_bodies, len(POSITION_FIELDS))
+    positions[..., 0] = longitudes[:, :n_bodies]
+    positions[..., 1] = records["latitudes"] / _LAT_SCALE
+    positions[..., 2] = records["distances"]
+    out[:, _CUSPS:] = longitudes[:, n_bodies:]
+    return [_from_raw(row.tobytes(), system) for row, system in zip(out, records["house_system"].tolist())]
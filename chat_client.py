@@ -0,0 +1,234 @@
+"""Cliente de chat do OpenRouter com sessão persistente e streaming SSE.
+
+Uma única ``requests.Session`` por processo mantém as conexões HTTPS vivas
+entre mensagens (sem novo handshake TLS a cada pergunta), com timeouts de
+conexão e leitura e novas tentativas com backoff exponencial para falhas de
+conexão e respostas 429/5xx. As respostas chegam por server-sent events e
+são entregues pedaço a pedaço; cada mensagem registra o tempo até o
+primeiro token e a latência total.
+
+O endereço da API é configurável, o que permite testar contra um servidor
+SSE local.
+"""
+
+import json
+import threading
+import time
+from collections import deque
+from typing import Any, Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+OPENROUTER_URL = "https://openrouter.ai/api/v1/chat/completions"
+DEFAULT_MODEL = "anthropic/claude-3-opus"
+REFERER = "https://psicologaemoutradimensao.streamlit.app"
+
+# (conexão, leitura) em segundos; a leitura vale para o intervalo entre pedaços
+DEFAULT_TIMEOUT = (5.0, 60.0)
+DEFAULT_RETRIES = 3
+BACKOFF_FACTOR = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+POOL_SIZE = 10
+METRICS_HISTORY = 1000
+
+Message = Dict[str, str]
+
+
+class ChatError(RuntimeError):
+    """Erro retornado pela API de chat (HTTP ou dentro do stream)."""
+
+
+class ChatMetrics(NamedTuple):
+    """Tempos de uma mensagem, em segundos."""
+
+    time_to_first_token: Optional[float]
+    total: float
+    chunks: int
+    characters: int
+    model: str
+
+
+def make_session(retries: int = DEFAULT_RETRIES, backoff_factor: float = BACKOFF_FACTOR,
+                 pool_size: int = POOL_SIZE) -> requests.Session:
+    """Sessão HTTP com pool de conexões keep-alive e novas tentativas.
+
+    As novas tentativas só acontecem antes de a resposta começar a ser lida,
+    então nunca duplicam texto já entregue.
+    """
+    retry = Retry(
+        total=retries,
+        backoff_factor=backoff_factor,
+        status_forcelist=RETRY_STATUSES,
+        allowed_methods=frozenset({"POST"}),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    adapter = HTTPAdapter(pool_connections=pool_size, pool_maxsize=pool_size, max_retries=retry)
+    session = requests.Session()
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def iter_sse(lines: Iterable[str]) -> Iterator[str]:
+    """Extrai o campo ``data`` de cada evento de um stream SSE.
+
+    Linhas de comentário (``: ...``, usadas como keep-alive) são ignoradas e
+    eventos com várias linhas ``data`` são unidos por quebra de linha.
+    """
+    data: List[str] = []
+    for line in lines:
+        if not line:
+            if data:
+                yield "\n".join(data)
+                data = []
+            continue
+        if line.startswith(":"):
+            continue
+        field, _, value = line.partition(":")
+        if field == "data":
+            data.append(value[1:] if value.startswith(" ") else value)
+    if data:
+        yield "\n".join(data)
+
+
+class ChatStream:
+    """Resposta em andamento: iterável de pedaços de texto.
+
+    Depois de consumida, ``text`` tem a resposta completa e ``metrics`` os
+    tempos da mensagem.
+    """
+
+    def __init__(self, client: "ChatClient", response: requests.Response, started: float) -> None:
+        """Envolve a resposta HTTP aberta de ``ChatClient.stream``."""
+        self._client = client
+        self._response = response
+        self._started = started
+        self._parts: List[str] = []
+        self.metrics: Optional[ChatMetrics] = None
+
+    @property
+    def text(self) -> str:
+        """Texto recebido até agora."""
+        return "".join(self._parts)
+
+    def __iter__(self) -> Iterator[str]:
+        """Entrega os pedaços de texto conforme chegam."""
+        first_token: Optional[float] = None
+        try:
+            # chunk_size=None entrega os dados assim que chegam, sem esperar um bloco cheio
+            lines = self._response.iter_lines(chunk_size=None, decode_unicode=True)
+            for data in iter_sse(lines):
+                if data == "[DONE]":
+                    # Lê até o fim para a conexão voltar ao pool (keep-alive)
+                    for _ in lines:
+                        pass
+                    break
+                payload = json.loads(data)
+                if "error" in payload:
+                    raise ChatError(payload["error"].get("message", str(payload["error"])))
+                for choice in payload.get("choices", ()):
+                    delta = (choice.get("delta") or {}).get("content")
+                    if delta:
+                        if first_token is None:
+                            first_token = time.perf_counter() - self._started
+                        self._parts.append(delta)
+                        yield delta
+        finally:
+            self._response.close()
+            self.metrics = ChatMetrics(first_token, time.perf_counter() - self._started,
+                                       len(self._parts), sum(map(len, self._parts)),
+                                       self._client.model)
+            self._client.record(self.metrics)
+
+
+class ChatClient:
+    """Cliente de chat completions compatível com a API do OpenRouter."""
+
+    def __init__(self, api_key: str, url: str = OPENROUTER_URL, model: str = DEFAULT_MODEL,
+                 timeout: Tuple[float, float] = DEFAULT_TIMEOUT,
+                 session: Optional[requests.Session] = None) -> None:
+        """Cria o cliente; a sessão (e suas conexões) é reaproveitada entre chamadas."""
+        self.api_key = api_key
+        self.url = url
+        self.model = model
+        self.timeout = timeout
+        self.session = session or make_session()
+        self.metrics: Deque[ChatMetrics] = deque(maxlen=METRICS_HISTORY)
+        self._metrics_lock = threading.Lock()
+
+    def _headers(self) -> Dict[str, str]:
+        """Cabeçalhos de autenticação e identificação do app."""
+        return {
+            "Authorization": f"Bearer {self.api_key}",
+            "HTTP-Referer": REFERER,
+            "Content-Type": "application/json",
+            "Accept": "text/event-stream"
+        }
+
+    def stream(self, messages: List[Message], **params: Any) -> ChatStream:
+        """Envia as mensagens e retorna a resposta como ``ChatStream``.
+
+        Raises:
+            ChatError: Se a API responder com erro.
+            requests.RequestException: Em falhas de rede após as novas tentativas.
+        """
+        started = time.perf_counter()
+        response = self.session.post(
+            self.url,
+            headers=self._headers(),
+            json=dict(params, model=self.model, messages=messages, stream=True),
+            timeout=self.timeout,
+            stream=True
+        )
+        if response.status_code >= 400:
+            try:
+                detail = response.json().get("error", {}).get("message", response.text)
+            except ValueError:
+                detail = response.text
+            response.close()
+            raise ChatError(f"HTTP {response.status_code}: {detail}")
+        # SSE é sempre UTF-8; sem charset o requests assumiria ISO-8859-1
+        response.encoding = "utf-8"
+        return ChatStream(self, response, started)
+
+    def complete(self, messages: List[Message], **params: Any) -> Tuple[str, ChatMetrics]:
+        """Resposta completa (consome o stream) e seus tempos."""
+        chat_stream = self.stream(messages, **params)
+        for _ in chat_stream:
+            pass
+        return chat_stream.text, chat_stream.metrics
+
+    def record(self, metrics: ChatMetrics) -> None:
+        """Guarda os tempos de uma mensagem."""
+        with self._metrics_lock:
+            self.metrics.append(metrics)
+
+    def stats(self) -> Dict[str, float]:
+        """Médias de tempo até o primeiro token e de latência total."""
+        with self._metrics_lock:
+            history = list(self.metrics)
+        ttft = [m.time_to_first_token for m in history if m.time_to_first_token is not None]
+        return {
+            "messages": len(history),
+            "avg_time_to_first_token": sum(ttft) / len(ttft) if ttft else 0.0,
+            "avg_total": sum(m.total for m in history) / len(history) if history else 0.0
+        }
+
+
+_clients: Dict[Tuple[str, str], ChatClient] = {}
+_clients_lock = threading.Lock()
+
+
+def get_client(api_key: str, url: str = OPENROUTER_URL) -> ChatClient:
+    """Retorna o cliente compartilhado do processo para a chave e o endereço."""
+    key = (api_key, url)
+    client = _clients.get(key)
+    if client is None:
+        with _clients_lock:
+            client = _clients.get(key)
+            if client is None:
+                client = _clients[key] = ChatClient(api_key, url)
+    return client
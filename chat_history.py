@@ -0,0 +1,187 @@
+"""Histórico do chat com orçamento de tokens.
+
+Em vez de reenviar a conversa inteira a cada mensagem, ``ChatHistory``
+monta o contexto com o prompt de sistema, um resumo acumulado das trocas
+antigas e as mensagens mais recentes na íntegra, sem passar do orçamento.
+As contagens de tokens são aproximadas e mantidas incrementalmente: cada
+mensagem é contada uma vez, quando entra no histórico.
+"""
+
+import math
+from collections import deque
+from typing import Callable, Deque, Dict, List, NamedTuple, Optional, Tuple
+
+Message = Dict[str, str]
+# Recebe o resumo atual e as mensagens que saem da janela; retorna o novo resumo
+Summarizer = Callable[[str, List[Message]], str]
+
+DEFAULT_BUDGET = 1500
+DEFAULT_KEEP_RECENT = 6
+# Fração do orçamento reservada ao resumo das mensagens antigas
+SUMMARY_SHARE = 0.25
+# Custo fixo de cada mensagem no formato de chat (papel e delimitadores)
+MESSAGE_OVERHEAD = 4
+CHARS_PER_TOKEN = 4
+SUMMARY_LINE_CHARS = 160
+SUMMARY_HEADER = "Resumo da conversa até aqui:\n"
+
+ROLE_LABELS = {"user": "Usuário", "assistant": "Samara"}
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimativa de tokens de um texto (~4 caracteres por token)."""
+    return math.ceil(len(text) / CHARS_PER_TOKEN)
+
+
+def message_tokens(message: Message) -> int:
+    """Estimativa de tokens de uma mensagem, incluindo o custo fixo."""
+    return estimate_tokens(message["content"]) + MESSAGE_OVERHEAD
+
+
+class _Entry(NamedTuple):
+    """Mensagem com sua contagem de tokens já calculada."""
+
+    message: Message
+    tokens: int
+
+
+class ContextStats(NamedTuple):
+    """Tamanho de um contexto enviado e a economia em relação ao histórico completo."""
+
+    sent_tokens: int
+    full_tokens: int
+    saved_tokens: int
+    folded_messages: int
+
+
+def summary_line(message: Message) -> str:
+    """Linha de resumo extrativa: início da mensagem, cortado numa palavra."""
+    text = " ".join(message["content"].split())
+    if len(text) > SUMMARY_LINE_CHARS:
+        text = text[:SUMMARY_LINE_CHARS].rsplit(" ", 1)[0] + "…"
+    return f"{ROLE_LABELS.get(message['role'], message['role'])}: {text}"
+
+
+class ChatHistory:
+    """Conversa com janela de mensagens recentes e resumo das antigas.
+
+    Args:
+        system_prompt: Prompt de sistema, sempre enviado na íntegra.
+        budget: Limite aproximado de tokens do contexto enviado.
+        keep_recent: Mensagens recentes preservadas na íntegra (só são
+            descartadas se, sozinhas, não couberem no orçamento).
+        summarizer: Função que incorpora mensagens antigas ao resumo. Sem
+            ela, o resumo é extrativo (uma linha por mensagem) e as linhas
+            mais antigas são descartadas quando ele passa da sua cota.
+    """
+
+    def __init__(self, system_prompt: str, budget: int = DEFAULT_BUDGET,
+                 keep_recent: int = DEFAULT_KEEP_RECENT,
+                 summarizer: Optional[Summarizer] = None) -> None:
+        """Cria um histórico vazio."""
+        self.system = _Entry({"role": "system", "content": system_prompt},
+                             message_tokens({"role": "system", "content": system_prompt}))
+        self.budget = budget
+        self.keep_recent = keep_recent
+        self.summary_budget = int(budget * SUMMARY_SHARE)
+        self.summarizer = summarizer
+
+        self._window: Deque[_Entry] = deque()
+        self._window_tokens = 0
+        # (linha, tokens) do resumo extrativo
+        self._summary_lines: Deque[Tuple[str, int]] = deque()
+        self._summary_tokens = 0
+        self._summary_text = ""
+        # Tamanho que o histórico teria sem compactação
+        self._full_tokens = self.system.tokens
+        self._folded = 0
+        self.total_saved = 0
+        self.last_stats: Optional[ContextStats] = None
+
+    def append(self, role: str, content: str) -> None:
+        """Acrescenta uma mensagem e compacta o histórico se necessário."""
+        message = {"role": role, "content": content}
+        entry = _Entry(message, message_tokens(message))
+        self._window.append(entry)
+        self._window_tokens += entry.tokens
+        self._full_tokens += entry.tokens
+        self._compact()
+
+    def _summary_cost(self) -> int:
+        """Tokens da mensagem de resumo (zero se não houver resumo)."""
+        if self.summarizer is not None:
+            if not self._summary_text:
+                return 0
+            return estimate_tokens(SUMMARY_HEADER + self._summary_text) + MESSAGE_OVERHEAD
+        if not self._summary_lines:
+            return 0
+        return estimate_tokens(SUMMARY_HEADER) + self._summary_tokens + MESSAGE_OVERHEAD
+
+    def _fold(self, entries: List[_Entry]) -> None:
+        """Incorpora mensagens que saíram da janela ao resumo."""
+        self._folded += len(entries)
+        if self.summarizer is not None:
+            self._summary_text = self.summarizer(self._summary_text, [e.message for e in entries])
+            return
+        for entry in entries:
+            line = summary_line(entry.message)
+            # +1 pela quebra de linha
+            tokens = estimate_tokens(line) + 1
+            self._summary_lines.append((line, tokens))
+            self._summary_tokens += tokens
+        while self._summary_lines and self._summary_tokens > self.summary_budget:
+            self._summary_tokens -= self._summary_lines.popleft()[1]
+
+    def _compact(self) -> None:
+        """Move as mensagens mais antigas para o resumo até caber no orçamento."""
+        def size() -> int:
+            return self.system.tokens + self._summary_cost() + self._window_tokens
+
+        while size() > self.budget and len(self._window) > self.keep_recent:
+            # Sai em pares quando possível, para não separar pergunta e resposta
+            count = 2 if len(self._window) - 2 >= self.keep_recent else 1
+            entries = [self._window.popleft() for _ in range(count)]
+            self._window_tokens -= sum(e.tokens for e in entries)
+            self._fold(entries)
+
+        # Mensagens recentes enormes: descarta as mais antigas, nunca a última
+        while size() > self.budget and len(self._window) > 1:
+            entry = self._window.popleft()
+            self._window_tokens -= entry.tokens
+            self._folded += 1
+
+    @property
+    def summary(self) -> str:
+        """Resumo atual das mensagens que saíram da janela."""
+        if self.summarizer is not None:
+            return self._summary_text
+        return "\n".join(line for line, _ in self._summary_lines)
+
+    def messages(self) -> List[Message]:
+        """Contexto a enviar: sistema, resumo (se houver) e mensagens recentes.
+
+        Atualiza ``last_stats`` e ``total_saved`` com os tokens economizados
+        em relação ao histórico completo.
+        """
+        context = [dict(self.system.message)]
+        summary = self.summary
+        if summary:
+            context.append({"role": "system", "content": SUMMARY_HEADER + summary})
+        context.extend(dict(entry.message) for entry in self._window)
+
+        sent = self.system.tokens + self._summary_cost() + self._window_tokens
+        saved = max(0, self._full_tokens - sent)
+        self.last_stats = ContextStats(sent, self._full_tokens, saved, self._folded)
+        self.total_saved += saved
+        return context
+
+    def stats(self) -> Dict[str, int]:
+        """Tamanho atual do contexto e tokens economizados até agora."""
+        return {
+            "window_messages": len(self._window),
+            "folded_messages": self._folded,
+            "context_tokens": self.system.tokens + self._summary_cost() + self._window_tokens,
+            "full_tokens": self._full_tokens,
+            "last_saved_tokens": self.last_stats.saved_tokens if self.last_stats else 0,
+            "total_saved_tokens": self.total_saved
+        }
@@ -0,0 +1,254 @@
+"""Gerenciador dos arquivos de efemérides do Swiss Ephemeris.
+
+Substitui a verificação feita a cada rerun do Streamlit: a preparação roda
+uma vez por processo (protegida por lock), confere os arquivos contra o
+manifesto SHA-256 em ``data/ephe_manifest.json`` e baixa os que faltam em
+paralelo, gravando em disco por streaming e retomando downloads
+interrompidos a partir do arquivo ``.part``.
+
+Só são baixados arquivos com ``sha256`` e ``size`` fixados no manifesto: o
+que vier da rede sem um hash conhecido para conferir é recusado com
+``EphemerisError``. Hoje apenas o trio ``_18`` (1800–2399, o período do app)
+está fixado; para outros períodos, fixe os valores antes de baixar.
+
+Cada trio ``sepl``/``semo``/``seas`` com sufixo ``_NN`` cobre 600 anos a
+partir do ano ``NN * 100``; ``coverage`` informa quais períodos estão
+disponíveis localmente.
+"""
+
+import hashlib
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+
+import requests
+import swisseph as swe
+
+from ephemeris import EPHE_DIR
+
+MANIFEST_PATH = Path("data") / "ephe_manifest.json"
+# Permite apontar para um espelho (ou um servidor HTTP local nos testes)
+BASE_URL_ENV = "EPHE_BASE_URL"
+
+# (conexão, leitura) em segundos
+DEFAULT_TIMEOUT = (5.0, 30.0)
+DEFAULT_WORKERS = 3
+DEFAULT_RETRIES = 2
+STREAM_CHUNK = 64 * 1024
+# Arquivos usados pelo app: 1800–2399
+DEFAULT_YEARS = (1800, 2399)
+KINDS = ("sepl", "semo", "seas")
+
+
+class ManifestEntry(NamedTuple):
+    """Arquivo de efemérides conhecido; ``sha256`` e ``size`` são ``None`` se não fixados."""
+
+    name: str
+    start_year: int
+    end_year: int
+    sha256: Optional[str] = None
+    size: Optional[int] = None
+
+    @property
+    def pinned(self) -> bool:
+        """Se hash e tamanho estão fixados, condição para baixar o arquivo."""
+        return self.sha256 is not None and self.size is not None
+
+
+class EphemerisError(RuntimeError):
+    """Falha ao obter ou validar um arquivo de efemérides."""
+
+
+def load_manifest(path: Path = MANIFEST_PATH) -> Tuple[str, Dict[str, ManifestEntry]]:
+    """Lê o manifesto: ``(url_base, {nome: entrada})``."""
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    entries = {
+        item["name"]: ManifestEntry(item["name"], item["start_year"], item["end_year"],
+                                    item.get("sha256"), item.get("size"))
+        for item in data["files"]
+    }
+    return data["base_url"], entries
+
+
+def sha256_file(path: Path) -> str:
+    """SHA-256 de um arquivo, lido em blocos."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for block in iter(lambda: f.read(1024 * 1024), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def _merge_ranges(ranges: Iterable[Tuple[int, int]]) -> List[Tuple[int, int]]:
+    """Une intervalos de anos contíguos ou sobrepostos."""
+    merged: List[Tuple[int, int]] = []
+    for start, end in sorted(ranges):
+        if merged and start <= merged[-1][1] + 1:
+            merged[-1] = (merged[-1][0], max(merged[-1][1], end))
+        else:
+            merged.append((start, end))
+    return merged
+
+
+class EphemerisManager:
+    """Verifica, baixa e configura os arquivos de efemérides de um diretório."""
+
+    def __init__(self, directory: Path = EPHE_DIR, manifest_path: Path = MANIFEST_PATH,
+                 base_url: Optional[str] = None, timeout: Tuple[float, float] = DEFAULT_TIMEOUT,
+                 workers: int = DEFAULT_WORKERS, retries: int = DEFAULT_RETRIES,
+                 session: Optional[requests.Session] = None) -> None:
+        """Carrega o manifesto; nada é lido da rede até ``ensure``/``download``."""
+        self.directory = Path(directory)
+        manifest_url, self.entries = load_manifest(manifest_path)
+        self.base_url = base_url or os.environ.get(BASE_URL_ENV) or manifest_url
+        self.timeout = timeout
+        self.workers = workers
+        self.retries = retries
+        self.session = session or requests.Session()
+        self._lock = threading.Lock()
+        self._ready = False
+        # nome -> (tamanho, mtime) do arquivo já verificado
+        self._verified: Dict[str, Tuple[int, float]] = {}
+
+    def entries_for(self, start_year: int, end_year: int) -> List[ManifestEntry]:
+        """Entradas do manifesto que cobrem algum ano de [start_year, end_year]."""
+        return [e for e in self.entries.values()
+                if e.start_year <= end_year and e.end_year >= start_year]
+
+    def is_valid(self, entry: ManifestEntry) -> bool:
+        """Se o arquivo local existe e confere com o manifesto.
+
+        O hash só é recalculado quando tamanho ou mtime mudam.
+        """
+        path = self.directory / entry.name
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            return False
+        signature = (stat.st_size, stat.st_mtime)
+        if self._verified.get(entry.name) == signature:
+            return True
+        if entry.size is not None and stat.st_size != entry.size:
+            return False
+        if entry.sha256 is not None and sha256_file(path) != entry.sha256:
+            return False
+        self._verified[entry.name] = signature
+        return True
+
+    def missing(self, start_year: int = DEFAULT_YEARS[0],
+                end_year: int = DEFAULT_YEARS[1]) -> List[ManifestEntry]:
+        """Arquivos do período ausentes ou que não conferem com o manifesto."""
+        return [e for e in self.entries_for(start_year, end_year) if not self.is_valid(e)]
+
+    def coverage(self) -> List[Tuple[int, int]]:
+        """Períodos (anos, inclusivos) com o trio planetas/Lua/asteroides válido."""
+        by_range: Dict[Tuple[int, int], set] = {}
+        for entry in self.entries.values():
+            if self.is_valid(entry):
+                by_range.setdefault((entry.start_year, entry.end_year), set()).add(entry.name[:4])
+        return _merge_ranges(r for r, kinds in by_range.items() if kinds >= set(KINDS))
+
+    def covers(self, year: int) -> bool:
+        """Se o ano está coberto por arquivos locais."""
+        return any(start <= year <= end for start, end in self.coverage())
+
+    def _fetch(self, entry: ManifestEntry) -> None:
+        """Baixa um arquivo por streaming, retomando de um ``.part`` existente."""
+        path = self.directory / entry.name
+        partial = path.with_name(path.name + ".part")
+        url = self.base_url + entry.name
+        last_error: Optional[Exception] = None
+
+        for _ in range(self.retries + 1):
+            offset = partial.stat().st_size if partial.exists() else 0
+            headers = {"Range": f"bytes={offset}-"} if offset else {}
+            try:
+                with self.session.get(url, headers=headers, stream=True,
+                                      timeout=self.timeout) as response:
+                    if response.status_code == 416:
+                        # O .part já está completo (ou é inválido); o hash decide
+                        pass
+                    else:
+                        response.raise_for_status()
+                        # Sem suporte a Range o servidor manda o arquivo inteiro
+                        mode = "ab" if response.status_code == 206 else "wb"
+                        with open(partial, mode) as f:
+                            for block in response.iter_content(STREAM_CHUNK):
+                                f.write(block)
+            except requests.RequestException as e:
+                last_error = e
+                continue
+
+            if partial.stat().st_size != entry.size or sha256_file(partial) != entry.sha256:
+                partial.unlink()
+                last_error = EphemerisError(f"Checksum inválido para {entry.name}")
+                continue
+            os.replace(partial, path)
+            return
+
+        raise EphemerisError(f"Falha ao baixar {entry.name}: {last_error}")
+
+    def download(self, entries: Iterable[ManifestEntry]) -> List[str]:
+        """Baixa os arquivos em paralelo; retorna os nomes baixados.
+
+        Raises:
+            EphemerisError: Arquivo sem hash e tamanho fixados no manifesto
+                (nada é baixado) ou que não pôde ser obtido e conferido.
+        """
+        entries = list(entries)
+        if not entries:
+            return []
+        unpinned = [e.name for e in entries if not e.pinned]
+        if unpinned:
+            raise EphemerisError(f"Sem SHA-256 e tamanho fixados em {MANIFEST_PATH}: "
+                                 f"{', '.join(unpinned)}")
+        self.directory.mkdir(parents=True, exist_ok=True)
+        with ThreadPoolExecutor(max_workers=min(self.workers, len(entries))) as pool:
+            # list() propaga a primeira exceção
+            list(pool.map(self._fetch, entries))
+        return [e.name for e in entries]
+
+    def ensure(self, start_year: int = DEFAULT_YEARS[0], end_year: int = DEFAULT_YEARS[1]) -> bool:
+        """Garante os arquivos do período e configura o Swiss Ephemeris.
+
+        Roda uma única vez por processo para o período padrão; chamadas
+        seguintes retornam imediatamente. Retorna ``False`` se algum arquivo
+        não pôde ser obtido.
+        """
+        default = (start_year, end_year) == DEFAULT_YEARS
+        if default and self._ready:
+            return True
+        with self._lock:
+            if default and self._ready:
+                return True
+            try:
+                self.download(self.missing(start_year, end_year))
+            except EphemerisError:
+                return False
+            swe.set_ephe_path(str(self.directory))
+            if default:
+                self._ready = True
+            return True
+
+
+_manager: Optional[EphemerisManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_manager() -> EphemerisManager:
+    """Retorna o gerenciador de efemérides compartilhado do processo."""
+    global _manager
+    if _manager is None:
+        with _manager_lock:
+            if _manager is None:
+                _manager = EphemerisManager()
+    return _manager
+
+
+def ensure_ephemeris() -> bool:
+    """Prepara as efemérides padrão uma vez por processo."""
+    return get_manager().ensure()
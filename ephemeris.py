@@ -0,0 +1,129 @@
+"""Cálculo vetorizado de posições planetárias sobre arrays de dias julianos.
+
+``planet_positions_batch`` devolve um ndarray ``(n_jd, n_body, 6)`` com
+longitude, latitude, distância e as três velocidades de cada corpo. Lotes
+grandes são divididos em blocos e distribuídos por um pool de processos;
+cada processo chama ``swe.set_ephe_path`` uma única vez.
+"""
+
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from typing import Optional, Sequence
+
+import numpy as np
+import swisseph as swe
+
+EPHE_DIR = Path("ephe")
+
+PLANETS = {
+    "Sun": swe.SUN,
+    "Moon": swe.MOON,
+    "Mercury": swe.MERCURY,
+    "Venus": swe.VENUS,
+    "Mars": swe.MARS,
+    "Jupiter": swe.JUPITER,
+    "Saturn": swe.SATURN,
+    "Uranus": swe.URANUS,
+    "Neptune": swe.NEPTUNE,
+    "Pluto": swe.PLUTO
+}
+BODY_NAMES = tuple(PLANETS)
+
+SIGNS = ("Áries", "Touro", "Gêmeos", "Câncer", "Leão", "Virgem",
+         "Libra", "Escorpião", "Sagitário", "Capricórnio", "Aquário", "Peixes")
+
+FIELDS = ("longitude", "latitude", "distance",
+          "longitude_speed", "latitude_speed", "distance_speed")
+POSITION_DTYPE = np.dtype([(field, np.float64) for field in FIELDS])
+
+CALC_FLAGS = swe.FLG_SWIEPH | swe.FLG_SPEED
+CHUNK_SIZE = 2048
+# Abaixo disso o custo de subir o pool supera o ganho do paralelismo
+PARALLEL_THRESHOLD = 20000
+
+
+def init_worker(ephe_path: str) -> None:
+    """Inicializador dos processos do pool: configura as efemérides uma vez."""
+    swe.set_ephe_path(ephe_path)
+
+
+def _compute_chunk(jds: np.ndarray, body_ids: Sequence[int], flags: int) -> np.ndarray:
+    """Calcula um bloco de instantes para os corpos pedidos."""
+    out = np.empty((len(jds), len(body_ids), len(FIELDS)), dtype=np.float64)
+    calc_ut = swe.calc_ut
+    for i, jd in enumerate(jds.tolist()):
+        row = out[i]
+        for j, body in enumerate(body_ids):
+            row[j] = calc_ut(jd, body, flags)[0]
+    return out
+
+
+def _body_ids(bodies: Optional[Sequence[str]]) -> tuple:
+    """Converte nomes de corpos (``PLANETS``) nos identificadores do Swiss Ephemeris."""
+    names = BODY_NAMES if bodies is None else tuple(bodies)
+    try:
+        return tuple(PLANETS[name] for name in names)
+    except KeyError as e:
+        raise ValueError(f"Corpo desconhecido: {e.args[0]}") from None
+
+
+def planet_positions_batch(jds: Sequence[float], bodies: Optional[Sequence[str]] = None,
+                           workers: Optional[int] = None, chunk_size: int = CHUNK_SIZE,
+                           structured: bool = False, flags: int = CALC_FLAGS) -> np.ndarray:
+    """Calcula posições para todos os dias julianos de ``jds``.
+
+    Args:
+        jds: Dias julianos (UT), em qualquer formato aceito por ``np.asarray``.
+        bodies: Nomes de ``PLANETS`` a calcular; por padrão, todos os dez.
+        workers: Processos para lotes grandes. ``None`` usa ``os.cpu_count()``
+            a partir de ``PARALLEL_THRESHOLD`` instantes; ``1`` força o cálculo
+            no processo atual.
+        chunk_size: Instantes por bloco. Entre blocos o laço cede o GIL para
+            que outras threads (ex.: sessões do Streamlit) não fiquem travadas.
+        structured: Se verdadeiro, retorna um array estruturado
+            ``(n_jd, n_body)`` com os campos de ``FIELDS``.
+        flags: Flags repassadas ao ``swe.calc_ut``.
+
+    Returns:
+        ndarray ``(n_jd, n_body, 6)`` na ordem de ``FIELDS``.
+    """
+    jd_array = np.ascontiguousarray(np.asarray(jds, dtype=np.float64).ravel())
+    body_ids = _body_ids(bodies)
+    n = len(jd_array)
+
+    if workers is None:
+        workers = (os.cpu_count() or 1) if n >= PARALLEL_THRESHOLD else 1
+
+    if workers > 1 and n > chunk_size:
+        out = np.empty((n, len(body_ids), len(FIELDS)), dtype=np.float64)
+        starts = range(0, n, chunk_size)
+        with ProcessPoolExecutor(max_workers=workers, initializer=init_worker,
+                                 initargs=(str(EPHE_DIR),)) as pool:
+            futures = [
+                (start, pool.submit(_compute_chunk, jd_array[start:start + chunk_size], body_ids, flags))
+                for start in starts
+            ]
+            for start, future in futures:
+                chunk = future.result()
+                out[start:start + len(chunk)] = chunk
+    else:
+        parts = []
+        for start in range(0, n, chunk_size):
+            parts.append(_compute_chunk(jd_array[start:start + chunk_size], body_ids, flags))
+            # Cede o GIL entre blocos
+            time.sleep(0)
+        if parts:
+            out = np.concatenate(parts)
+        else:
+            out = np.empty((0, len(body_ids), len(FIELDS)), dtype=np.float64)
+
+    if structured:
+        return as_structured(out)
+    return out
+
+
+def as_structured(positions: np.ndarray) -> np.ndarray:
+    """Visão estruturada (sem cópia) de um array ``(..., 6)`` de posições."""
+    return np.ascontiguousarray(positions).view(POSITION_DTYPE)[..., 0]
@@ -0,0 +1,460 @@
+"""Efemérides pré-calculadas (1900–2100) em polinômios de Chebyshev.
+
+Para varreduras grandes, chamar ``swe.calc_ut`` por instante e por corpo é o
+gargalo. Este módulo avalia uma única vez os dez corpos de
+``get_planet_positions`` em todo o período, ajusta por segmento de tempo
+polinômios de Chebyshev à longitude, latitude e distância, e grava os
+coeficientes num arquivo binário float64 compacto (~10 MB). Em tempo de
+execução o arquivo é aberto com ``np.memmap``: abrir é instantâneo, só as
+páginas consultadas são lidas e processos diferentes compartilham as mesmas
+páginas do cache do sistema.
+
+Precisão em relação ao Swiss Ephemeris (mesmas flags de
+``ephemeris.CALC_FLAGS``), gravada no próprio arquivo (veja
+``EphemerisTable.accuracy``). Ela é medida na geração em pontos aleatórios
+e numa varredura densa em volta de cada conjunção com o Sol.
+
+A deflexão gravitacional da luz pelo Sol cresce perto da conjunção (~3″ a
+0,1° do Sol, até ~15″ atrás do disco) e muda em horas, rápido demais para
+os polinômios. Por isso os planetas são ajustados sem ela
+(``FLG_NOGDEFL``), e a deflexão é somada na consulta, vetorizada, com a
+mesma fórmula do Swiss Ephemeris: ``swi_deflect_light``, com a massa solar
+efetiva para raios que passam dentro do disco (``SOLAR_MASS_FRACTION``).
+O que resta é erro de ajuste, em torno de 0,1″; atrás do disco solar a
+interpolação da massa efetiva acrescenta até ~0,3″. As velocidades são as
+derivadas dos polinômios mais, a menos de 5° do Sol, a variação da
+deflexão (diferença central); ficam a menos de 0,0001°/dia das do Swiss
+Ephemeris, salvo atrás do disco solar (até ~0,02°/dia).
+
+Para gerar a tabela (cerca de um minuto, requer os arquivos ``.se1``)::
+
+    python ephemeris_table.py
+"""
+
+import math
+import struct
+import sys
+import threading
+from pathlib import Path
+from typing import Callable, Dict, NamedTuple, Optional, Sequence, Tuple
+
+import numpy as np
+import swisseph as swe
+
+from ephemeris import (BODY_NAMES, CALC_FLAGS, EPHE_DIR, FIELDS, PLANETS, as_structured,
+                       init_worker, planet_positions_batch)
+
+TABLE_PATH = Path("data") / "ephemeris_1900_2100.cheb"
+START_YEAR = 1900
+END_YEAR = 2100
+
+# (dias por segmento, coeficientes por componente), escolhidos para que o
+# erro de ajuste fique abaixo do ruído do próprio Swiss Ephemeris
+SEGMENTS = {
+    "Sun": (16.0, 10),
+    "Moon": (8.0, 14),
+    "Mercury": (16.0, 12),
+    "Venus": (32.0, 12),
+    "Mars": (16.0, 12),
+    "Jupiter": (32.0, 10),
+    "Saturn": (32.0, 10),
+    "Uranus": (32.0, 10),
+    "Neptune": (32.0, 10),
+    "Pluto": (32.0, 10)
+}
+VALIDATION_POINTS = 20000
+VALIDATION_SEED = 1900
+# Varredura densa de validação em volta de cada conjunção com o Sol (dias)
+CONJUNCTION_WINDOW = 1.5
+CONJUNCTION_STEP = 0.01
+
+# Corpos cuja luz o Sol deflete: ajustados sem deflexão, somada na consulta
+DEFLECTED_BODIES = frozenset(BODY_NAMES) - {"Sun", "Moon"}
+FIT_FLAGS = CALC_FLAGS | swe.FLG_NOGDEFL
+# 2GM☉/c² e raio solar, em UA (constantes do Swiss Ephemeris)
+_DEFLECTION_AU = 2.0 * 1.32712440017987e20 / 299792458.0 ** 2 / 1.49597870700e11
+_SUN_RADIUS_AU = 6.96e8 / 1.49597870700e11
+# Fração efetiva da massa solar para um raio de luz que passa a r raios
+# solares do centro, r = 0, 0,025, ..., 1. Tabelada a partir do próprio Swiss
+# Ephemeris (razão entre a deflexão dele e a de uma massa pontual); a
+# interpolação linear fica a menos de 0,3% dela
+SOLAR_MASS_FRACTION = np.array([
+    0.0, 0.0152, 0.0551, 0.1153, 0.1869, 0.267, 0.3499, 0.4314, 0.5085, 0.5792,
+    0.6425, 0.698, 0.7457, 0.7865, 0.8208, 0.8501, 0.8743, 0.8947, 0.9114, 0.926,
+    0.9378, 0.9476, 0.9565, 0.9642, 0.9702, 0.9752, 0.9798, 0.9837, 0.9868, 0.9894,
+    0.9918, 0.9937, 0.9952, 0.9966, 0.9976, 0.9984, 0.999, 0.9994, 0.9997, 0.9999, 1.0
+])
+_MASS_RADII = np.linspace(0.0, 1.0, len(SOLAR_MASS_FRACTION))
+# Até esta elongação (graus) a variação da deflexão entra nas velocidades,
+# por diferença central com este passo (dias)
+DEFLECTION_RATE_ELONGATION = 5.0
+DEFLECTION_RATE_STEP = 0.001
+_DEFLECTION_RATE_COS = math.cos(math.radians(DEFLECTION_RATE_ELONGATION))
+# Instantes avaliados por bloco nas consultas (limita a memória temporária)
+QUERY_CHUNK = 65536
+
+_MAGIC = b"CHEB"
+_VERSION = 2
+# magic, versão, corpos, início e fim (dias julianos UT)
+_HEADER = struct.Struct("<4sHHdd")
+# id do corpo, coeficientes, flags, dias por segmento, segmentos,
+# offset dos coeficientes (em float64), erros máximos medidos
+_BODY = struct.Struct("<iHHdIQdddd")
+# Coeficientes ajustados sem deflexão da luz: aplicar na consulta
+_FLAG_DEFLECTION = 1
+
+
+class Accuracy(NamedTuple):
+    """Maior erro medido contra o Swiss Ephemeris."""
+
+    longitude_arcsec: float
+    latitude_arcsec: float
+    distance_relative: float
+    longitude_speed: float
+
+
+class _BodyTable(NamedTuple):
+    """Coeficientes ``(segmentos, 3, n_coef)`` de um corpo, como visão do memmap."""
+
+    body_id: int
+    segment_days: float
+    coefficients: np.ndarray
+    accuracy: Accuracy
+    deflected: bool
+
+
+def _nodes(n_coef: int) -> np.ndarray:
+    """Nós de Chebyshev (zeros de T_n) em [-1, 1]."""
+    return np.cos(np.pi * (np.arange(n_coef) + 0.5) / n_coef)
+
+
+def _fit_matrix(n_coef: int) -> np.ndarray:
+    """Matriz que leva os valores nos nós aos coeficientes de Chebyshev."""
+    k = np.arange(n_coef)[:, None]
+    j = np.arange(n_coef)[None, :]
+    matrix = np.cos(np.pi * k * (j + 0.5) / n_coef) * (2.0 / n_coef)
+    matrix[0] /= 2.0
+    return matrix
+
+
+def _basis(u: np.ndarray, n_coef: int) -> np.ndarray:
+    """T_0..T_{n-1} e suas derivadas em ``u``: array ``(n, n_coef, 2)``."""
+    # Montada como (n_coef, 2, n) para que cada passo escreva memória contígua
+    basis = np.empty((n_coef, 2, len(u)))
+    basis[0, 0] = 1.0
+    basis[0, 1] = 0.0
+    if n_coef > 1:
+        basis[1, 0] = u
+        basis[1, 1] = 1.0
+    two_u = 2.0 * u
+    for k in range(2, n_coef):
+        np.multiply(two_u, basis[k - 1, 0], out=basis[k, 0])
+        basis[k, 0] -= basis[k - 2, 0]
+        np.multiply(two_u, basis[k - 1, 1], out=basis[k, 1])
+        basis[k, 1] += 2.0 * basis[k - 1, 0]
+        basis[k, 1] -= basis[k - 2, 1]
+    return np.ascontiguousarray(basis.transpose(2, 0, 1))
+
+
+def _unit_vectors(longitude: np.ndarray, latitude: np.ndarray) -> np.ndarray:
+    """Vetores unitários ``(..., 3)`` de longitudes e latitudes eclípticas (graus)."""
+    lon, lat = np.radians(longitude), np.radians(latitude)
+    return np.stack([np.cos(lat) * np.cos(lon), np.cos(lat) * np.sin(lon), np.sin(lat)], axis=-1)
+
+
+def _deflect(planet: np.ndarray, sun: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    """Longitude e latitude defletidas e cosseno da elongação de ``planet``.
+
+    Mesma fórmula do ``swi_deflect_light`` do Swiss Ephemeris; ``planet`` e
+    ``sun`` são posições geocêntricas ``(n, ≥3)`` nos mesmos instantes.
+    """
+    u = _unit_vectors(planet[:, 0], planet[:, 1])
+    sun_vector = _unit_vectors(sun[:, 0], sun[:, 1]) * sun[:, 2:3]
+    # Terra e planeta vistos do Sol
+    earth = -sun_vector
+    earth_distance = np.linalg.norm(earth, axis=1)
+    e = earth / earth_distance[:, None]
+    q = u * planet[:, 2:3] - sun_vector
+    q /= np.linalg.norm(q, axis=1)[:, None]
+    ue = np.einsum("nc,nc->n", u, e)
+
+    g1 = _DEFLECTION_AU / earth_distance
+    # Raio que passa dentro do disco solar: só a massa interna a ele deflete
+    sin_passage = np.sqrt(np.maximum(1.0 - ue * ue, 0.0))
+    g1 *= np.interp(sin_passage * earth_distance / _SUN_RADIUS_AU, _MASS_RADII, SOLAR_MASS_FRACTION)
+    g2 = 1.0 + np.einsum("nc,nc->n", q, e)
+    factor = (g1 / g2)[:, None]
+    deflected = u + factor * (np.einsum("nc,nc->n", u, q)[:, None] * e - ue[:, None] * q)
+    longitude = np.degrees(np.arctan2(deflected[:, 1], deflected[:, 0]))
+    latitude = np.degrees(np.arctan2(deflected[:, 2], np.hypot(deflected[:, 0], deflected[:, 1])))
+    return longitude, latitude, -ue
+
+
+def apply_light_deflection(planet: np.ndarray, sun: np.ndarray) -> None:
+    """Soma a deflexão gravitacional da luz às posições ``(n, 6)`` de ``planet``.
+
+    ``sun`` são as posições geocêntricas do Sol nos mesmos instantes.
+    Longitude e latitude são alteradas no lugar; perto do Sol, onde a
+    deflexão muda em horas, a variação dela entra também nas velocidades.
+    """
+    longitude, latitude, cos_elongation = _deflect(planet, sun)
+    near = np.flatnonzero(cos_elongation > _DEFLECTION_RATE_COS)
+    if near.size:
+        shift = np.array([-DEFLECTION_RATE_STEP, DEFLECTION_RATE_STEP])[:, None, None]
+        # Posições extrapoladas pelas velocidades a ±DEFLECTION_RATE_STEP
+        planets = (planet[near, :3] + shift * planet[near, 3:6]).reshape(-1, 3)
+        suns = (sun[near, :3] + shift * sun[near, 3:6]).reshape(-1, 3)
+        shifted_longitude, shifted_latitude, _ = _deflect(planets, suns)
+        delta_longitude = ((shifted_longitude - planets[:, 0] + 180.0) % 360.0 - 180.0).reshape(2, -1)
+        delta_latitude = (shifted_latitude - planets[:, 1]).reshape(2, -1)
+        planet[near, 3] += (delta_longitude[1] - delta_longitude[0]) / (2 * DEFLECTION_RATE_STEP)
+        planet[near, 4] += (delta_latitude[1] - delta_latitude[0]) / (2 * DEFLECTION_RATE_STEP)
+    planet[:, 0] = longitude
+    planet[:, 1] = latitude
+
+
+def _segment_coordinates(jds: np.ndarray, start_jd: float, segment_days: float,
+                         n_segments: int) -> Tuple[np.ndarray, np.ndarray]:
+    """Segmento de cada instante e sua posição ``u`` em [-1, 1] dentro dele."""
+    offset = jds - start_jd
+    segment = np.clip((offset // segment_days).astype(np.int64), 0, n_segments - 1)
+    u = 2.0 * (offset - segment * segment_days) / segment_days - 1.0
+    return segment, u
+
+
+def _fit_body(name: str, start_jd: float, end_jd: float,
+              workers: Optional[int]) -> Tuple[np.ndarray, float]:
+    """Coeficientes ``(segmentos, 3, n_coef)`` de um corpo e a duração do segmento."""
+    segment_days, n_coef = SEGMENTS[name]
+    n_segments = math.ceil((end_jd - start_jd) / segment_days)
+    starts = start_jd + segment_days * np.arange(n_segments)
+    jds = (starts[:, None] + segment_days * (_nodes(n_coef) + 1.0) / 2.0).ravel()
+    flags = FIT_FLAGS if name in DEFLECTED_BODIES else CALC_FLAGS
+    values = planet_positions_batch(jds, [name], workers=workers, flags=flags)[:, 0, :3]
+    values = values.reshape(n_segments, n_coef, 3)
+    # Longitude contínua dentro do segmento (os nós estão em ordem temporal)
+    values[..., 0] = np.unwrap(values[..., 0], period=360.0, axis=1)
+    return np.einsum("kj,sjc->sck", _fit_matrix(n_coef), values), segment_days
+
+
+def _conjunctions(name: str, start_jd: float, end_jd: float, workers: Optional[int]) -> np.ndarray:
+    """Instantes aproximados (a um dia) das menores distâncias do corpo ao Sol."""
+    jds = np.arange(start_jd, end_jd, 1.0)
+    positions = planet_positions_batch(jds, ["Sun", name], workers=workers)
+    vectors = _unit_vectors(positions[:, :, 0], positions[:, :, 1])
+    cos_elongation = np.einsum("nc,nc->n", vectors[:, 0], vectors[:, 1])
+    inner = cos_elongation[1:-1]
+    minima = (inner > cos_elongation[:-2]) & (inner >= cos_elongation[2:])
+    return jds[1:-1][minima]
+
+
+def _measure(name: str, table: "EphemerisTable", start_jd: float, end_jd: float,
+             workers: Optional[int]) -> Accuracy:
+    """Erro máximo da tabela contra o Swiss Ephemeris.
+
+    Em pontos aleatórios e, para corpos que não são o Sol, numa grade de
+    ``CONJUNCTION_STEP`` dias em volta de cada conjunção com o Sol.
+    """
+    rng = np.random.default_rng(VALIDATION_SEED)
+    jds = rng.uniform(start_jd, end_jd, VALIDATION_POINTS)
+    if name != "Sun":
+        offsets = np.arange(-CONJUNCTION_WINDOW, CONJUNCTION_WINDOW, CONJUNCTION_STEP)
+        dense = (_conjunctions(name, start_jd, end_jd, workers)[:, None] + offsets).ravel()
+        jds = np.concatenate([jds, dense[(dense >= start_jd) & (dense <= end_jd)]])
+    reference = planet_positions_batch(jds, [name], workers=workers)[:, 0]
+    approx = table.positions(jds, [name])[:, 0]
+    longitude = np.abs((approx[:, 0] - reference[:, 0] + 180.0) % 360.0 - 180.0) * 3600
+    latitude = np.abs(approx[:, 1] - reference[:, 1]) * 3600
+    distance = np.abs(approx[:, 2] - reference[:, 2]) / reference[:, 2]
+    speed = np.abs(approx[:, 3] - reference[:, 3])
+    return Accuracy(float(longitude.max()), float(latitude.max()), float(distance.max()),
+                    float(speed.max()))
+
+
+def _write(destination: Path, start_jd: float, end_jd: float,
+           bodies: Dict[str, Tuple[np.ndarray, float]], accuracy: Dict[str, Accuracy]) -> None:
+    """Grava cabeçalho, diretório de corpos e coeficientes (little-endian)."""
+    offset = 0
+    entries = []
+    for name, (coefficients, segment_days) in bodies.items():
+        n_segments, _, n_coef = coefficients.shape
+        flags = _FLAG_DEFLECTION if name in DEFLECTED_BODIES else 0
+        entries.append(_BODY.pack(PLANETS[name], n_coef, flags, segment_days, n_segments,
+                                  offset, *accuracy.get(name, Accuracy(0.0, 0.0, 0.0, 0.0))))
+        offset += coefficients.size
+
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    tmp = destination.with_suffix(destination.suffix + ".tmp")
+    with open(tmp, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, len(bodies), start_jd, end_jd))
+        for entry in entries:
+            f.write(entry)
+        f.write(b"\0" * (-f.tell() % 8))
+        for coefficients, _ in bodies.values():
+            f.write(np.ascontiguousarray(coefficients, dtype="<f8").tobytes())
+    tmp.replace(destination)
+
+
+def build_table(destination: Path = TABLE_PATH, start_year: int = START_YEAR,
+                end_year: int = END_YEAR, workers: Optional[int] = None,
+                progress: Optional[Callable[[str], None]] = None) -> Dict[str, Accuracy]:
+    """Calcula, grava e valida a tabela de ``start_year`` até o fim de ``end_year``.
+
+    Retorna o erro máximo medido de cada corpo (também gravado no arquivo).
+    """
+    init_worker(str(EPHE_DIR))
+    start_jd = swe.julday(start_year, 1, 1, 0.0)
+    end_jd = swe.julday(end_year + 1, 1, 1, 0.0)
+
+    bodies = {}
+    for name in BODY_NAMES:
+        if progress is not None:
+            progress(name)
+        bodies[name] = _fit_body(name, start_jd, end_jd, workers)
+
+    # Grava, mede a tabela gravada e regrava com os erros no diretório
+    _write(destination, start_jd, end_jd, bodies, {})
+    table = EphemerisTable(destination)
+    accuracy = {name: _measure(name, table, start_jd, end_jd, workers) for name in BODY_NAMES}
+    del table
+    _write(destination, start_jd, end_jd, bodies, accuracy)
+    return accuracy
+
+
+class EphemerisTable:
+    """Tabela de Chebyshev aberta por ``np.memmap`` (somente leitura)."""
+
+    def __init__(self, path: Path = TABLE_PATH) -> None:
+        """Lê o cabeçalho e mapeia os coeficientes, sem carregá-los na memória."""
+        with open(path, "rb") as f:
+            header = f.read(_HEADER.size)
+            magic, version, n_bodies, self.start_jd, self.end_jd = _HEADER.unpack(header)
+            if magic != _MAGIC or version != _VERSION:
+                raise ValueError("Tabela de efemérides inválida ou de versão incompatível")
+            directory = f.read(_BODY.size * n_bodies)
+        data_offset = _HEADER.size + len(directory)
+        data_offset += -data_offset % 8
+        self._data = np.memmap(path, dtype="<f8", mode="r", offset=data_offset)
+
+        self._bodies: Dict[str, _BodyTable] = {}
+        names = {body_id: name for name, body_id in PLANETS.items()}
+        for i in range(n_bodies):
+            (body_id, n_coef, flags, segment_days, n_segments, offset,
+             *errors) = _BODY.unpack_from(directory, i * _BODY.size)
+            coefficients = self._data[offset:offset + n_segments * 3 * n_coef]
+            self._bodies[names[body_id]] = _BodyTable(
+                body_id, segment_days, coefficients.reshape(n_segments, 3, n_coef),
+                Accuracy(*errors), bool(flags & _FLAG_DEFLECTION))
+        if any(body.deflected for body in self._bodies.values()) and "Sun" not in self._bodies:
+            raise ValueError("Tabela de efemérides sem o Sol, necessário para a deflexão da luz")
+
+    def _evaluate(self, body: _BodyTable, jds: np.ndarray) -> np.ndarray:
+        """Valores e derivadas dos polinômios de um corpo: ``(n, 6)``."""
+        segment, u = _segment_coordinates(jds, self.start_jd, body.segment_days,
+                                          len(body.coefficients))
+        coefficients = np.take(body.coefficients, segment, axis=0)
+        # (n, 3, n_coef) @ (n, n_coef, 2): valor e derivada de cada componente
+        result = np.matmul(coefficients, _basis(u, coefficients.shape[2]))
+        values = np.empty((len(jds), len(FIELDS)))
+        values[:, :3] = result[..., 0]
+        values[:, 3:] = result[..., 1] * (2.0 / body.segment_days)
+        return values
+
+    @property
+    def bodies(self) -> Tuple[str, ...]:
+        """Corpos presentes na tabela."""
+        return tuple(self._bodies)
+
+    @property
+    def accuracy(self) -> Dict[str, Accuracy]:
+        """Erro máximo medido na geração, por corpo."""
+        return {name: body.accuracy for name, body in self._bodies.items()}
+
+    def covers(self, jds: Sequence[float]) -> bool:
+        """Se todos os instantes estão dentro do período da tabela."""
+        jd_array = np.asarray(jds, dtype=np.float64)
+        return bool(jd_array.size == 0 or
+                    (jd_array.min() >= self.start_jd and jd_array.max() <= self.end_jd))
+
+    def positions(self, jds: Sequence[float], bodies: Optional[Sequence[str]] = None,
+                  structured: bool = False) -> np.ndarray:
+        """Posições no mesmo formato de ``planet_positions_batch``.
+
+        Args:
+            jds: Dias julianos (UT) dentro de [``start_jd``, ``end_jd``].
+            bodies: Corpos a avaliar; por padrão, todos.
+            structured: Retorna um array estruturado com os campos de ``FIELDS``.
+
+        Returns:
+            ndarray ``(n_jd, n_body, 6)``: longitude, latitude, distância e
+            suas velocidades por dia.
+
+        Raises:
+            ValueError: Instante fora do período ou corpo ausente da tabela.
+        """
+        jd_array = np.ascontiguousarray(np.asarray(jds, dtype=np.float64).ravel())
+        names = self.bodies if bodies is None else tuple(bodies)
+        missing = [name for name in names if name not in self._bodies]
+        if missing:
+            raise ValueError(f"Corpo ausente da tabela de efemérides: {missing[0]}")
+        if not self.covers(jd_array):
+            raise ValueError(f"Instante fora da tabela de efemérides "
+                             f"({self.start_jd} a {self.end_jd})")
+
+        out = np.empty((len(jd_array), len(names), len(FIELDS)), dtype=np.float64)
+        for start in range(0, len(jd_array), QUERY_CHUNK):
+            chunk = jd_array[start:start + QUERY_CHUNK]
+            rows = out[start:start + len(chunk)]
+            sun = None
+            for j, name in enumerate(names):
+                body = self._bodies[name]
+                rows[:, j] = self._evaluate(body, chunk)
+                if body.deflected:
+                    if sun is None:
+                        sun = self._evaluate(self._bodies["Sun"], chunk)
+                    apply_light_deflection(rows[:, j], sun)
+        out[..., 0] %= 360.0
+
+        if structured:
+            return as_structured(out)
+        return out
+
+
+_tables: Dict[Path, Optional[EphemerisTable]] = {}
+_tables_lock = threading.Lock()
+
+
+def get_table(path: Path = TABLE_PATH) -> Optional[EphemerisTable]:
+    """Abre a tabela uma única vez por processo.
+
+    ``None`` se o arquivo não existir ou for de outra versão (regenere com
+    ``python ephemeris_table.py``); ``positions_batch`` então usa o Swiss
+    Ephemeris.
+    """
+    if path not in _tables:
+        with _tables_lock:
+            if path not in _tables:
+                try:
+                    _tables[path] = EphemerisTable(path)
+                except (FileNotFoundError, ValueError):
+                    return None
+    return _tables[path]
+
+
+def positions_batch(jds: Sequence[float], bodies: Optional[Sequence[str]] = None,
+                    structured: bool = False) -> np.ndarray:
+    """Posições pela tabela quando ela existe e cobre os instantes; senão, ``swe.calc_ut``."""
+    table = get_table()
+    names = BODY_NAMES if bodies is None else tuple(bodies)
+    if table is not None and table.covers(jds) and set(names) <= set(table.bodies):
+        return table.positions(jds, names, structured)
+    return planet_positions_batch(jds, names, structured=structured)
+
+
+if __name__ == "__main__":
+    errors = build_table(progress=lambda name: print(f"Ajustando {name}...", file=sys.stderr))
+    print(f"Tabela gravada em {TABLE_PATH} ({TABLE_PATH.stat().st_size / 1e6:.1f} MB)")
+    print(f"{'corpo':<10} {'longitude':>10} {'latitude':>10} {'distância':>10} {'vel. long.':>12}")
+    for name, accuracy in errors.items():
+        print(f"{name:<10} {accuracy.longitude_arcsec:>9.4f}\" {accuracy.latitude_arcsec:>9.4f}\" "
+              f"{accuracy.distance_relative:>10.1e} {accuracy.longitude_speed:>9.1e}°/d")
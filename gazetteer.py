@@ -0,0 +1,355 @@
+"""Gazetteer offline dos municípios brasileiros.
+
+O índice é gerado uma única vez a partir da planilha do IBGE distribuída em
+``attached_assets`` e gravado em ``data/gazetteer.idx``. Em tempo de execução
+apenas esse arquivo binário é lido, sem pandas, xlrd ou timezonefinder.
+
+Para regenerar o índice (requer ``pandas``, ``xlrd`` e ``timezonefinder``)::
+
+    python gazetteer.py
+"""
+
+import bisect
+import difflib
+import re
+import struct
+import sys
+import threading
+import unicodedata
+from array import array
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+SOURCE_XLS = Path("attached_assets") / "anexo_16261_Coordenadas_Sedes_5565_Municípios_2010.xls"
+INDEX_PATH = Path("data") / "gazetteer.idx"
+
+_MAGIC = b"GZTR"
+_VERSION = 1
+_HEADER = struct.Struct("<4sHHI")
+_BLOB_LEN = struct.Struct("<I")
+
+# Códigos IBGE das unidades da federação (dois primeiros dígitos do geocódigo)
+UF_CODES = {
+    11: "RO", 12: "AC", 13: "AM", 14: "RR", 15: "PA", 16: "AP", 17: "TO",
+    21: "MA", 22: "PI", 23: "CE", 24: "RN", 25: "PB", 26: "PE", 27: "AL",
+    28: "SE", 29: "BA", 31: "MG", 32: "ES", 33: "RJ", 35: "SP", 41: "PR",
+    42: "SC", 43: "RS", 50: "MS", 51: "MT", 52: "GO", 53: "DF"
+}
+
+UF_NAMES = {
+    "RO": "Rondônia", "AC": "Acre", "AM": "Amazonas", "RR": "Roraima",
+    "PA": "Pará", "AP": "Amapá", "TO": "Tocantins", "MA": "Maranhão",
+    "PI": "Piauí", "CE": "Ceará", "RN": "Rio Grande do Norte",
+    "PB": "Paraíba", "PE": "Pernambuco", "AL": "Alagoas", "SE": "Sergipe",
+    "BA": "Bahia", "MG": "Minas Gerais", "ES": "Espírito Santo",
+    "RJ": "Rio de Janeiro", "SP": "São Paulo", "PR": "Paraná",
+    "SC": "Santa Catarina", "RS": "Rio Grande do Sul",
+    "MS": "Mato Grosso do Sul", "MT": "Mato Grosso", "GO": "Goiás",
+    "DF": "Distrito Federal"
+}
+
+# Sem UF, só capitais são resolvidas offline; com homônimos, a capital vence
+CAPITAL_GEOCODES = frozenset({
+    1100205, 1200401, 1302603, 1400100, 1501402, 1600303, 1721000,
+    2111300, 2211001, 2304400, 2408102, 2507507, 2611606, 2704302,
+    2800308, 2927408, 3106200, 3205309, 3304557, 3550308, 4106902,
+    4205407, 4314902, 5002704, 5103403, 5208707, 5300108
+})
+
+_COUNTRY_ALIASES = frozenset({"brasil", "brazil", "br"})
+_LOWERCASE_WORDS = frozenset({"de", "da", "do", "das", "dos", "e"})
+_QUERY_SEPARATORS = re.compile(r"\s*(?:,|/|;|\s-\s)\s*")
+
+# Só aplicado a consultas qualificadas ("..., SP" ou "..., Brasil"): sem
+# qualificador, "Paris" viraria Parisi (SP) e nunca chegaria ao Nominatim
+FUZZY_CUTOFF = 0.85
+
+
+class ParsedQuery(NamedTuple):
+    """Consulta separada em nome normalizado, UF e se citou UF ou o Brasil."""
+
+    key: str
+    uf: Optional[str]
+    qualified: bool
+
+
+class Place(NamedTuple):
+    """Município encontrado no gazetteer."""
+
+    name: str
+    uf: str
+    latitude: float
+    longitude: float
+    timezone: str
+    geocode: int
+
+
+def normalize_name(text: str) -> str:
+    """Normaliza um nome removendo acentos, caixa e espaços redundantes."""
+    decomposed = unicodedata.normalize("NFKD", text)
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    stripped = stripped.replace("’", "'").replace("`", "'")
+    return " ".join(stripped.casefold().split())
+
+
+_UF_LOOKUP = {normalize_name(sigla): sigla for sigla in UF_NAMES}
+_UF_LOOKUP.update({normalize_name(nome): sigla for sigla, nome in UF_NAMES.items()})
+
+
+def _display_name(raw_name: str) -> str:
+    """Converte o nome em caixa alta da planilha para a grafia usual."""
+    words = raw_name.strip().lower().split()
+    result = []
+    for i, word in enumerate(words):
+        if i > 0 and word in _LOWERCASE_WORDS:
+            result.append(word)
+        elif word.startswith("d'") and len(word) > 2:
+            result.append("D'" + word[2:].capitalize())
+        else:
+            result.append(word.capitalize())
+    return " ".join(result)
+
+
+def _write_blob(handle, items: List[str]) -> None:
+    """Grava uma lista de strings como um bloco UTF-8 prefixado pelo tamanho."""
+    blob = "\n".join(items).encode("utf-8")
+    handle.write(_BLOB_LEN.pack(len(blob)))
+    handle.write(blob)
+
+
+def _read_blob(data: bytes, offset: int) -> Tuple[List[str], int]:
+    """Lê um bloco gravado por ``_write_blob`` e retorna o novo offset."""
+    (size,) = _BLOB_LEN.unpack_from(data, offset)
+    offset += _BLOB_LEN.size
+    blob = data[offset:offset + size].decode("utf-8")
+    return (blob.split("\n") if blob else []), offset + size
+
+
+def _read_array(typecode: str, data: bytes, offset: int, count: int) -> Tuple[array, int]:
+    """Lê ``count`` elementos little-endian de um array binário."""
+    values = array(typecode)
+    size = values.itemsize * count
+    values.frombytes(data[offset:offset + size])
+    if sys.byteorder == "big":
+        values.byteswap()
+    return values, offset + size
+
+
+def build_index(source: Path = SOURCE_XLS, destination: Path = INDEX_PATH) -> int:
+    """Gera o índice binário a partir da planilha do IBGE.
+
+    O fuso horário de cada sede é resolvido aqui, uma única vez, para que a
+    consulta em tempo de execução não precise carregar os polígonos.
+    Retorna a quantidade de municípios indexados.
+    """
+    import pandas as pd
+    from timezonefinder import TimezoneFinder
+
+    frame = pd.read_excel(source)
+    tf = TimezoneFinder()
+
+    rows = []
+    for geocode, raw_name, lon, lat in frame[
+        ["GEOCODIGO_MUNICIPIO", "NOME_MUNICIPIO", "LONGITUDE", "LATITUDE"]
+    ].itertuples(index=False):
+        timezone_str = tf.timezone_at(lat=float(lat), lng=float(lon))
+        if not timezone_str:
+            raise ValueError(f"Fuso horário não encontrado para {raw_name}")
+        rows.append((normalize_name(raw_name), _display_name(raw_name),
+                     int(geocode), float(lat), float(lon), timezone_str))
+
+    rows.sort(key=lambda row: (row[0], row[2]))
+    timezones = sorted({row[5] for row in rows})
+    tz_index = {tz: i for i, tz in enumerate(timezones)}
+
+    geocodes = array("i", (row[2] for row in rows))
+    lats = array("d", (row[3] for row in rows))
+    lons = array("d", (row[4] for row in rows))
+    tz_ids = array("B", (tz_index[row[5]] for row in rows))
+    if sys.byteorder == "big":
+        for values in (geocodes, lats, lons):
+            values.byteswap()
+
+    destination.parent.mkdir(parents=True, exist_ok=True)
+    with open(destination, "wb") as f:
+        f.write(_HEADER.pack(_MAGIC, _VERSION, len(timezones), len(rows)))
+        _write_blob(f, timezones)
+        _write_blob(f, [row[0] for row in rows])
+        _write_blob(f, [row[1] for row in rows])
+        for values in (geocodes, lats, lons, tz_ids):
+            f.write(values.tobytes())
+
+    return len(rows)
+
+
+class GazetteerIndex:
+    """Índice em memória dos municípios, ordenado pelo nome normalizado."""
+
+    __slots__ = ("keys", "names", "geocodes", "latitudes", "longitudes",
+                 "timezones", "tz_ids", "_by_key", "_unique_keys")
+
+    def __init__(self, data: bytes) -> None:
+        """Decodifica o conteúdo de ``data/gazetteer.idx``."""
+        magic, version, n_tz, count = _HEADER.unpack_from(data, 0)
+        if magic != _MAGIC or version != _VERSION:
+            raise ValueError("Índice do gazetteer inválido ou de versão incompatível")
+
+        offset = _HEADER.size
+        self.timezones, offset = _read_blob(data, offset)
+        self.keys, offset = _read_blob(data, offset)
+        self.names, offset = _read_blob(data, offset)
+        self.geocodes, offset = _read_array("i", data, offset, count)
+        self.latitudes, offset = _read_array("d", data, offset, count)
+        self.longitudes, offset = _read_array("d", data, offset, count)
+        self.tz_ids, offset = _read_array("B", data, offset, count)
+
+        if len(self.timezones) != n_tz or len(self.keys) != count:
+            raise ValueError("Índice do gazetteer corrompido")
+
+        self._by_key: Dict[str, List[int]] = {}
+        for i, key in enumerate(self.keys):
+            self._by_key.setdefault(key, []).append(i)
+        self._unique_keys = list(self._by_key)
+
+    def __len__(self) -> int:
+        """Quantidade de municípios indexados."""
+        return len(self.keys)
+
+    def place(self, row: int) -> Place:
+        """Monta o ``Place`` correspondente a uma linha do índice."""
+        geocode = self.geocodes[row]
+        return Place(
+            name=self.names[row],
+            uf=UF_CODES[geocode // 100000],
+            latitude=self.latitudes[row],
+            longitude=self.longitudes[row],
+            timezone=self.timezones[self.tz_ids[row]],
+            geocode=geocode
+        )
+
+    def _rows_for(self, key: str, uf: Optional[str]) -> List[int]:
+        """Linhas com nome exatamente igual a ``key``, filtradas pela UF."""
+        rows = self._by_key.get(key, [])
+        if uf:
+            rows = [r for r in rows if UF_CODES[self.geocodes[r] // 100000] == uf]
+        return rows
+
+    def _best_row(self, rows: List[int]) -> Optional[int]:
+        """Escolhe entre homônimos: a única linha, a capital ou ``None`` se ambíguo."""
+        if len(rows) == 1:
+            return rows[0]
+        capitals = [row for row in rows if self.geocodes[row] in CAPITAL_GEOCODES]
+        return capitals[0] if len(capitals) == 1 else None
+
+    def lookup(self, query: str) -> Optional[Place]:
+        """Resolve uma consulta como ``"Campinas, SP"`` ou ``"São Paulo, Brasil"``.
+
+        Sem UF nem "Brasil", só capitais são resolvidas aqui ("Belém" é a
+        do Pará): "Buenos Aires", "Santiago" ou "Florida" também são
+        municípios brasileiros, e o nome sozinho não diz de que país é.
+        Retorna ``None`` nesses casos, quando a consulta cita outro país,
+        quando nenhum município corresponde ou quando o nome qualificado é
+        ambíguo, para que o chamador use o geocodificador externo. A
+        correspondência aproximada só vale para consultas qualificadas.
+        """
+        parsed = parse_query(query)
+        if parsed is None:
+            return None
+        key, uf, qualified = parsed
+
+        rows = self._rows_for(key, uf)
+        if not qualified:
+            rows = [row for row in rows if self.geocodes[row] in CAPITAL_GEOCODES]
+        if not rows and qualified:
+            for candidate in difflib.get_close_matches(key, self._unique_keys, n=5, cutoff=FUZZY_CUTOFF):
+                rows = self._rows_for(candidate, uf)
+                if rows:
+                    break
+        if not rows:
+            return None
+        row = self._best_row(rows)
+        return self.place(row) if row is not None else None
+
+    def search(self, query: str, limit: int = 10) -> List[Place]:
+        """Sugestões por prefixo (autocompletar), com fallback aproximado."""
+        parsed = parse_query(query)
+        if parsed is None or not parsed.key:
+            return []
+        key, uf, _ = parsed
+
+        results: List[Place] = []
+        start = bisect.bisect_left(self.keys, key)
+        for row in range(start, len(self.keys)):
+            if not self.keys[row].startswith(key):
+                break
+            place = self.place(row)
+            if uf is None or place.uf == uf:
+                results.append(place)
+                if len(results) >= limit:
+                    return results
+
+        if not results:
+            for candidate in difflib.get_close_matches(key, self._unique_keys, n=limit, cutoff=0.75):
+                results.extend(self.place(r) for r in self._rows_for(candidate, uf))
+        return results[:limit]
+
+
+def parse_query(query: str) -> Optional[ParsedQuery]:
+    """Separa a consulta em nome normalizado, UF e presença de qualificador.
+
+    Retorna ``None`` se algum qualificador não for uma UF nem o Brasil, o que
+    indica um lugar fora da cobertura do gazetteer.
+    """
+    parts = [p for p in _QUERY_SEPARATORS.split(query.strip()) if p]
+    if not parts:
+        return None
+
+    key = normalize_name(parts[0])
+    uf = None
+    for qualifier in parts[1:]:
+        normalized = normalize_name(qualifier)
+        if normalized in _COUNTRY_ALIASES:
+            continue
+        if normalized in _UF_LOOKUP and uf is None:
+            uf = _UF_LOOKUP[normalized]
+            continue
+        return None
+    return ParsedQuery(key, uf, len(parts) > 1)
+
+
+_index: Optional[GazetteerIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_index(path: Path = INDEX_PATH) -> Optional[GazetteerIndex]:
+    """Carrega o índice uma única vez por processo.
+
+    Retorna ``None`` se o arquivo não existir, mantendo a aplicação funcional
+    apenas com o geocodificador externo.
+    """
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                try:
+                    _index = GazetteerIndex(path.read_bytes())
+                except FileNotFoundError:
+                    return None
+    return _index
+
+
+def lookup(query: str) -> Optional[Place]:
+    """Atalho para ``get_index().lookup``."""
+    index = get_index()
+    return index.lookup(query) if index is not None else None
+
+
+def search(query: str, limit: int = 10) -> List[Place]:
+    """Atalho para ``get_index().search``."""
+    index = get_index()
+    return index.search(query, limit) if index is not None else []
+
+
+if __name__ == "__main__":
+    total = build_index()
+    print(f"{total} municípios gravados em {INDEX_PATH}")
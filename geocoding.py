@@ -0,0 +1,298 @@
+"""Geocodificação com cache persistente, single-flight e limite de taxa.
+
+Todas as consultas ao Nominatim passam por uma única instância por processo
+(``get_geocoder``), que respeita a política de 1 requisição por segundo,
+reaproveita respostas gravadas em disco e faz com que consultas idênticas
+simultâneas compartilhem uma única chamada externa.
+"""
+
+import sqlite3
+import threading
+import time
+from pathlib import Path
+from typing import Any, Callable, Dict, NamedTuple, Optional, Tuple
+
+from gazetteer import normalize_name
+from instrumentation import register_cache
+
+CACHE_PATH = Path(".cache") / "geocoding.sqlite3"
+DEFAULT_TTL = 30 * 24 * 3600
+NEGATIVE_TTL = 24 * 3600
+DEFAULT_MAX_ENTRIES = 50000
+
+
+class GeocodeResult(NamedTuple):
+    """Coordenadas retornadas pelo geocodificador."""
+
+    latitude: float
+    longitude: float
+    address: str
+
+
+# Sentinela gravada no cache para lugares que o geocodificador não encontrou
+NOT_FOUND = GeocodeResult(float("nan"), float("nan"), "")
+
+
+def cache_key(query: str) -> str:
+    """Chave normalizada: sem acentos, caixa ou pontuação redundante."""
+    return normalize_name(query.replace(",", " ").replace(";", " "))
+
+
+class TokenBucket:
+    """Limitador token bucket seguro para threads."""
+
+    def __init__(self, rate: float, capacity: float = 1.0) -> None:
+        """Cria um balde com ``rate`` fichas por segundo e até ``capacity`` acumuladas."""
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self, now: float) -> None:
+        """Repõe as fichas proporcionalmente ao tempo decorrido."""
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self) -> bool:
+        """Consome uma ficha se houver, sem bloquear."""
+        with self._lock:
+            self._refill(time.monotonic())
+            if self._tokens >= 1:
+                self._tokens -= 1
+                return True
+            return False
+
+    def acquire(self, timeout: Optional[float] = None) -> bool:
+        """Bloqueia até obter uma ficha ou até estourar ``timeout`` segundos."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._refill(now)
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return True
+                wait = (1 - self._tokens) / self.rate
+            if deadline is not None:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    return False
+                wait = min(wait, remaining)
+            time.sleep(wait)
+
+
+class _Flight:
+    """Chamada em andamento compartilhada pelos seguidores."""
+
+    __slots__ = ("done", "result", "error")
+
+    def __init__(self) -> None:
+        """Inicializa uma chamada ainda não concluída."""
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+
+
+class SingleFlight:
+    """Agrupa chamadas concorrentes com a mesma chave em uma só execução."""
+
+    def __init__(self) -> None:
+        """Cria o registro de chamadas em andamento."""
+        self._calls: Dict[str, _Flight] = {}
+        self._lock = threading.Lock()
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Executa ``fn`` uma vez por chave; chamadas simultâneas recebem o mesmo resultado.
+
+        Retorna ``(resultado, compartilhado)``, onde ``compartilhado`` indica
+        que a chamada aproveitou a execução de outra thread.
+        """
+        with self._lock:
+            flight = self._calls.get(key)
+            leader = flight is None
+            if leader:
+                flight = self._calls[key] = _Flight()
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            flight.done.set()
+        return flight.result, False
+
+
+class GeocodeCache:
+    """Cache em SQLite com TTL e despejo LRU."""
+
+    def __init__(self, path: Path = CACHE_PATH, ttl: float = DEFAULT_TTL,
+                 negative_ttl: float = NEGATIVE_TTL,
+                 max_entries: int = DEFAULT_MAX_ENTRIES) -> None:
+        """Abre (ou cria) o banco de cache em ``path``."""
+        self.ttl = ttl
+        self.negative_ttl = negative_ttl
+        self.max_entries = max_entries
+        self._lock = threading.Lock()
+        if str(path) != ":memory:":
+            path.parent.mkdir(parents=True, exist_ok=True)
+        self._conn = sqlite3.connect(str(path), check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS geocode ("
+            " key TEXT PRIMARY KEY, latitude REAL, longitude REAL, address TEXT,"
+            " created REAL NOT NULL, accessed REAL NOT NULL)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS geocode_accessed ON geocode (accessed)")
+
+    def get(self, key: str) -> Optional[GeocodeResult]:
+        """Retorna a entrada válida para ``key`` ou ``None`` se não houver.
+
+        Lugares inexistentes em cache são retornados como ``NOT_FOUND``.
+        """
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT latitude, longitude, address, created FROM geocode WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+            latitude, longitude, address, created = row
+            ttl = self.ttl if latitude is not None else self.negative_ttl
+            if now - created > ttl:
+                self._conn.execute("DELETE FROM geocode WHERE key = ?", (key,))
+                return None
+            self._conn.execute("UPDATE geocode SET accessed = ? WHERE key = ?", (now, key))
+        if latitude is None:
+            return NOT_FOUND
+        return GeocodeResult(latitude, longitude, address)
+
+    def put(self, key: str, result: Optional[GeocodeResult]) -> None:
+        """Grava o resultado (ou a ausência dele) e aplica o limite de entradas."""
+        now = time.time()
+        values = (None, None, "") if result is None else tuple(result)
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO geocode VALUES (?, ?, ?, ?, ?, ?)",
+                (key, *values, now, now)
+            )
+            (count,) = self._conn.execute("SELECT COUNT(*) FROM geocode").fetchone()
+            if count > self.max_entries:
+                self._conn.execute(
+                    "DELETE FROM geocode WHERE key IN ("
+                    " SELECT key FROM geocode ORDER BY accessed ASC LIMIT ?)",
+                    (count - self.max_entries,)
+                )
+
+    def __len__(self) -> int:
+        """Quantidade de entradas armazenadas."""
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM geocode").fetchone()[0]
+
+    def clear(self) -> None:
+        """Remove todas as entradas."""
+        with self._lock:
+            self._conn.execute("DELETE FROM geocode")
+
+
+class CachedGeocoder:
+    """Geocodificador com cache, single-flight, limite de taxa e contadores."""
+
+    def __init__(self, geocoder: Any, cache: GeocodeCache, limiter: TokenBucket,
+                 limiter_timeout: Optional[float] = 30.0) -> None:
+        """Envolve ``geocoder`` (qualquer objeto com ``geocode(query)`` no estilo geopy)."""
+        self.geocoder = geocoder
+        self.cache = cache
+        self.limiter = limiter
+        self.limiter_timeout = limiter_timeout
+        self._flights = SingleFlight()
+        self._stats_lock = threading.Lock()
+        self._stats = {"hits": 0, "misses": 0, "upstream_calls": 0,
+                       "coalesced": 0, "errors": 0}
+
+    def _count(self, name: str) -> None:
+        """Incrementa um contador de forma atômica."""
+        with self._stats_lock:
+            self._stats[name] += 1
+
+    def stats(self) -> Dict[str, float]:
+        """Retorna contadores de acerto/erro e a taxa de acerto."""
+        with self._stats_lock:
+            stats: Dict[str, float] = dict(self._stats)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+    def _fetch(self, key: str, query: str) -> Optional[GeocodeResult]:
+        """Consulta o geocodificador externo respeitando o limite de taxa."""
+        cached = self.cache.get(key)
+        if cached is not None:
+            return None if cached is NOT_FOUND else cached
+
+        if not self.limiter.acquire(self.limiter_timeout):
+            raise TimeoutError("Limite de requisições ao geocodificador excedido")
+        self._count("upstream_calls")
+        location = self.geocoder.geocode(query)
+        result = None
+        if location:
+            result = GeocodeResult(location.latitude, location.longitude,
+                                   getattr(location, "address", "") or "")
+        self.cache.put(key, result)
+        return result
+
+    def geocode(self, query: str) -> Optional[GeocodeResult]:
+        """Geocodifica ``query``, retornando ``None`` se o lugar não existir."""
+        key = cache_key(query)
+        cached = self.cache.get(key)
+        if cached is not None:
+            self._count("hits")
+            return None if cached is NOT_FOUND else cached
+
+        self._count("misses")
+        try:
+            result, shared = self._flights.do(key, lambda: self._fetch(key, query))
+        except Exception:
+            self._count("errors")
+            raise
+        if shared:
+            self._count("coalesced")
+        return result
+
+
+# Limite global do Nominatim: 1 requisição por segundo por processo
+NOMINATIM_LIMITER = TokenBucket(rate=1.0, capacity=1.0)
+
+_geocoder: Optional[CachedGeocoder] = None
+_geocoder_lock = threading.Lock()
+
+
+def get_geocoder() -> CachedGeocoder:
+    """Retorna o geocodificador compartilhado do processo (Nominatim)."""
+    global _geocoder
+    if _geocoder is None:
+        with _geocoder_lock:
+            if _geocoder is None:
+                from geopy.geocoders import Nominatim
+                _geocoder = CachedGeocoder(
+                    Nominatim(user_agent="mystical_chart", timeout=10),
+                    GeocodeCache(),
+                    NOMINATIM_LIMITER
+                )
+    return _geocoder
+
+
+def _geocoder_stats() -> Dict[str, float]:
+    """Estatísticas do geocodificador compartilhado (vazias antes do primeiro uso)."""
+    return _geocoder.stats() if _geocoder is not None else {}
+
+
+register_cache("geocoding", _geocoder_stats)
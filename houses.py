@@ -0,0 +1,167 @@
+"""Casas astrológicas em vários sistemas e em lote.
+
+``calculate_houses`` calcula um sistema para um único local. Aqui o tempo
+sideral e a obliquidade verdadeira são calculados uma vez por dia juliano e
+cada sistema sai de ``swe.houses_armc`` com o mesmo ARMC, tanto para vários
+sistemas no mesmo local (``houses_systems``) quanto para grades de locais,
+como um mapa relocado para milhares de cidades (``houses_batch``, que
+retorna arrays NumPy).
+
+Placidus e Koch não são definidos dentro dos círculos polares (|latitude| ≥
+90° − obliquidade). Em vez de lançar exceção no meio de um lote, esses
+pontos seguem a política ``polar``: Porfírio no lugar (como o próprio Swiss
+Ephemeris faz em ``houses_ex2``), NaN ou erro antes de qualquer cálculo.
+Os pontos afetados ficam marcados em ``fallback``.
+"""
+
+from typing import Any, Dict, NamedTuple, Sequence, Tuple, Union
+
+import numpy as np
+import swisseph as swe
+
+from instrumentation import timed
+
+SYSTEMS = {
+    b"P": "Placidus",
+    b"K": "Koch",
+    b"W": "Signos inteiros",
+    b"E": "Casas iguais",
+    b"R": "Regiomontanus",
+    b"O": "Porfírio"
+}
+DEFAULT_SYSTEMS = tuple(SYSTEMS)
+# Sistemas sem solução dentro dos círculos polares
+POLAR_SYSTEMS = frozenset({b"P", b"K"})
+POLAR_FALLBACK = b"O"
+POLAR_POLICIES = ("porphyry", "nan", "raise")
+
+ANGLES = ("ascendant", "mc", "armc", "vertex")
+
+SystemLike = Union[bytes, str]
+
+
+class PolarLatitudeError(ValueError):
+    """Sistema de casas indefinido na latitude, com a política ``raise``."""
+
+
+class HouseGrid(NamedTuple):
+    """Casas de ``n`` pontos em cada sistema pedido.
+
+    ``cusps[sistema]`` tem forma ``(n, 12)``; ``angles`` tem forma ``(n, 4)``
+    na ordem de ``ANGLES`` (os ângulos não dependem do sistema);
+    ``fallback[sistema]`` marca os pontos polares resolvidos pela política.
+    """
+
+    cusps: Dict[bytes, np.ndarray]
+    angles: np.ndarray
+    fallback: Dict[bytes, np.ndarray]
+
+
+def system_codes(systems: Sequence[SystemLike]) -> Tuple[bytes, ...]:
+    """Normaliza os sistemas para letras do Swiss Ephemeris (``b"P"``, ``"K"``...)."""
+    codes = tuple(s.encode("ascii") if isinstance(s, str) else bytes(s) for s in systems)
+    unknown = [code for code in codes if code not in SYSTEMS]
+    if unknown:
+        raise ValueError(f"Sistema de casas não suportado: {unknown[0].decode('ascii', 'replace')}")
+    return codes
+
+
+def sidereal_frame(jds: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Tempo sideral aparente de Greenwich (graus) e obliquidade verdadeira de cada instante.
+
+    Calculados uma vez por dia juliano distinto.
+    """
+    unique, inverse = np.unique(jds, return_inverse=True)
+    gst = np.empty(len(unique))
+    obliquity = np.empty(len(unique))
+    for i, jd in enumerate(unique.tolist()):
+        gst[i] = swe.sidtime(jd) * 15.0
+        obliquity[i] = swe.calc_ut(jd, swe.ECL_NUT)[0][0]
+    inverse = inverse.reshape(jds.shape)
+    return gst[inverse], obliquity[inverse]
+
+
+def polar_mask(lats: np.ndarray, obliquity: np.ndarray) -> np.ndarray:
+    """Pontos dentro dos círculos polares, onde Placidus e Koch não existem."""
+    return np.abs(lats) >= 90.0 - obliquity
+
+
+@timed("houses.batch")
+def houses_batch(jd: Union[float, Sequence[float]], lats: Sequence[float], lons: Sequence[float],
+                 systems: Sequence[SystemLike] = DEFAULT_SYSTEMS,
+                 polar: str = "porphyry") -> HouseGrid:
+    """Casas de muitos locais (e, opcionalmente, instantes) em vários sistemas.
+
+    Args:
+        jd: Um dia juliano (UT) para todos os pontos ou um por ponto.
+        lats: Latitudes geográficas em graus.
+        lons: Longitudes geográficas em graus (leste positivo).
+        systems: Sistemas de ``SYSTEMS`` (letras, como em ``calculate_houses``).
+        polar: Política para Placidus/Koch dentro dos círculos polares; veja
+            ``POLAR_POLICIES``.
+
+    Returns:
+        ``HouseGrid`` com as cúspides de cada sistema, os ângulos e as marcas
+        de fallback.
+
+    Raises:
+        PolarLatitudeError: Com ``polar="raise"``, antes de calcular qualquer
+            ponto, se algum ponto polar pedir Placidus ou Koch.
+    """
+    if polar not in POLAR_POLICIES:
+        raise ValueError(f"Política polar inválida: {polar}")
+    codes = system_codes(systems)
+    jd_array, lat_array, lon_array = np.broadcast_arrays(
+        np.asarray(jd, dtype=np.float64), np.asarray(lats, dtype=np.float64),
+        np.asarray(lons, dtype=np.float64))
+    jd_array, lat_array, lon_array = (a.ravel() for a in (jd_array, lat_array, lon_array))
+    n = len(lat_array)
+
+    gst, obliquity = sidereal_frame(jd_array)
+    armc = (gst + lon_array) % 360.0
+    polar_points = polar_mask(lat_array, obliquity)
+    if polar == "raise" and polar_points.any() and POLAR_SYSTEMS.intersection(codes):
+        first = int(np.argmax(polar_points))
+        raise PolarLatitudeError(
+            f"Placidus e Koch não são definidos na latitude {lat_array[first]:.4f}")
+
+    cusps = {code: np.empty((n, 12)) for code in codes}
+    fallback = {code: np.zeros(n, dtype=bool) for code in codes}
+    angles = np.empty((n, len(ANGLES)))
+    houses_armc = swe.houses_armc
+    for i, (point_armc, lat, eps, is_polar) in enumerate(zip(
+            armc.tolist(), lat_array.tolist(), obliquity.tolist(), polar_points.tolist())):
+        ascmc = None
+        for code in codes:
+            if is_polar and code in POLAR_SYSTEMS:
+                fallback[code][i] = True
+                if polar == "nan":
+                    cusps[code][i] = np.nan
+                    continue
+                code_used = POLAR_FALLBACK
+            else:
+                code_used = code
+            point_cusps, ascmc = houses_armc(point_armc, lat, eps, code_used)
+            cusps[code][i] = point_cusps
+        if ascmc is None:
+            # Só sistemas polares com NaN: os ângulos vêm do sistema de fallback
+            ascmc = houses_armc(point_armc, lat, eps, POLAR_FALLBACK)[1]
+        angles[i] = ascmc[:len(ANGLES)]
+    return HouseGrid(cusps, angles, fallback)
+
+
+def houses_systems(jd: float, lat: float, lon: float,
+                   systems: Sequence[SystemLike] = DEFAULT_SYSTEMS,
+                   polar: str = "porphyry") -> Dict[bytes, Dict[str, Any]]:
+    """Vários sistemas de casas para um local, no formato de ``calculate_houses``.
+
+    Cada sistema ganha também ``polar_fallback``, verdadeiro quando a
+    política polar substituiu as cúspides.
+    """
+    grid = houses_batch(jd, [lat], [lon], systems, polar)
+    angles = dict(zip(ANGLES, grid.angles[0].tolist()))
+    return {
+        code: dict(angles, cusps=tuple(grid.cusps[code][0].tolist()),
+                   polar_fallback=bool(grid.fallback[code][0]))
+        for code in grid.cusps
+    }
@@ -0,0 +1,419 @@
+"""Instrumentação leve: tempos por etapa, contagens e taxas de acerto de cache.
+
+Cada etapa do pipeline (geocodificação, fuso horário, ``swe.calc_ut``,
+``swe.houses``, figura, chat) é medida com ``timed`` (decorador) ou
+``timer`` (gerenciador de contexto). Os tempos vão para histogramas em
+memória, exportados no formato texto do Prometheus por
+``render_prometheus``; os caches do processo se registram com
+``register_cache`` e têm acertos, faltas e taxa de acerto exportados junto.
+
+Com ``trace`` ativo, cada requisição também gera uma linha de log JSON com
+as etapas executadas (logger ``astro.trace``). Se ninguém configurou esse
+logger, ligar os traces o deixa em ``INFO`` com um handler para stderr.
+
+Etapas medidas em processos de um pool (``swe.calc_ut`` nos workers da API)
+voltam ao processo principal com ``run_measured`` e ``record``. Onde não há
+rota ``/metrics`` (Streamlit), ``start_metrics_server`` exporta as métricas
+num servidor HTTP próprio.
+
+Desligada (o padrão), a instrumentação custa uma checagem de booleano por
+chamada. Ligue com ``ASTRO_METRICS=1`` ou com ``enable()``; ``ASTRO_TRACE=1``
+(ou ``enable(tracing=True)``) liga os logs de trace e, com eles, as métricas.
+"""
+
+import bisect
+import contextvars
+import functools
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import (Any, Callable, Dict, Iterator, List, Mapping, Optional, Sequence, Tuple,
+                    TypeVar)
+
+# Limites superiores dos buckets, em segundos
+BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+           0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+PREFIX = "astro"
+
+trace_logger = logging.getLogger("astro.trace")
+
+F = TypeVar("F", bound=Callable[..., Any])
+# Etapa medida: nome, duração em segundos e se terminou em exceção
+Observation = Tuple[str, float, bool]
+
+
+def _configure_trace_logger() -> None:
+    """Garante que os traces apareçam: ``INFO`` e stderr, salvo configuração própria."""
+    if trace_logger.handlers:
+        return
+    handler = logging.StreamHandler()
+    handler.setFormatter(logging.Formatter("%(message)s"))
+    trace_logger.addHandler(handler)
+    trace_logger.setLevel(logging.INFO)
+    trace_logger.propagate = False
+
+
+class _State:
+    """Chaves de liga/desliga (lidas a cada chamada instrumentada)."""
+
+    tracing = os.environ.get("ASTRO_TRACE", "") not in ("", "0")
+    enabled = tracing or os.environ.get("ASTRO_METRICS", "") not in ("", "0")
+
+
+if _State.tracing:
+    _configure_trace_logger()
+
+
+def enable(metrics: bool = True, tracing: bool = False) -> None:
+    """Liga a coleta de métricas e, opcionalmente, os logs de trace (que exigem métricas)."""
+    _State.enabled = metrics or tracing
+    _State.tracing = tracing
+    if tracing:
+        _configure_trace_logger()
+
+
+def disable() -> None:
+    """Desliga métricas e traces."""
+    _State.enabled = False
+    _State.tracing = False
+
+
+def is_enabled() -> bool:
+    """Se as métricas estão sendo coletadas."""
+    return _State.enabled
+
+
+class Histogram:
+    """Histograma cumulativo de durações no estilo Prometheus."""
+
+    __slots__ = ("counts", "total", "count", "errors")
+
+    def __init__(self) -> None:
+        """Cria um histograma vazio com os ``BUCKETS`` padrão."""
+        self.counts = [0] * (len(BUCKETS) + 1)
+        self.total = 0.0
+        self.count = 0
+        self.errors = 0
+
+    def observe(self, seconds: float, error: bool = False) -> None:
+        """Registra uma duração."""
+        self.counts[bisect.bisect_left(BUCKETS, seconds)] += 1
+        self.total += seconds
+        self.count += 1
+        if error:
+            self.errors += 1
+
+    def quantile(self, q: float) -> float:
+        """Estimativa de quantil pelo limite superior do bucket."""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for bound, count in zip(BUCKETS + (float("inf"),), self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return bound
+        return float("inf")
+
+
+_histograms: Dict[str, Histogram] = {}
+_histograms_lock = threading.Lock()
+# nome -> função que retorna ao menos {"hits": ..., "misses": ...}
+_caches: Dict[str, Callable[[], Mapping[str, float]]] = {}
+
+
+# Etapas medidas dentro de ``run_measured``, devolvidas ao processo que chamou
+_collected: "contextvars.ContextVar[Optional[List[Observation]]]" = contextvars.ContextVar(
+    "astro_collected", default=None)
+
+
+def observe(step: str, seconds: float, error: bool = False) -> None:
+    """Registra a duração de uma etapa (e o span no trace ativo)."""
+    collected = _collected.get()
+    if collected is not None:
+        collected.append((step, seconds, error))
+        return
+    with _histograms_lock:
+        histogram = _histograms.get(step)
+        if histogram is None:
+            histogram = _histograms[step] = Histogram()
+        histogram.observe(seconds, error)
+    trace = _current_trace.get()
+    if trace is not None:
+        trace.add_span(step, seconds, error)
+
+
+def register_cache(name: str, stats: Callable[[], Mapping[str, float]]) -> None:
+    """Registra um cache cujas estatísticas entram na exportação."""
+    _caches[name] = stats
+
+
+class _Trace:
+    """Etapas executadas durante uma requisição."""
+
+    def __init__(self, name: str, attributes: Dict[str, Any]) -> None:
+        """Inicia o trace agora."""
+        self.name = name
+        self.trace_id = uuid.uuid4().hex[:16]
+        self.attributes = attributes
+        self.started = time.perf_counter()
+        self.spans: List[Dict[str, Any]] = []
+
+    def add_span(self, step: str, seconds: float, error: bool) -> None:
+        """Acrescenta uma etapa concluída."""
+        end = time.perf_counter() - self.started
+        span = {"step": step, "start_ms": round((end - seconds) * 1000, 3),
+                "duration_ms": round(seconds * 1000, 3)}
+        if error:
+            span["error"] = True
+        self.spans.append(span)
+
+
+_current_trace: "contextvars.ContextVar[Optional[_Trace]]" = contextvars.ContextVar(
+    "astro_trace", default=None)
+
+
+class _NullContext:
+    """Gerenciador de contexto sem efeito, reaproveitado quando desligado."""
+
+    __slots__ = ()
+
+    def __enter__(self) -> None:
+        """Não faz nada."""
+        return None
+
+    def __exit__(self, *exc: Any) -> None:
+        """Não faz nada (exceções seguem normalmente)."""
+        return None
+
+
+_NULL = _NullContext()
+
+
+class _Timer:
+    """Mede o bloco e registra em ``observe`` ao sair."""
+
+    __slots__ = ("step", "started")
+
+    def __init__(self, step: str) -> None:
+        """Prepara a medição da etapa ``step``."""
+        self.step = step
+
+    def __enter__(self) -> "_Timer":
+        """Inicia o relógio."""
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type: Any, exc: Any, tb: Any) -> None:
+        """Registra a duração, marcando erro se o bloco lançou exceção."""
+        observe(self.step, time.perf_counter() - self.started, exc_type is not None)
+
+
+def timer(step: str) -> Any:
+    """Gerenciador de contexto que mede um bloco como a etapa ``step``."""
+    return _Timer(step) if _State.enabled else _NULL
+
+
+def timed(step: str) -> Callable[[F], F]:
+    """Decorador que mede cada chamada da função como a etapa ``step``."""
+    def decorate(fn: F) -> F:
+        @functools.wraps(fn)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            if not _State.enabled:
+                return fn(*args, **kwargs)
+            started = time.perf_counter()
+            try:
+                result = fn(*args, **kwargs)
+            except BaseException:
+                observe(step, time.perf_counter() - started, True)
+                raise
+            observe(step, time.perf_counter() - started)
+            return result
+        return wrapper  # type: ignore[return-value]
+    return decorate
+
+
+@contextmanager
+def trace(name: str, **attributes: Any) -> Iterator[Optional[_Trace]]:
+    """Agrupa as etapas de uma requisição e grava uma linha de log JSON ao final.
+
+    Sem ``ASTRO_TRACE``/``enable(tracing=True)`` não faz nada.
+    """
+    if not (_State.enabled and _State.tracing):
+        yield None
+        return
+    current = _Trace(name, attributes)
+    token = _current_trace.set(current)
+    error: Optional[str] = None
+    try:
+        yield current
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        _current_trace.reset(token)
+        record = {
+            "trace_id": current.trace_id,
+            "name": name,
+            "duration_ms": round((time.perf_counter() - current.started) * 1000, 3),
+            "spans": current.spans,
+        }
+        if attributes:
+            record["attributes"] = attributes
+        if error:
+            record["error"] = error
+        trace_logger.info(json.dumps(record, ensure_ascii=False, default=str))
+
+
+def run_measured(metrics: bool, fn: Callable[..., Any],
+                 *args: Any) -> Tuple[Any, List[Observation]]:
+    """Executa ``fn`` num worker e devolve o resultado e as etapas medidas.
+
+    Para pools de processos: os histogramas do worker não são vistos pelo
+    processo principal, que passa as observações a ``record``. ``metrics``
+    é o estado do processo principal (``is_enabled()``), já que ``enable``
+    não chega aos workers.
+    """
+    _State.enabled = metrics
+    collected: List[Observation] = []
+    token = _collected.set(collected)
+    try:
+        return fn(*args), collected
+    finally:
+        _collected.reset(token)
+
+
+def record(observations: Sequence[Observation]) -> None:
+    """Registra etapas medidas em outro processo (e no trace ativo)."""
+    for step, seconds, error in observations:
+        observe(step, seconds, error)
+
+
+def _cache_stats() -> Dict[str, Tuple[float, float]]:
+    """(acertos, faltas) de cada cache registrado; caches com erro são ignorados."""
+    result = {}
+    for name, stats in list(_caches.items()):
+        try:
+            values = stats()
+        except Exception:
+            continue
+        result[name] = (float(values.get("hits", 0)), float(values.get("misses", 0)))
+    return result
+
+
+def snapshot() -> Dict[str, Any]:
+    """Métricas atuais como dicionário (contagens, médias, p50/p95 e caches)."""
+    with _histograms_lock:
+        steps = {
+            step: {
+                "calls": h.count,
+                "errors": h.errors,
+                "total_seconds": h.total,
+                "mean_seconds": h.total / h.count if h.count else 0.0,
+                "p50_seconds": h.quantile(0.5),
+                "p95_seconds": h.quantile(0.95)
+            }
+            for step, h in _histograms.items()
+        }
+    caches = {
+        name: {"hits": hits, "misses": misses,
+               "hit_ratio": hits / (hits + misses) if hits + misses else 0.0}
+        for name, (hits, misses) in _cache_stats().items()
+    }
+    return {"steps": steps, "caches": caches}
+
+
+def _label(value: str) -> str:
+    """Escapa um valor de label do Prometheus."""
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def render_prometheus() -> str:
+    """Exporta as métricas no formato texto do Prometheus (versão 0.0.4)."""
+    lines = [
+        f"# HELP {PREFIX}_step_duration_seconds Duração das etapas do pipeline.",
+        f"# TYPE {PREFIX}_step_duration_seconds histogram",
+    ]
+    with _histograms_lock:
+        items = [(step, list(h.counts), h.total, h.count, h.errors)
+                 for step, h in sorted(_histograms.items())]
+    for step, counts, total, count, _ in items:
+        label = _label(step)
+        cumulative = 0
+        for bound, n in zip(BUCKETS, counts):
+            cumulative += n
+            lines.append(f'{PREFIX}_step_duration_seconds_bucket{{step="{label}",le="{bound}"}} {cumulative}')
+        lines.append(f'{PREFIX}_step_duration_seconds_bucket{{step="{label}",le="+Inf"}} {count}')
+        lines.append(f'{PREFIX}_step_duration_seconds_sum{{step="{label}"}} {total}')
+        lines.append(f'{PREFIX}_step_duration_seconds_count{{step="{label}"}} {count}')
+
+    lines.append(f"# HELP {PREFIX}_step_errors_total Chamadas que terminaram em exceção.")
+    lines.append(f"# TYPE {PREFIX}_step_errors_total counter")
+    for step, _, _, _, errors in items:
+        lines.append(f'{PREFIX}_step_errors_total{{step="{_label(step)}"}} {errors}')
+
+    caches = _cache_stats()
+    for metric, index, help_text in (("hits", 0, "Acertos"), ("misses", 1, "Faltas")):
+        lines.append(f"# HELP {PREFIX}_cache_{metric}_total {help_text} por cache.")
+        lines.append(f"# TYPE {PREFIX}_cache_{metric}_total counter")
+        for name, values in sorted(caches.items()):
+            lines.append(f'{PREFIX}_cache_{metric}_total{{cache="{_label(name)}"}} {values[index]:g}')
+    lines.append(f"# HELP {PREFIX}_cache_hit_ratio Taxa de acerto por cache.")
+    lines.append(f"# TYPE {PREFIX}_cache_hit_ratio gauge")
+    for name, (hits, misses) in sorted(caches.items()):
+        ratio = hits / (hits + misses) if hits + misses else 0.0
+        lines.append(f'{PREFIX}_cache_hit_ratio{{cache="{_label(name)}"}} {ratio:g}')
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    """Responde ``GET /metrics`` com ``render_prometheus``."""
+
+    def do_GET(self) -> None:
+        """Exporta as métricas; outros caminhos dão 404."""
+        if self.path.split("?", 1)[0] != "/metrics":
+            self.send_error(404)
+            return
+        body = render_prometheus().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        """Não registra cada coleta do Prometheus."""
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int, host: str = "0.0.0.0") -> ThreadingHTTPServer:
+    """Serve ``/metrics`` numa thread daemon; chamadas seguintes reutilizam o servidor.
+
+    Para processos sem rota HTTP própria (Streamlit). Também liga as
+    métricas, que sem isso ficariam vazias.
+    """
+    global _server
+    if _server is None:
+        with _server_lock:
+            if _server is None:
+                _State.enabled = True
+                server = ThreadingHTTPServer((host, port), _MetricsHandler)
+                server.daemon_threads = True
+                threading.Thread(target=server.serve_forever, name="astro-metrics",
+                                 daemon=True).start()
+                _server = server
+    return _server
+
+
+def reset() -> None:
+    """Zera os histogramas (os caches registrados continuam)."""
+    with _histograms_lock:
+        _histograms.clear()
@@ -0,0 +1,209 @@
+"""Conversão vetorizada de datas e horas locais para dias julianos (UT).
+
+``calculate_julian_day`` localiza um ``datetime`` por vez com ``pytz``. Em
+lote, ``julian_days_batch`` monta uma única vez, por fuso, a tabela de
+transições de deslocamento UTC (extraída do ``pytz``, com os mesmos
+dados), resolve o deslocamento de todos os registros com
+``np.searchsorted`` e calcula os dias julianos numa só passada NumPy.
+
+Horários locais ambíguos (quando o relógio volta, como no fim do horário de
+verão brasileiro) e inexistentes (quando o relógio adianta) seguem políticas
+explícitas e podem ser identificados pelas ``flags`` retornadas. Os padrões
+reproduzem o ``localize`` do ``pytz`` usado por ``calculate_julian_day``; a
+diferença para ele fica em poucos milissegundos, porque a correção
+UT1 - UTC do ``swe.utc_to_jd`` é aplicada uma vez por dia.
+"""
+
+import datetime
+from functools import lru_cache
+from typing import Sequence, Tuple, Union
+
+import numpy as np
+import pytz
+import swisseph as swe
+
+UNIX_EPOCH_JD = 2440587.5
+UNIX_EPOCH_ORDINAL = 719163
+SECONDS_PER_DAY = 86400
+# Antes de 1972 o swe.utc_to_jd trata UTC como UT1
+UTC_LEAP_START = 2 * 365 * SECONDS_PER_DAY
+
+# Resolução de horários ambíguos: primeira ocorrência (ainda no horário de
+# verão), segunda ocorrência (já no horário padrão), erro ou NaN
+AMBIGUOUS_POLICIES = ("earlier", "later", "raise", "nan")
+# Resolução de horários inexistentes: deslocamento em vigor antes ou depois da
+# transição, o próprio instante da transição, erro ou NaN
+NONEXISTENT_POLICIES = ("before", "after", "shift_forward", "raise", "nan")
+
+# Valores de ``flags``
+FLAG_OK = 0
+FLAG_AMBIGUOUS = 1
+FLAG_NONEXISTENT = 2
+
+_MIN_SECONDS = np.iinfo(np.int64).min // 2
+
+DateLike = Union[datetime.date, str, np.datetime64]
+TimeLike = Union[datetime.time, str, float, int]
+
+
+class LocalTimeError(ValueError):
+    """Horário local ambíguo ou inexistente com a política ``raise``."""
+
+
+@lru_cache(maxsize=None)
+def transition_table(timezone_str: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Tabela de transições de um fuso: ``(inícios_utc, deslocamentos)`` em segundos.
+
+    O período ``k`` vale de ``inícios_utc[k]`` (UTC, segundos Unix) até o
+    início seguinte, com deslocamento ``deslocamentos[k]``. O primeiro
+    período começa em -∞.
+    """
+    tz = pytz.timezone(timezone_str)
+    if not hasattr(tz, "_utc_transition_times"):
+        # Fusos fixos (UTC, Etc/GMT+3, ...)
+        offset = tz.utcoffset(datetime.datetime(2000, 1, 1))
+        return (np.array([_MIN_SECONDS], dtype=np.int64),
+                np.array([int(offset.total_seconds())], dtype=np.int64))
+
+    starts = np.array(tz._utc_transition_times, dtype="datetime64[s]").astype(np.int64)
+    starts[0] = _MIN_SECONDS
+    offsets = np.array([int(info[0].total_seconds()) for info in tz._transition_info],
+                       dtype=np.int64)
+    return starts, offsets
+
+
+def _local_seconds(dates: Sequence[DateLike], times: Sequence[TimeLike]) -> np.ndarray:
+    """Segundos Unix "ingênuos" (sem fuso) de cada data + hora local."""
+    if len(dates) and isinstance(dates[0], datetime.date):
+        # toordinal é bem mais rápido que a conversão de objetos pelo NumPy
+        days = np.fromiter((d.toordinal() for d in dates), dtype=np.int64,
+                           count=len(dates)) - UNIX_EPOCH_ORDINAL
+    else:
+        days = np.asarray(dates, dtype="datetime64[D]").astype(np.int64)
+    if len(times) and isinstance(times[0], datetime.time):
+        of_day = [t.hour * 3600 + t.minute * 60 + t.second + t.microsecond / 1e6 for t in times]
+    elif len(times) and isinstance(times[0], str):
+        of_day = [datetime.time.fromisoformat(t) for t in times]
+        of_day = [t.hour * 3600 + t.minute * 60 + t.second + t.microsecond / 1e6 for t in of_day]
+    else:
+        of_day = times
+    return days * SECONDS_PER_DAY + np.asarray(of_day, dtype=np.float64)
+
+
+def _resolve_zone(local: np.ndarray, timezone_str: str, ambiguous: str,
+                  nonexistent: str) -> Tuple[np.ndarray, np.ndarray]:
+    """Segundos UTC e flags dos horários locais de um único fuso."""
+    starts, offsets = transition_table(timezone_str)
+    n = len(starts)
+    # Cada período cobre, em hora local, [início + desloc., próximo início + desloc.)
+    local_starts = starts + offsets
+    local_ends = np.append(starts[1:], np.iinfo(np.int64).max // 2) + offsets
+
+    # Último período que começa (em hora local) até o horário pedido
+    j = np.clip(np.searchsorted(local_starts, local, side="right") - 1, 0, n - 1)
+    prev = np.maximum(j - 1, 0)
+    in_current = (local >= local_starts[j]) & (local < local_ends[j])
+    in_previous = (j > 0) & (local < local_ends[prev])
+
+    offset = np.where(in_current, offsets[j], offsets[prev]).astype(np.float64)
+    flags = np.zeros(len(local), dtype=np.uint8)
+
+    ambiguous_mask = in_current & in_previous
+    if ambiguous_mask.any():
+        flags[ambiguous_mask] = FLAG_AMBIGUOUS
+        if ambiguous == "raise":
+            raise LocalTimeError(f"Horário local ambíguo em {timezone_str}")
+        if ambiguous == "earlier":
+            offset[ambiguous_mask] = offsets[prev][ambiguous_mask]
+        elif ambiguous == "later":
+            offset[ambiguous_mask] = offsets[j][ambiguous_mask]
+        else:
+            offset[ambiguous_mask] = np.nan
+
+    # Nenhum período contém o horário: está no salto para a frente. O período
+    # anterior à transição é j (o horário já passou do fim dele).
+    missing = ~in_current & ~in_previous
+    if missing.any():
+        flags[missing] = FLAG_NONEXISTENT
+        if nonexistent == "raise":
+            raise LocalTimeError(f"Horário local inexistente em {timezone_str}")
+        after = np.minimum(j + 1, n - 1)
+        if nonexistent == "before":
+            offset[missing] = offsets[j][missing]
+        elif nonexistent == "after":
+            offset[missing] = offsets[after][missing]
+        elif nonexistent == "shift_forward":
+            # Instante da transição: o horário é levado ao fim do salto
+            offset[missing] = (local - starts[after])[missing]
+        else:
+            offset[missing] = np.nan
+
+    return local - offset, flags
+
+
+def _ut1_correction(utc_seconds: np.ndarray) -> np.ndarray:
+    """Diferença UT1 - UTC (em dias) usada pelo ``swe.utc_to_jd``.
+
+    Varia milissegundos por dia e só salta nos segundos intercalares (na
+    virada do dia), então é calculada uma vez por dia distinto, e só a
+    partir de 1972 (antes disso é zero).
+    """
+    correction = np.zeros(len(utc_seconds), dtype=np.float64)
+    modern = np.isfinite(utc_seconds) & (utc_seconds >= UTC_LEAP_START)
+    if not modern.any():
+        return correction
+    days = np.floor(utc_seconds[modern] / SECONDS_PER_DAY).astype(np.int64)
+    unique_days, inverse = np.unique(days, return_inverse=True)
+    per_day = np.empty(len(unique_days), dtype=np.float64)
+    for i, day in enumerate(unique_days.astype("datetime64[D]").tolist()):
+        jd_ut = swe.utc_to_jd(day.year, day.month, day.day, 0, 0, 0, swe.GREG_CAL)[1]
+        per_day[i] = jd_ut - (int(unique_days[i]) + UNIX_EPOCH_JD)
+    correction[modern] = per_day[inverse.reshape(days.shape)]
+    return correction
+
+
+def julian_days_batch(dates: Sequence[DateLike], times: Sequence[TimeLike],
+                      timezones: Union[str, Sequence[str]],
+                      ambiguous: str = "later", nonexistent: str = "before",
+                      return_flags: bool = False) -> Union[np.ndarray, Tuple[np.ndarray, np.ndarray]]:
+    """Dias julianos (UT) de muitos horários locais de uma vez.
+
+    Args:
+        dates: Datas locais (``datetime.date``, ``"AAAA-MM-DD"`` ou ``datetime64``).
+        times: Horas locais (``datetime.time``, ``"HH:MM[:SS]"`` ou segundos do dia).
+        timezones: Um nome de fuso para todos ou um por registro.
+        ambiguous: Política para horários que ocorrem duas vezes; veja
+            ``AMBIGUOUS_POLICIES``. ``"later"`` equivale ao ``pytz`` padrão.
+        nonexistent: Política para horários pulados; veja
+            ``NONEXISTENT_POLICIES``. ``"before"`` equivale ao ``pytz`` padrão.
+        return_flags: Também retorna, por registro, ``FLAG_OK``,
+            ``FLAG_AMBIGUOUS`` ou ``FLAG_NONEXISTENT``.
+
+    Returns:
+        Array de dias julianos (NaN quando a política é ``"nan"``) e,
+        opcionalmente, o array de flags.
+
+    Raises:
+        LocalTimeError: Com a política ``"raise"`` e algum horário afetado.
+        pytz.UnknownTimeZoneError: Se algum fuso não existir.
+    """
+    if ambiguous not in AMBIGUOUS_POLICIES:
+        raise ValueError(f"Política inválida para horários ambíguos: {ambiguous}")
+    if nonexistent not in NONEXISTENT_POLICIES:
+        raise ValueError(f"Política inválida para horários inexistentes: {nonexistent}")
+
+    local = _local_seconds(dates, times)
+    utc = np.empty_like(local)
+    flags = np.zeros(len(local), dtype=np.uint8)
+
+    if isinstance(timezones, str):
+        utc[:], flags[:] = _resolve_zone(local, timezones, ambiguous, nonexistent)
+    else:
+        names, inverse = np.unique(np.asarray(timezones, dtype=object).astype(str),
+                                   return_inverse=True)
+        for k, name in enumerate(names.tolist()):
+            rows = inverse == k
+            utc[rows], flags[rows] = _resolve_zone(local[rows], name, ambiguous, nonexistent)
+
+    jds = utc / SECONDS_PER_DAY + UNIX_EPOCH_JD + _ut1_correction(utc)
+    return (jds, flags) if return_flags else jds
@@ -0,0 +1,354 @@
+"""Retificação da hora de nascimento por eventos de vida.
+
+Com a data e o local de nascimento conhecidos, cada hora candidata do dia
+gera um Ascendente e um Meio do Céu próprios (os mesmos de
+``calculate_houses``). Cada evento de vida datado pontua a candidata pelos
+contatos, em aspectos tensos (conjunção, oposição, quadratura), de:
+
+- trânsitos dos planetas lentos aos ângulos natais;
+- progressões secundárias (um dia por ano) dos planetas pessoais aos ângulos
+  natais;
+- ângulos dirigidos por arco solar (arco aplicado ao ARMC) aos planetas
+  natais.
+
+Cada contato vale ``peso * (1 - desvio / orbe)``, como em
+``aspects.synastry_scores``. Os ângulos saem de fórmulas fechadas sobre o
+ARMC, vetorizadas para todas as candidatas, e as posições de um bloco de
+candidatas (natais e progredidas, para todos os eventos) vêm numa só
+chamada a ``ephemeris_table.positions_batch``; os trânsitos não dependem da
+hora e são calculados uma vez.
+
+A busca vai do grosso ao fino: o dia inteiro de ``STEPS[0]`` em
+``STEPS[0]`` segundos e, em seguida, só em volta dos ``keep`` melhores
+picos, com passos menores até o segundo. Os blocos de candidatas são
+distribuídos num pool de processos; ``progress`` é chamado a cada bloco
+concluído e ``should_stop`` permite interromper a busca (ex.: botão de
+cancelar na interface), devolvendo o melhor resultado até ali.
+"""
+
+import datetime
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, Future, ProcessPoolExecutor, wait
+from contextlib import ExitStack
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence, Union
+
+import numpy as np
+
+import ephemeris
+from aspects import ASPECT_ANGLES, angular_separation
+from ephemeris import BODY_NAMES, EPHE_DIR
+from ephemeris_table import positions_batch
+from houses import sidereal_frame
+from instrumentation import timed
+from julian import FLAG_NONEXISTENT, SECONDS_PER_DAY, julian_days_batch
+from returns import progressed_jd
+
+# Passos da busca, em segundos: dia inteiro, depois em volta dos melhores picos
+STEPS = (60, 5, 1)
+KEEP = 8
+CHUNK_SIZE = 64
+# Abaixo disso (candidatas x eventos) o custo de subir o pool supera o ganho
+PARALLEL_THRESHOLD = 50000
+
+TRANSIT_BODIES = ("Sun", "Mars", "Jupiter", "Saturn", "Uranus", "Neptune", "Pluto")
+PROGRESSED_BODIES = ("Sun", "Moon", "Mercury", "Venus", "Mars")
+TRANSIT_ORB = 1.5
+PROGRESSION_ORB = 1.0
+# Aspectos tensos aos ângulos; a oposição ao ASC/MC é a conjunção ao DSC/IC
+CONTACT_WEIGHTS = {
+    "conjunction": 1.0,
+    "opposition": 0.8,
+    "square": 0.6
+}
+
+DateLike = Union[datetime.date, str]
+TimeLike = Union[datetime.time, str, float]
+
+_CONTACT_ANGLES = np.array([ASPECT_ANGLES[a] for a in CONTACT_WEIGHTS])
+_CONTACT_WEIGHTS = np.array(list(CONTACT_WEIGHTS.values()))
+_SUN = PROGRESSED_BODIES.index("Sun")
+
+
+class LifeEvent(NamedTuple):
+    """Evento de vida datado; sem hora, vale o meio-dia local."""
+
+    date: DateLike
+    time: Optional[TimeLike] = None
+    weight: float = 1.0
+    label: str = ""
+
+
+class Candidate(NamedTuple):
+    """Hora candidata, com a pontuação e os ângulos correspondentes."""
+
+    time: datetime.time
+    jd: float
+    score: float
+    ascendant: float
+    mc: float
+
+
+class RectificationProgress(NamedTuple):
+    """Andamento da busca: blocos da etapa atual e melhor candidata até aqui."""
+
+    stage: int
+    stages: int
+    done: int
+    total: int
+    best: Optional[Candidate]
+
+
+class Rectification(NamedTuple):
+    """Resultado: a melhor hora e os melhores picos da última etapa concluída."""
+
+    best: Optional[Candidate]
+    candidates: List[Candidate]
+    evaluated: int
+    elapsed: float
+    stopped: bool
+
+
+class _Context(NamedTuple):
+    """Dados fixos da busca, enviados uma vez a cada processo do pool."""
+
+    lat: float
+    lon: float
+    event_jds: np.ndarray
+    event_weights: np.ndarray
+    transits: np.ndarray
+
+
+_context: Optional[_Context] = None
+
+
+def _init_worker(ephe_path: str, context: _Context) -> None:
+    """Inicializador do pool: efemérides e dados da busca, uma vez por processo."""
+    global _context
+    ephemeris.init_worker(ephe_path)
+    _context = context
+
+
+def angles_from_armc(armc: np.ndarray, lat: float, obliquity: np.ndarray) -> np.ndarray:
+    """Ascendente e MC (graus) a partir do ARMC, como ``(..., 2)``; iguais aos do ``swe.houses``."""
+    ramc = np.radians(armc)
+    eps = np.radians(obliquity)
+    phi = np.radians(lat)
+    mc = np.degrees(np.arctan2(np.sin(ramc), np.cos(ramc) * np.cos(eps)))
+    asc = np.degrees(np.arctan2(np.cos(ramc),
+                                -(np.sin(ramc) * np.cos(eps) + np.tan(phi) * np.sin(eps))))
+    return np.stack([asc % 360.0, mc % 360.0], axis=-1)
+
+
+def _contacts(points: np.ndarray, angles: np.ndarray, orb: float) -> np.ndarray:
+    """Soma dos contatos entre ``points (..., p)`` e ``angles (..., a)``."""
+    separation = angular_separation(points[..., :, None], angles[..., None, :])
+    closeness = 1.0 - np.abs(separation[..., None] - _CONTACT_ANGLES) / orb
+    np.clip(closeness, 0.0, None, out=closeness)
+    return (closeness * _CONTACT_WEIGHTS).sum(axis=(-3, -2, -1))
+
+
+def _score(jds: np.ndarray, context: _Context) -> np.ndarray:
+    """Pontuação de cada instante natal candidato ``(n,)`` contra todos os eventos."""
+    n, n_events = len(jds), len(context.event_jds)
+    gst, obliquity = sidereal_frame(jds)
+    armc = (gst + context.lon) % 360.0
+    natal_angles = angles_from_armc(armc, context.lat, obliquity)
+
+    natal = positions_batch(jds, BODY_NAMES)[..., 0]
+    progressed_jds = progressed_jd(jds[:, None], context.event_jds[None, :])
+    progressed = positions_batch(progressed_jds.ravel(), PROGRESSED_BODIES)[..., 0]
+    progressed = progressed.reshape(n, n_events, len(PROGRESSED_BODIES))
+
+    solar_arc = progressed[..., _SUN] - natal[:, None, BODY_NAMES.index("Sun")]
+    directed = angles_from_armc(armc[:, None] + solar_arc, context.lat, obliquity[:, None])
+
+    per_event = (_contacts(context.transits[None], natal_angles[:, None], TRANSIT_ORB) +
+                 _contacts(progressed, natal_angles[:, None], PROGRESSION_ORB) +
+                 _contacts(natal[:, None], directed, PROGRESSION_ORB))
+    return per_event @ context.event_weights
+
+
+def _score_chunk(jds: np.ndarray) -> np.ndarray:
+    """Tarefa do pool: pontua um bloco com o contexto do inicializador."""
+    return _score(jds, _context)
+
+
+def _seconds_of_day(value: TimeLike) -> float:
+    """Hora local em segundos do dia."""
+    if isinstance(value, str):
+        value = datetime.time.fromisoformat(value)
+    if isinstance(value, datetime.time):
+        return value.hour * 3600 + value.minute * 60 + value.second + value.microsecond / 1e6
+    return float(value)
+
+
+def _normalize_events(events: Sequence[Union[LifeEvent, DateLike]]) -> List[LifeEvent]:
+    """Aceita ``LifeEvent``, datas, ``datetime`` ou ``"AAAA-MM-DD"``.
+
+    Devolve datas como ``datetime.date`` e horas em segundos do dia, formatos
+    homogêneos para ``julian_days_batch``.
+    """
+    normalized = []
+    for event in events:
+        if isinstance(event, datetime.datetime):
+            event = LifeEvent(event.date(), event.time())
+        elif not isinstance(event, LifeEvent):
+            event = LifeEvent(event)
+        date = event.date
+        if isinstance(date, datetime.datetime):
+            date = date.date()
+        elif isinstance(date, str):
+            date = datetime.date.fromisoformat(date)
+        of_day = 12 * 3600.0 if event.time is None else _seconds_of_day(event.time)
+        normalized.append(event._replace(date=date, time=of_day))
+    return normalized
+
+
+def _peaks(seconds: np.ndarray, scores: np.ndarray, keep: int) -> np.ndarray:
+    """Segundos dos ``keep`` maiores máximos locais (por ordem de pontuação)."""
+    order = np.argsort(seconds, kind="stable")
+    s, v = seconds[order], scores[order]
+    padded = np.concatenate([[-np.inf], v, [-np.inf]])
+    is_peak = (v >= padded[:-2]) & (v >= padded[2:])
+    peaks = np.flatnonzero(is_peak)
+    best = peaks[np.argsort(-v[peaks], kind="stable")[:keep]]
+    return s[best]
+
+
+def _candidate(seconds: float, jd: float, score: float, lat: float, lon: float) -> Candidate:
+    """Monta a candidata, com os ângulos de ``calculate_houses``."""
+    gst, obliquity = sidereal_frame(np.array([jd]))
+    asc, mc = angles_from_armc((gst + lon) % 360.0, lat, obliquity)[0].tolist()
+    whole = int(round(seconds)) % SECONDS_PER_DAY
+    return Candidate(datetime.time(whole // 3600, whole // 60 % 60, whole % 60),
+                     float(jd), float(score), asc, mc)
+
+
+@timed("rectification.search")
+def rectify(birth_date: DateLike, lat: float, lon: float, timezone: str,
+            events: Sequence[Union[LifeEvent, DateLike]],
+            steps: Sequence[int] = STEPS, keep: int = KEEP,
+            workers: Optional[int] = None, chunk_size: int = CHUNK_SIZE,
+            progress: Optional[Callable[[RectificationProgress], None]] = None,
+            should_stop: Optional[Callable[[], bool]] = None) -> Rectification:
+    """Procura a hora de nascimento que melhor explica os eventos de vida.
+
+    Args:
+        birth_date: Data local de nascimento.
+        lat: Latitude do local de nascimento.
+        lon: Longitude do local de nascimento (leste positivo).
+        timezone: Fuso do local de nascimento (ex.: ``"America/Sao_Paulo"``).
+        events: Eventos de vida, posteriores ao nascimento.
+        steps: Passos da busca em segundos, do mais grosso ao mais fino; cada
+            etapa cobre ± o passo anterior em volta dos picos.
+        keep: Picos refinados em cada etapa.
+        workers: Processos do pool. ``None`` usa ``os.cpu_count()`` a partir
+            de ``PARALLEL_THRESHOLD`` candidatas x eventos; ``1`` calcula no
+            processo atual.
+        chunk_size: Candidatas por bloco (e por chamada de ``progress``).
+        progress: Chamado a cada bloco com um ``RectificationProgress``.
+        should_stop: Consultado a cada bloco; se retornar verdadeiro, a busca
+            para e retorna o melhor resultado até ali.
+
+    Returns:
+        ``Rectification`` com a melhor candidata e os picos da última etapa
+        concluída (``stopped`` indica interrupção).
+
+    Raises:
+        ValueError: Sem eventos, com evento anterior ao nascimento ou com
+            passos inválidos.
+    """
+    started = time.perf_counter()
+    if not events:
+        raise ValueError("Informe ao menos um evento de vida")
+    if not steps or any(int(s) <= 0 for s in steps):
+        raise ValueError(f"Passos inválidos: {tuple(steps)}")
+    if any(int(b) > int(a) for a, b in zip(steps, steps[1:])):
+        raise ValueError("Os passos devem ir do mais grosso ao mais fino")
+    steps = tuple(int(s) for s in steps)
+
+    life_events = _normalize_events(events)
+    event_jds = julian_days_batch([e.date for e in life_events], [e.time for e in life_events], timezone)
+    birth_start = julian_days_batch([birth_date], [0], timezone)[0]
+    if np.any(event_jds < birth_start):
+        raise ValueError("Eventos de vida devem ser posteriores ao nascimento")
+
+    context = _Context(float(lat), float(lon), event_jds,
+                       np.array([e.weight for e in life_events], dtype=np.float64),
+                       positions_batch(event_jds, TRANSIT_BODIES)[..., 0])
+    if workers is None:
+        workers = (os.cpu_count() or 1) if SECONDS_PER_DAY // steps[0] * len(event_jds) >= PARALLEL_THRESHOLD else 1
+
+    evaluated: Dict[int, float] = {}
+    best: Optional[Candidate] = None
+    peaks: List[Candidate] = []
+    stopped = False
+
+    with ExitStack() as stack:
+        pool = None
+        if workers > 1:
+            pool = stack.enter_context(ProcessPoolExecutor(
+                max_workers=workers, initializer=_init_worker, initargs=(str(EPHE_DIR), context)))
+
+        previous_peaks = None
+        for stage, step in enumerate(steps):
+            if previous_peaks is None:
+                seconds = np.arange(0, SECONDS_PER_DAY, step)
+            else:
+                window = steps[stage - 1]
+                seconds = np.unique(np.concatenate([
+                    np.arange(peak - window, peak + window + 1, step) for peak in previous_peaks]))
+                seconds = seconds[(seconds >= 0) & (seconds < SECONDS_PER_DAY)]
+            seconds = np.array([s for s in seconds.tolist() if s not in evaluated], dtype=np.int64)
+
+            jds, flags = julian_days_batch([birth_date] * len(seconds), seconds, timezone,
+                                           return_flags=True)
+            # Horas puladas pelo relógio (início do horário de verão) não existiram
+            valid = flags != FLAG_NONEXISTENT
+            seconds, jds = seconds[valid], jds[valid]
+
+            chunks = [slice(start, start + chunk_size) for start in range(0, len(seconds), chunk_size)]
+            done = 0
+
+            def collect(chunk: slice, scores: np.ndarray) -> None:
+                nonlocal best, done
+                for s, value in zip(seconds[chunk].tolist(), scores.tolist()):
+                    evaluated[s] = value
+                top = int(np.argmax(scores))
+                if best is None or scores[top] > best.score:
+                    best = _candidate(seconds[chunk][top], jds[chunk][top], scores[top], lat, lon)
+                done += 1
+                if progress is not None:
+                    progress(RectificationProgress(stage, len(steps), done, len(chunks), best))
+
+            if pool is None:
+                for chunk in chunks:
+                    if should_stop is not None and should_stop():
+                        stopped = True
+                        break
+                    collect(chunk, _score(jds[chunk], context))
+            else:
+                pending: Dict[Future, slice] = {
+                    pool.submit(_score_chunk, jds[chunk]): chunk for chunk in chunks}
+                while pending:
+                    finished, _ = wait(pending, return_when=FIRST_COMPLETED)
+                    for future in finished:
+                        collect(pending.pop(future), future.result())
+                    if pending and should_stop is not None and should_stop():
+                        stopped = True
+                        for future in pending:
+                            future.cancel()
+                        break
+            if stopped:
+                break
+
+            # Picos entre tudo o que já foi avaliado, para não perder os das etapas anteriores
+            all_seconds = np.fromiter(evaluated.keys(), dtype=np.int64, count=len(evaluated))
+            all_scores = np.fromiter(evaluated.values(), dtype=np.float64, count=len(evaluated))
+            previous_peaks = _peaks(all_seconds, all_scores, keep).tolist()
+            peak_jds = julian_days_batch([birth_date] * len(previous_peaks), previous_peaks, timezone)
+            peaks = [_candidate(s, jd, evaluated[s], lat, lon)
+                     for s, jd in zip(previous_peaks, peak_jds.tolist())]
+
+    return Rectification(best, peaks, len(evaluated), time.perf_counter() - started, stopped)
@@ -0,0 +1,224 @@
+"""Cache de respostas da Samara, compartilhado por todas as sessões.
+
+Perguntas curtas e frequentes ("o que significa Sol em Leão?") recebem
+respostas praticamente intercambiáveis, então a resposta de uma sessão pode
+servir às seguintes. A chave é a última mensagem do usuário normalizada
+(sem acentos, caixa nem pontuação) mais o contexto do mapa que muda a
+resposta (signo solar e ascendente). Com ``similarity`` definido, perguntas
+com redação parecida no mesmo contexto também são atendidas pelo cache: a
+comparação é feita palavra a palavra, ignorando palavras vazias e tolerando
+erros de digitação só em palavras longas, para que "Sol" e "Lua" ou "casa 7"
+e "casa 1" continuem sendo perguntas diferentes.
+
+Só a primeira pergunta de cada conversa é cacheada. Depois dela, a resposta
+depende do histórico da sessão (mesmo "e sobre o amor então?" tem palavras
+suficientes), e servi-la a outra sessão vazaria contexto de um usuário para
+outro; por isso ``get`` e ``put`` ignoram mensagens com ``follow_up``.
+"""
+
+import difflib
+import re
+import threading
+import time
+from collections import OrderedDict
+from typing import Dict, NamedTuple, Optional, Tuple
+
+from gazetteer import normalize_name
+from instrumentation import register_cache
+
+DEFAULT_MAX_ENTRIES = 2000
+DEFAULT_TTL = 7 * 24 * 3600
+# Mensagens muito curtas ("sim", "e a Lua?") dependem da conversa anterior
+MIN_WORDS = 3
+# Limite de comparações por consulta aproximada
+SIMILARITY_SCAN_LIMIT = 500
+# Palavras com ao menos este tamanho aceitam erros de digitação
+TYPO_MIN_LENGTH = 4
+TYPO_RATIO = 0.8
+
+STOPWORDS = frozenset(
+    "o a os as um uma de do da dos das em no na nos nas e que qual quais eu me "
+    "meu minha meus minhas pra para por com se ser e voce sobre isso esse essa".split()
+)
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+Context = Tuple[Optional[str], ...]
+Key = Tuple[Context, str]
+
+
+def normalize_message(text: str) -> str:
+    """Normaliza a pergunta: sem acentos, caixa, pontuação e espaços extras."""
+    return normalize_name(_PUNCTUATION.sub(" ", text))
+
+
+def content_words(normalized: str) -> Tuple[str, ...]:
+    """Palavras da pergunta normalizada, sem palavras vazias."""
+    return tuple(word for word in normalized.split() if word not in STOPWORDS)
+
+
+def _same_word(a: str, b: str) -> bool:
+    """Iguais, ou a mesma palavra longa com um erro de digitação."""
+    if a == b:
+        return True
+    if min(len(a), len(b)) < TYPO_MIN_LENGTH or a.isdigit() or b.isdigit():
+        return False
+    return difflib.SequenceMatcher(None, a, b).ratio() >= TYPO_RATIO
+
+
+def word_similarity(a: Tuple[str, ...], b: Tuple[str, ...]) -> float:
+    """Razão de semelhança (0–1) entre duas sequências de palavras."""
+    if not a or not b:
+        return float(a == b)
+    # Alinha as palavras de b às de a quando só diferem por digitação
+    aligned = tuple(next((word for word in a if _same_word(word, other)), other) for other in b)
+    return difflib.SequenceMatcher(None, a, aligned, autojunk=False).ratio()
+
+
+def chart_context(sun_sign: Optional[str] = None, ascendant: Optional[str] = None) -> Context:
+    """Parte da chave que depende do mapa do usuário."""
+    return (sun_sign, ascendant)
+
+
+class _Entry(NamedTuple):
+    """Resposta armazenada, com o instante de gravação e a latência original."""
+
+    response: str
+    created: float
+    latency: float
+    words: Tuple[str, ...]
+
+
+class CacheHit(NamedTuple):
+    """Resultado de uma consulta atendida pelo cache."""
+
+    response: str
+    similarity: float
+    latency_saved: float
+
+
+class ResponseCache:
+    """Cache LRU com TTL, agrupado por contexto do mapa, seguro para threads."""
+
+    def __init__(self, max_entries: int = DEFAULT_MAX_ENTRIES, ttl: float = DEFAULT_TTL,
+                 similarity: Optional[float] = None, min_words: int = MIN_WORDS) -> None:
+        """Cria um cache vazio.
+
+        Args:
+            max_entries: Limite de respostas armazenadas (em todos os contextos).
+            ttl: Validade de cada resposta, em segundos.
+            similarity: Semelhança mínima (0–1) entre as palavras para aceitar
+                uma pergunta parecida; ``None`` exige a mesma pergunta normalizada.
+            min_words: Perguntas com menos palavras não são cacheadas.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.similarity = similarity
+        self.min_words = min_words
+        self._data: "OrderedDict[Key, _Entry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._stats: Dict[str, float] = {
+            "hits": 0, "similar_hits": 0, "misses": 0, "skipped": 0,
+            "expired": 0, "evictions": 0, "latency_saved": 0.0
+        }
+
+    def _key(self, message: str, context: Context, follow_up: bool = False) -> Optional[Key]:
+        """Chave de cache, ou ``None`` se a mensagem não deve ser cacheada."""
+        if follow_up:
+            return None
+        normalized = normalize_message(message)
+        if len(normalized.split()) < self.min_words:
+            return None
+        return (context, normalized)
+
+    def _similar(self, key: Key, now: float) -> Tuple[Optional[Key], float]:
+        """Entrada mais parecida no mesmo contexto, acima do limiar."""
+        context, text = key
+        words = content_words(text)
+        best, best_ratio = None, 0.0
+        scanned = 0
+        # Das mais recentes para as mais antigas
+        for candidate in reversed(self._data):
+            if candidate[0] != context:
+                continue
+            scanned += 1
+            if scanned > SIMILARITY_SCAN_LIMIT:
+                break
+            entry = self._data[candidate]
+            if now - entry.created > self.ttl:
+                continue
+            ratio = word_similarity(words, entry.words)
+            if ratio >= self.similarity and ratio > best_ratio:
+                best, best_ratio = candidate, ratio
+        return best, best_ratio
+
+    def get(self, message: str, context: Context = (None, None),
+            follow_up: bool = False) -> Optional[CacheHit]:
+        """Resposta em cache para a mensagem no contexto, se houver.
+
+        ``follow_up`` indica que a sessão já tem perguntas anteriores: a
+        consulta é pulada, porque a resposta dependeria do histórico.
+        """
+        key = self._key(message, context, follow_up)
+        now = time.time()
+        with self._lock:
+            if key is None:
+                self._stats["skipped"] += 1
+                return None
+            ratio = 1.0
+            entry = self._data.get(key)
+            if entry is not None and now - entry.created > self.ttl:
+                del self._data[key]
+                self._stats["expired"] += 1
+                entry = None
+            if entry is None and self.similarity is not None:
+                match, ratio = self._similar(key, now)
+                if match is not None:
+                    key, entry = match, self._data[match]
+                    self._stats["similar_hits"] += 1
+            if entry is None:
+                self._stats["misses"] += 1
+                return None
+            self._data.move_to_end(key)
+            self._stats["hits"] += 1
+            self._stats["latency_saved"] += entry.latency
+            return CacheHit(entry.response, ratio, entry.latency)
+
+    def put(self, message: str, context: Context, response: str, latency: float = 0.0,
+            follow_up: bool = False) -> None:
+        """Grava a resposta e a latência que ela custou no upstream.
+
+        Respostas a ``follow_up`` nunca são gravadas (veja ``get``).
+        """
+        key = self._key(message, context, follow_up)
+        if key is None or not response:
+            return
+        with self._lock:
+            self._data[key] = _Entry(response, time.time(), latency, content_words(key[1]))
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_entries:
+                self._data.popitem(last=False)
+                self._stats["evictions"] += 1
+
+    def clear(self) -> None:
+        """Esvazia o cache e zera as estatísticas."""
+        with self._lock:
+            self._data.clear()
+            for name in self._stats:
+                self._stats[name] = 0
+
+    def __len__(self) -> int:
+        """Quantidade de respostas armazenadas."""
+        return len(self._data)
+
+    def stats(self) -> Dict[str, float]:
+        """Acertos (exatos e aproximados), faltas, taxa de acerto e latência poupada."""
+        with self._lock:
+            stats = dict(self._stats, size=len(self._data), max_entries=self.max_entries)
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+RESPONSE_CACHE = ResponseCache(similarity=0.9)
+register_cache("chat_responses", RESPONSE_CACHE.stats)
@@ -0,0 +1,181 @@
+"""Revoluções solares e lunares e progressões secundárias.
+
+O retorno de um corpo é o instante em que ele volta à longitude natal. Como
+o Sol e a Lua nunca ficam retrógrados, a longitude é monótona e o Newton com
+a velocidade do próprio ``swe.calc_ut`` converge em três ou quatro
+avaliações, até precisão de subsegundo.
+
+``return_calendar`` pré-calcula os retornos de décadas num único array de
+dias julianos (a Lua volta a cada ~27,3 dias: 50 anos cabem em ~5 KB). As
+estimativas iniciais saem do período médio e o Newton roda vetorizado sobre
+todas de uma vez, com uma chamada a ``planet_positions_batch`` por
+iteração. Depois disso, a visão de um mês ou "qual revolução está em vigor"
+é só um ``np.searchsorted``.
+
+As progressões secundárias usam a chave "um dia por ano": a posição
+progredida numa data é a posição real ``(data - nascimento) / ano trópico``
+dias depois do nascimento.
+"""
+
+import datetime
+from typing import Any, Dict, NamedTuple, Optional, Sequence, Union
+
+import numpy as np
+import swisseph as swe
+
+from ephemeris import CALC_FLAGS, PLANETS, planet_positions_batch
+from instrumentation import timed
+from julian import julian_days_batch
+from transits import MAX_ITERATIONS, TIME_TOLERANCE, _wrap180
+from utils import calculate_houses, get_planet_positions
+
+TROPICAL_YEAR = 365.24219
+# Mês trópico médio: intervalo médio entre retornos da Lua à mesma longitude
+TROPICAL_MONTH = 27.321582
+RETURN_PERIODS = {
+    "Sun": TROPICAL_YEAR,
+    "Moon": TROPICAL_MONTH
+}
+RETURN_BODIES = tuple(RETURN_PERIODS)
+
+
+class ReturnCalendar(NamedTuple):
+    """Retornos de um corpo à longitude natal, em ordem, como dias julianos (UT)."""
+
+    body: str
+    natal_jd: float
+    longitude: float
+    jds: np.ndarray
+
+    def between(self, start_jd: float, end_jd: float) -> np.ndarray:
+        """Retornos em ``[start_jd, end_jd)`` (visão sem cópia)."""
+        lo, hi = np.searchsorted(self.jds, [start_jd, end_jd])
+        return self.jds[lo:hi]
+
+    def active_at(self, jd: float) -> Optional[float]:
+        """Último retorno até ``jd``: a revolução em vigor; ``None`` antes do calendário."""
+        i = int(np.searchsorted(self.jds, jd, side="right"))
+        return float(self.jds[i - 1]) if i else None
+
+    def month(self, year: int, month: int, timezone: str) -> np.ndarray:
+        """Retornos dentro de um mês civil no fuso ``timezone``."""
+        first = datetime.date(year, month, 1)
+        following = datetime.date(year + month // 12, month % 12 + 1, 1)
+        start_jd, end_jd = julian_days_batch([first, following], [0, 0], timezone)
+        return self.between(start_jd, end_jd)
+
+
+def _body_id(body: str) -> int:
+    """Identificador do corpo no Swiss Ephemeris, restrito a ``RETURN_BODIES``."""
+    if body not in RETURN_PERIODS:
+        raise ValueError(f"Retornos calculados apenas para {', '.join(RETURN_BODIES)}: {body}")
+    return PLANETS[body]
+
+
+def natal_longitude(natal_jd: float, body: str) -> float:
+    """Longitude eclíptica do corpo no nascimento."""
+    return swe.calc_ut(natal_jd, _body_id(body), CALC_FLAGS)[0][0]
+
+
+def exact_return(body: str, longitude: float, guess: float) -> float:
+    """Instante (UT) mais próximo de ``guess`` em que ``body`` passa por ``longitude``.
+
+    Newton sobre a longitude com a velocidade do ``swe.calc_ut``; o retorno
+    encontrado é o que está a menos de meio período de ``guess``.
+    """
+    body_id = _body_id(body)
+    t = guess
+    for _ in range(MAX_ITERATIONS):
+        values = swe.calc_ut(t, body_id, CALC_FLAGS)[0]
+        step = _wrap180(values[0] - longitude) / values[3]
+        t -= step
+        if abs(step) < TIME_TOLERANCE:
+            break
+    return t
+
+
+def solar_return(natal_jd: float, year: int) -> float:
+    """Revolução solar do aniversário de ``year`` (dia juliano UT).
+
+    Newton a partir do aniversário: ``natal_jd`` mais ``year`` menos o ano
+    de nascimento em anos trópicos. Para quem nasceu perto da virada do
+    ano, o retorno pode cair em 31 de dezembro do ano anterior (ou em 1º de
+    janeiro do seguinte): é a revolução do aniversário de ``year``, não a
+    que cai dentro do ano civil.
+    """
+    birth_year = swe.revjul(natal_jd)[0]
+    guess = natal_jd + (year - birth_year) * TROPICAL_YEAR
+    return exact_return("Sun", natal_longitude(natal_jd, "Sun"), guess)
+
+
+def next_return(natal_jd: float, after_jd: float, body: str = "Moon") -> float:
+    """Primeiro retorno de ``body`` à longitude natal a partir de ``after_jd``."""
+    body_id = _body_id(body)
+    target = natal_longitude(natal_jd, body)
+    values = swe.calc_ut(after_jd, body_id, CALC_FLAGS)[0]
+    guess = after_jd + ((target - values[0]) % 360.0) / values[3]
+    jd = exact_return(body, target, guess)
+    if jd < after_jd:
+        jd = exact_return(body, target, jd + RETURN_PERIODS[body])
+    return jd
+
+
+def lunar_return(natal_jd: float, after_jd: float) -> float:
+    """Primeira revolução lunar a partir de ``after_jd``."""
+    return next_return(natal_jd, after_jd, "Moon")
+
+
+@timed("returns.calendar")
+def return_calendar(natal_jd: float, start_jd: float, end_jd: float,
+                    body: str = "Moon") -> ReturnCalendar:
+    """Todos os retornos de ``body`` em ``[start_jd, end_jd)``.
+
+    Args:
+        natal_jd: Dia juliano (UT) do nascimento.
+        start_jd: Início do calendário.
+        end_jd: Fim (exclusivo) do calendário.
+        body: ``"Moon"`` (revoluções lunares) ou ``"Sun"``.
+
+    Returns:
+        ``ReturnCalendar`` com os instantes em ``float64``, ordenados.
+    """
+    target = natal_longitude(natal_jd, body)
+    first = next_return(natal_jd, start_jd, body)
+    period = RETURN_PERIODS[body]
+    jds = first + np.arange(int((end_jd - first) // period) + 2) * period
+
+    for _ in range(MAX_ITERATIONS):
+        positions = planet_positions_batch(jds, (body,))[:, 0]
+        step = ((positions[:, 0] - target + 180.0) % 360.0 - 180.0) / positions[:, 3]
+        jds -= step
+        if np.abs(step).max() < TIME_TOLERANCE:
+            break
+    jds = jds[(jds >= start_jd) & (jds < end_jd)]
+    return ReturnCalendar(body, float(natal_jd), target, np.ascontiguousarray(jds))
+
+
+def return_chart(jd: float, lat: float, lon: float, house_system: bytes = b'P') -> Dict[str, Any]:
+    """Mapa de um retorno: posições e casas no instante ``jd`` para o local da revolução."""
+    return {
+        'jd': jd,
+        'planets': get_planet_positions(jd),
+        'houses': calculate_houses(jd, lat, lon, house_system)
+    }
+
+
+def progressed_jd(natal_jd: Union[float, np.ndarray],
+                  target_jd: Union[float, np.ndarray]) -> Union[float, np.ndarray]:
+    """Instante cujas posições valem como progredidas para ``target_jd`` (um dia por ano)."""
+    return natal_jd + (target_jd - natal_jd) / TROPICAL_YEAR
+
+
+def progressed_positions(natal_jd: float, target_jds: Sequence[float],
+                         bodies: Optional[Sequence[str]] = None) -> np.ndarray:
+    """Posições progredidas para várias datas: ``(n, n_corpos, 6)`` como em ``planet_positions_batch``."""
+    target = np.asarray(target_jds, dtype=np.float64)
+    return planet_positions_batch(progressed_jd(natal_jd, target), bodies)
+
+
+def progressed_chart(natal_jd: float, target_jd: float) -> Dict[str, Dict[str, float]]:
+    """Posições progredidas numa data, no formato de ``get_planet_positions``."""
+    return get_planet_positions(progressed_jd(natal_jd, target_jd))
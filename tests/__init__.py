@@ -0,0 +1 @@
+"""Testes do projeto (pytest)."""
@@ -0,0 +1,157 @@
+"""Testes dos caminhos de erro da API com o cliente local do Starlette."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List
+
+import pytest
+from starlette.testclient import TestClient
+
+import api
+
+if TYPE_CHECKING:
+    from _pytest.capture import CaptureFixture
+    from _pytest.fixtures import FixtureRequest
+    from _pytest.logging import LogCaptureFixture
+    from _pytest.monkeypatch import MonkeyPatch
+    from pytest_mock.plugin import MockerFixture
+
+J2000 = 2451545.0
+SAO_PAULO = {"lat": "-23.55", "lon": "-46.63"}
+
+
+@pytest.fixture(scope="module")
+def client() -> Iterator[TestClient]:
+    """Cliente local com o ciclo de vida da aplicação (pool de processos)."""
+    with TestClient(api.app) as test_client:
+        yield test_client
+
+
+@pytest.mark.parametrize("path, params", [
+    ("/positions", {}),
+    ("/houses", {"jd": J2000, "lat": "-23.55"}),
+    ("/location", {}),
+    ("/chart", {"date": "2000-01-01"}),
+])
+def test_missing_parameter_is_400(client: TestClient, path: str, params: Dict[str, Any]) -> None:
+    """Parâmetro obrigatório ausente vira 400 com mensagem."""
+    response = client.get(path, params=params)
+    assert response.status_code == 400
+    assert "ausente" in response.json()["error"]
+
+
+@pytest.mark.parametrize("lat", ["91", "-90.5", "nan", "inf", "abc"])
+def test_invalid_latitude_is_400(client: TestClient, lat: str) -> None:
+    """Latitude fora de ±90° ou não numérica é rejeitada."""
+    response = client.get("/houses", params={"jd": J2000, "lat": lat, "lon": "0"})
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize("jd", ["1e9", "-1e9", "nan", "inf", "x"])
+def test_invalid_julian_day_is_400(client: TestClient, jd: str) -> None:
+    """Dia juliano não finito ou fora das efemérides instaladas é rejeitado."""
+    response = client.get("/positions", params={"jd": jd})
+    assert response.status_code == 400
+
+
+def test_date_outside_ephemeris_is_400(client: TestClient) -> None:
+    """Data civil fora do período das efemérides também é 400."""
+    response = client.get("/positions", params={"date": "1700-01-01", "time": "12:00",
+                                                "timezone": "UTC"})
+    assert response.status_code == 400
+    assert "fora do período" in response.json()["error"]
+
+
+@pytest.mark.parametrize("params", [
+    {"date": "2000-13-01", "time": "12:00", "timezone": "UTC"},
+    {"date": "2000-01-01", "time": "25:00", "timezone": "UTC"},
+    {"date": "2000-01-01", "time": "12:00", "timezone": "Marte/Olimpo"},
+])
+def test_invalid_date_time_or_timezone_is_400(client: TestClient, params: Dict[str, Any]) -> None:
+    """Data, hora ou fuso inválidos são erros do cliente."""
+    assert client.get("/positions", params=params).status_code == 400
+
+
+@pytest.mark.parametrize("system", ["Z", "é", "PP", "p"])
+def test_unknown_house_system_is_400(client: TestClient, system: str) -> None:
+    """Sistema de casas fora de ``houses.SYSTEMS`` é rejeitado."""
+    response = client.get("/houses", params={"jd": J2000, "system": system, **SAO_PAULO})
+    assert response.status_code == 400
+    assert "Sistema de casas" in response.json()["error"]
+
+
+def test_polar_placidus_is_422(client: TestClient) -> None:
+    """Placidus acima do círculo polar é válido como pedido, mas sem solução."""
+    response = client.get("/houses", params={"jd": J2000, "lat": "80", "lon": "0"})
+    assert response.status_code == 422
+    assert response.json()["error"].startswith("Cálculo impossível")
+
+
+def test_polar_whole_sign_succeeds(client: TestClient) -> None:
+    """O mesmo local funciona com um sistema que existe em latitudes polares."""
+    response = client.get("/houses", params={"jd": J2000, "lat": "80", "lon": "0",
+                                             "system": "W"})
+    assert response.status_code == 200
+    assert len(response.json()["houses"]["cusps"]) == 12
+
+
+def test_chart_validates_before_geocoding(client: TestClient, monkeypatch: MonkeyPatch) -> None:
+    """Parâmetros inválidos não chegam a consultar o geocodificador."""
+    def fail(query: str) -> None:
+        """Geocodificação que não deveria acontecer."""
+        pytest.fail(f"geocodificou {query!r}")
+
+    monkeypatch.setattr(api, "get_location_data", fail)
+    bad_system = client.get("/chart", params={"date": "2000-01-01", "time": "12:00",
+                                              "place": "Campinas, SP", "system": "Z"})
+    bad_date = client.get("/chart", params={"date": "2000-02-30", "time": "12:00",
+                                            "place": "Campinas, SP"})
+    assert (bad_system.status_code, bad_date.status_code) == (400, 400)
+
+
+def test_unknown_place_is_404(client: TestClient, monkeypatch: MonkeyPatch) -> None:
+    """Lugar que não pode ser localizado vira 404."""
+    def not_found(query: str) -> None:
+        """Geocodificador sem resultado, como ``get_location_data``."""
+        raise ValueError(f"Local não encontrado: {query}")
+
+    monkeypatch.setattr(api, "get_location_data", not_found)
+    response = client.get("/chart", params={"date": "2000-01-01", "time": "12:00",
+                                            "place": "Lugar Nenhum"})
+    assert response.status_code == 404
+
+
+def test_valid_chart(client: TestClient) -> None:
+    """Mapa válido por coordenadas responde com posições e casas serializáveis."""
+    response = client.get("/chart", params={"jd": J2000, "timezone": "America/Sao_Paulo",
+                                            **SAO_PAULO})
+    assert response.status_code == 200
+    body = response.json()
+    assert set(body["positions"]) >= {"Sun", "Moon"}
+    assert len(body["houses"]["cusps"]) == 12
+
+
+def test_startup_fails_without_ephemeris(monkeypatch: MonkeyPatch) -> None:
+    """Se as efemérides não puderem ser garantidas, a aplicação não sobe."""
+    monkeypatch.setattr(api, "service", api.ChartService(workers=1))
+    monkeypatch.setattr(api, "ensure_ephemeris", lambda: False)
+    with pytest.raises(api.EphemerisError):
+        with TestClient(api.app):
+            pass
+    assert api.service.pool is None
+
+
+def test_startup_ensures_ephemeris(monkeypatch: MonkeyPatch) -> None:
+    """A inicialização chama ``ensure_ephemeris`` antes de subir o pool."""
+    calls: List[bool] = []
+
+    def ensure() -> bool:
+        """Registra a chamada; o pool ainda não pode existir."""
+        calls.append(api.service.pool is None)
+        return True
+
+    monkeypatch.setattr(api, "service", api.ChartService(workers=1))
+    monkeypatch.setattr(api, "ensure_ephemeris", ensure)
+    with TestClient(api.app) as test_client:
+        assert test_client.get("/health").status_code == 200
+    assert calls == [True]
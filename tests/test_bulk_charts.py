@@ -0,0 +1,97 @@
+"""Testes da retomada de jobs de ``bulk_charts`` pelo checkpoint."""
+
+from __future__ import annotations
+
+import json
+import os
+from pathlib import Path
+from typing import TYPE_CHECKING, List
+
+import pytest
+
+import bulk_charts
+from bulk_charts import _input_identity, _save_checkpoint, run
+
+if TYPE_CHECKING:
+    from _pytest.capture import CaptureFixture
+    from _pytest.fixtures import FixtureRequest
+    from _pytest.logging import LogCaptureFixture
+    from _pytest.monkeypatch import MonkeyPatch
+    from pytest_mock.plugin import MockerFixture
+
+HEADER = "id,date,time,latitude,longitude,timezone\n"
+
+
+def write_births(path: Path, ids: List[str]) -> Path:
+    """CSV de nascimentos em São Paulo com os ``ids`` dados."""
+    rows = [f"{i},1990-05-{n + 1:02d},12:00,-23.55,-46.63,America/Sao_Paulo\n"
+            for n, i in enumerate(ids)]
+    path.write_text(HEADER + "".join(rows), encoding="utf-8")
+    return path
+
+
+def output_ids(path: Path) -> List[str]:
+    """Ids gravados na saída JSONL, em ordem."""
+    return [json.loads(line)["id"] for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def interrupted(input_path: Path, output: Path, records: int) -> Path:
+    """Simula um job interrompido depois de ``records`` registros; retorna o checkpoint."""
+    run(input_path, output, workers=1, offline=True)
+    lines = output.read_bytes().splitlines(keepends=True)[:records]
+    output.write_bytes(b"".join(lines))
+    checkpoint = output.with_name(output.name + ".checkpoint.json")
+    _save_checkpoint(checkpoint, dict(_input_identity(input_path), records=records,
+                                      sink={"offset": sum(map(len, lines))}))
+    return checkpoint
+
+
+def test_resume_continues_same_input(tmp_path: Path) -> None:
+    """Com a mesma entrada, só os registros restantes são calculados."""
+    births = write_births(tmp_path / "births.csv", ["a", "b", "c"])
+    output = tmp_path / "charts.jsonl"
+    checkpoint = interrupted(births, output, 2)
+
+    stats = run(births, output, workers=1, offline=True, resume=True)
+
+    assert output_ids(output) == ["a", "b", "c"]
+    assert stats["charts"] == 1
+    assert not checkpoint.exists()
+
+
+def test_resume_refuses_other_input(tmp_path: Path) -> None:
+    """Outro CSV com a mesma saída não pula linhas: erro, e a saída fica intacta."""
+    births = write_births(tmp_path / "births.csv", ["a", "b", "c"])
+    other = write_births(tmp_path / "other.csv", ["x", "y", "z"])
+    output = tmp_path / "charts.jsonl"
+    interrupted(births, output, 2)
+    before = output.read_bytes()
+
+    with pytest.raises(ValueError, match="Checkpoint de outra entrada"):
+        run(other, output, workers=1, offline=True, resume=True)
+    assert output.read_bytes() == before
+
+
+def test_resume_refuses_modified_input(tmp_path: Path) -> None:
+    """A mesma entrada alterada depois do checkpoint também é recusada."""
+    births = write_births(tmp_path / "births.csv", ["a", "b", "c"])
+    output = tmp_path / "charts.jsonl"
+    interrupted(births, output, 1)
+    write_births(births, ["novo", "a", "b", "c"])
+    stat = births.stat()
+    os.utime(births, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+    with pytest.raises(ValueError, match="input_size"):
+        run(births, output, workers=1, offline=True, resume=True)
+
+
+def test_identity_is_recorded(tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
+    """O checkpoint gravado durante o job traz caminho, tamanho e mtime da entrada."""
+    births = write_births(tmp_path / "births.csv", ["a"])
+    saved: List[dict] = []
+    monkeypatch.setattr(bulk_charts, "_save_checkpoint",
+                        lambda path, state: saved.append(state))
+
+    run(births, tmp_path / "charts.jsonl", workers=1, offline=True)
+
+    assert saved and {k: saved[-1][k] for k in _input_identity(births)} == _input_identity(births)
@@ -0,0 +1,213 @@
+"""Testes do streaming SSE do cliente de chat contra um servidor SSE local."""
+
+from __future__ import annotations
+
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Tuple
+
+import pytest
+
+from chat_client import ChatClient, ChatError, iter_sse, make_session
+
+if TYPE_CHECKING:
+    from _pytest.capture import CaptureFixture
+    from _pytest.fixtures import FixtureRequest
+    from _pytest.logging import LogCaptureFixture
+    from _pytest.monkeypatch import MonkeyPatch
+    from pytest_mock.plugin import MockerFixture
+
+FIRST_TOKEN_DELAY = 0.2
+
+
+def delta(text: str) -> str:
+    """Evento SSE de um pedaço de texto no formato do OpenRouter."""
+    return "data: " + json.dumps({"choices": [{"delta": {"content": text}}]}) + "\n\n"
+
+
+class SSEServer(ThreadingHTTPServer):
+    """Servidor SSE falso: cada POST recebe o próximo roteiro de ``scripts``."""
+
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        """Escuta numa porta livre de ``127.0.0.1``."""
+        super().__init__(("127.0.0.1", 0), SSEHandler)
+        # Cada roteiro: (status, [eventos]); "<pause>" espera ``resume``
+        self.scripts: List[Tuple[int, List[str]]] = []
+        self.default: Tuple[int, List[str]] = (200, [delta("Olá"), "data: [DONE]\n\n"])
+        self.resume = threading.Event()
+        self.requests: List[Dict[str, Any]] = []
+        self.client_ports: List[int] = []
+
+    @property
+    def url(self) -> str:
+        """Endereço do endpoint de chat completions."""
+        return f"http://127.0.0.1:{self.server_address[1]}/chat/completions"
+
+
+class SSEHandler(BaseHTTPRequestHandler):
+    """Responde com eventos em ``Transfer-Encoding: chunked`` (HTTP/1.1 keep-alive)."""
+
+    protocol_version = "HTTP/1.1"
+    server: SSEServer
+
+    def _chunk(self, data: bytes) -> None:
+        """Envia um pedaço chunked imediatamente."""
+        self.wfile.write(b"%x\r\n%s\r\n" % (len(data), data))
+        self.wfile.flush()
+
+    def do_POST(self) -> None:
+        """Registra a requisição e executa o roteiro."""
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.server.requests.append({"headers": dict(self.headers), "json": json.loads(body)})
+        self.server.client_ports.append(self.client_address[1])
+        status, events = self.server.scripts.pop(0) if self.server.scripts else self.server.default
+
+        if status >= 400:
+            payload = json.dumps({"error": {"message": "modelo indisponível"}}).encode()
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(payload)))
+            self.end_headers()
+            self.wfile.write(payload)
+            return
+
+        self.send_response(status)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        self._chunk(b": keep-alive\n\n")
+        time.sleep(FIRST_TOKEN_DELAY)
+        for event in events:
+            if event == "<pause>":
+                self.server.resume.wait(5)
+                continue
+            self._chunk(event.encode("utf-8"))
+        self.wfile.write(b"0\r\n\r\n")
+        self.wfile.flush()
+
+    def log_message(self, format: str, *args: Any) -> None:
+        """Silencia o log de cada requisição."""
+
+
+@pytest.fixture
+def server() -> Iterator[SSEServer]:
+    """Servidor SSE rodando numa thread durante o teste."""
+    sse_server = SSEServer()
+    thread = threading.Thread(target=sse_server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield sse_server
+    sse_server.resume.set()
+    sse_server.shutdown()
+    sse_server.server_close()
+
+
+@pytest.fixture
+def client(server: SSEServer) -> ChatClient:
+    """Cliente apontado para o servidor local, sem espera entre novas tentativas."""
+    return ChatClient("chave-teste", url=server.url, model="modelo/teste",
+                      timeout=(2.0, 5.0), session=make_session(backoff_factor=0))
+
+
+def test_iter_sse_parses_events() -> None:
+    """Comentários são ignorados, linhas ``data`` se juntam e o último evento sai sem linha vazia."""
+    lines = [": ping", "data: a", "", "event: x", "data: b", "data:c", "", "data: fim"]
+    assert list(iter_sse(lines)) == ["a", "b\nc", "fim"]
+
+
+def test_stream_yields_chunks_as_they_arrive(client: ChatClient, server: SSEServer) -> None:
+    """O primeiro pedaço chega antes de o servidor mandar o resto."""
+    server.scripts.append((200, [delta("Os astros "), "<pause>", delta("dizem sim."),
+                                 "data: [DONE]\n\n"]))
+    chat_stream = client.stream([{"role": "user", "content": "E aí?"}])
+    chunks = iter(chat_stream)
+
+    assert next(chunks) == "Os astros "
+    assert chat_stream.metrics is None
+    server.resume.set()
+    assert list(chunks) == ["dizem sim."]
+    assert chat_stream.text == "Os astros dizem sim."
+
+
+def test_metrics_record_time_to_first_token(client: ChatClient, server: SSEServer) -> None:
+    """O tempo até o primeiro token mede a espera do servidor e fica abaixo do total."""
+    pause = 0.1
+    server.scripts.append((200, [delta("a"), "<pause>", delta("b"), "data: [DONE]\n\n"]))
+    threading.Timer(FIRST_TOKEN_DELAY + pause + 0.1, server.resume.set).start()
+
+    text, metrics = client.complete([{"role": "user", "content": "oi"}])
+
+    assert text == "ab"
+    assert metrics.time_to_first_token is not None
+    assert FIRST_TOKEN_DELAY <= metrics.time_to_first_token < metrics.total
+    assert metrics.total - metrics.time_to_first_token >= pause
+    assert (metrics.chunks, metrics.characters, metrics.model) == (2, 2, "modelo/teste")
+    assert client.stats()["messages"] == 1
+    assert client.stats()["avg_time_to_first_token"] == metrics.time_to_first_token
+
+
+def test_request_carries_stream_flag_and_auth(client: ChatClient, server: SSEServer) -> None:
+    """O corpo pede ``stream`` e o cabeçalho leva a chave e aceita SSE."""
+    client.complete([{"role": "user", "content": "oi"}], temperature=0.7)
+
+    request = server.requests[0]
+    assert request["json"]["stream"] is True
+    assert request["json"]["model"] == "modelo/teste"
+    assert request["json"]["temperature"] == 0.7
+    assert request["headers"]["Authorization"] == "Bearer chave-teste"
+    assert request["headers"]["Accept"] == "text/event-stream"
+
+
+def test_utf8_without_charset_is_decoded(client: ChatClient, server: SSEServer) -> None:
+    """Sem ``charset`` no ``Content-Type``, o texto continua sendo UTF-8."""
+    server.scripts.append((200, [delta("Ação e coração ✨"), "data: [DONE]\n\n"]))
+    text, _ = client.complete([{"role": "user", "content": "oi"}])
+    assert text == "Ação e coração ✨"
+
+
+def test_connection_is_reused(client: ChatClient, server: SSEServer) -> None:
+    """Depois de ``[DONE]`` a conexão volta ao pool e serve a próxima mensagem."""
+    client.complete([{"role": "user", "content": "um"}])
+    client.complete([{"role": "user", "content": "dois"}])
+    assert len(server.client_ports) == 2
+    assert server.client_ports[0] == server.client_ports[1]
+
+
+def test_error_event_raises(client: ChatClient, server: SSEServer) -> None:
+    """Erro dentro do stream vira ``ChatError`` depois do texto já entregue."""
+    error = "data: " + json.dumps({"error": {"message": "limite de tokens"}}) + "\n\n"
+    server.scripts.append((200, [delta("parcial"), error]))
+    chat_stream = client.stream([{"role": "user", "content": "oi"}])
+
+    with pytest.raises(ChatError, match="limite de tokens"):
+        for _ in chat_stream:
+            pass
+    assert chat_stream.text == "parcial"
+    assert chat_stream.metrics is not None
+
+
+def test_http_error_raises_with_detail(client: ChatClient, server: SSEServer) -> None:
+    """Resposta 4xx vira ``ChatError`` com a mensagem da API."""
+    server.scripts.append((400, []))
+    with pytest.raises(ChatError, match="HTTP 400: modelo indisponível"):
+        client.stream([{"role": "user", "content": "oi"}])
+
+
+def test_retries_transient_status(client: ChatClient, server: SSEServer) -> None:
+    """503 antes do stream é repetido pela sessão, sem duplicar texto."""
+    server.scripts.append((503, []))
+    text, _ = client.complete([{"role": "user", "content": "oi"}])
+    assert text == "Olá"
+    assert len(server.requests) == 2
+
+
+def test_no_content_has_no_first_token(client: ChatClient, server: SSEServer) -> None:
+    """Resposta sem texto registra ``None`` como tempo até o primeiro token."""
+    server.scripts.append((200, ["data: [DONE]\n\n"]))
+    text, metrics = client.complete([{"role": "user", "content": "oi"}])
+    assert text == ""
+    assert metrics.time_to_first_token is None
+    assert client.stats()["avg_time_to_first_token"] == 0.0
@@ -0,0 +1,231 @@
+"""Testes do download de efemérides contra um servidor HTTP local."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+from typing import TYPE_CHECKING, Any, Dict, Iterator, List, Optional, Set, Tuple
+
+import pytest
+
+from ephe_manager import EphemerisError, EphemerisManager
+
+if TYPE_CHECKING:
+    from _pytest.capture import CaptureFixture
+    from _pytest.fixtures import FixtureRequest
+    from _pytest.logging import LogCaptureFixture
+    from _pytest.monkeypatch import MonkeyPatch
+    from pytest_mock.plugin import MockerFixture
+
+FILES = {
+    "sepl_18.se1": os.urandom(300_000),
+    "semo_18.se1": os.urandom(120_000),
+    "seas_18.se1": os.urandom(50_000),
+}
+
+
+class FileServer(ThreadingHTTPServer):
+    """Servidor de arquivos com ``Range`` e falhas programáveis."""
+
+    daemon_threads = True
+
+    def __init__(self) -> None:
+        """Escuta numa porta livre de ``127.0.0.1``."""
+        super().__init__(("127.0.0.1", 0), FileHandler)
+        self.files: Dict[str, bytes] = dict(FILES)
+        self.supports_range = True
+        # Nomes servidos com um byte trocado
+        self.corrupt: Set[str] = set()
+        # Nomes cuja próxima resposta é cortada no meio
+        self.truncate_once: Set[str] = set()
+        self.requests: List[Tuple[str, Optional[str]]] = []
+
+    @property
+    def base_url(self) -> str:
+        """URL base com barra final, como no manifesto."""
+        return f"http://127.0.0.1:{self.server_address[1]}/"
+
+
+class FileHandler(BaseHTTPRequestHandler):
+    """Responde ``GET /<nome>`` com o conteúdo (ou o trecho) pedido."""
+
+    server: FileServer
+
+    def do_GET(self) -> None:
+        """Serve o arquivo inteiro, um trecho (206) ou 416 se o início passou do fim."""
+        name = self.path.lstrip("/")
+        requested = self.headers.get("Range")
+        self.server.requests.append((name, requested))
+        data = self.server.files.get(name)
+        if data is None:
+            self.send_error(404)
+            return
+        if name in self.server.corrupt:
+            data = bytes([data[0] ^ 0xFF]) + data[1:]
+
+        start = 0
+        if requested and self.server.supports_range:
+            start = int(requested.split("=", 1)[1].rstrip("-"))
+            if start >= len(data):
+                self.send_response(416)
+                self.send_header("Content-Range", f"bytes */{len(data)}")
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            self.send_response(206)
+            self.send_header("Content-Range", f"bytes {start}-{len(data) - 1}/{len(data)}")
+        else:
+            self.send_response(200)
+        body = data[start:]
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        if name in self.server.truncate_once:
+            self.server.truncate_once.discard(name)
+            self.wfile.write(body[:len(body) // 2])
+            self.wfile.flush()
+            self.close_connection = True
+            return
+        self.wfile.write(body)
+
+    def log_message(self, format: str, *args: Any) -> None:
+        """Silencia o log de cada requisição."""
+
+
+@pytest.fixture
+def server() -> Iterator[FileServer]:
+    """Servidor local rodando numa thread durante o teste."""
+    file_server = FileServer()
+    thread = threading.Thread(target=file_server.serve_forever, args=(0.05,), daemon=True)
+    thread.start()
+    yield file_server
+    file_server.shutdown()
+    file_server.server_close()
+
+
+def write_manifest(path: Path, pinned: bool = True) -> Path:
+    """Manifesto do trio ``_18`` com os hashes de ``FILES`` (ou sem fixá-los)."""
+    files = [
+        {"name": name, "start_year": 1800, "end_year": 2399,
+         "sha256": hashlib.sha256(data).hexdigest() if pinned else None,
+         "size": len(data) if pinned else None}
+        for name, data in FILES.items()
+    ]
+    path.write_text(json.dumps({"version": 1, "base_url": "http://invalid.test/",
+                                "files": files}), encoding="utf-8")
+    return path
+
+
+@pytest.fixture
+def manager(tmp_path: Path, server: FileServer) -> EphemerisManager:
+    """Gerenciador com diretório temporário apontado para o servidor local."""
+    return EphemerisManager(tmp_path / "ephe", write_manifest(tmp_path / "manifest.json"),
+                            base_url=server.base_url, timeout=(2.0, 5.0), retries=2)
+
+
+def test_downloads_missing_files(manager: EphemerisManager) -> None:
+    """Baixa o trio, sem deixar ``.part``, e passa a cobrir o período."""
+    assert len(manager.missing()) == 3
+    assert sorted(manager.download(manager.missing())) == sorted(FILES)
+
+    for name, data in FILES.items():
+        assert (manager.directory / name).read_bytes() == data
+    assert not list(manager.directory.glob("*.part"))
+    assert manager.missing() == []
+    assert manager.coverage() == [(1800, 2399)]
+
+
+def test_resumes_from_partial_file(manager: EphemerisManager, server: FileServer) -> None:
+    """Um ``.part`` existente é continuado com ``Range``, sem baixar de novo o começo."""
+    entry = manager.entries["sepl_18.se1"]
+    manager.directory.mkdir(parents=True)
+    (manager.directory / "sepl_18.se1.part").write_bytes(FILES["sepl_18.se1"][:100_000])
+
+    manager.download([entry])
+
+    assert (manager.directory / "sepl_18.se1").read_bytes() == FILES["sepl_18.se1"]
+    assert server.requests == [("sepl_18.se1", "bytes=100000-")]
+
+
+def test_resumes_after_interrupted_transfer(manager: EphemerisManager,
+                                            server: FileServer) -> None:
+    """Conexão cortada no meio: a nova tentativa pede só o que falta.
+
+    O ``.part`` guarda os blocos de ``STREAM_CHUNK`` recebidos por inteiro.
+    """
+    server.truncate_once.add("sepl_18.se1")
+
+    manager.download([manager.entries["sepl_18.se1"]])
+
+    assert (manager.directory / "sepl_18.se1").read_bytes() == FILES["sepl_18.se1"]
+    (_, first), (_, second) = server.requests
+    assert first is None
+    assert second is not None
+    assert 0 < int(second.split("=")[1].rstrip("-")) <= len(FILES["sepl_18.se1"]) // 2
+
+
+def test_complete_partial_file_is_accepted_on_416(manager: EphemerisManager,
+                                                  server: FileServer) -> None:
+    """``.part`` já completo: o servidor responde 416 e o hash decide."""
+    manager.directory.mkdir(parents=True)
+    (manager.directory / "seas_18.se1.part").write_bytes(FILES["seas_18.se1"])
+
+    manager.download([manager.entries["seas_18.se1"]])
+
+    assert (manager.directory / "seas_18.se1").read_bytes() == FILES["seas_18.se1"]
+
+
+def test_server_without_range_restarts_download(manager: EphemerisManager,
+                                                server: FileServer) -> None:
+    """Sem suporte a ``Range`` (200), o ``.part`` é reescrito do zero."""
+    server.supports_range = False
+    manager.directory.mkdir(parents=True)
+    (manager.directory / "seas_18.se1.part").write_bytes(b"lixo" * 1000)
+
+    manager.download([manager.entries["seas_18.se1"]])
+
+    assert (manager.directory / "seas_18.se1").read_bytes() == FILES["seas_18.se1"]
+
+
+def test_checksum_failure_raises_and_cleans_up(manager: EphemerisManager,
+                                               server: FileServer) -> None:
+    """Conteúdo que não confere é descartado a cada tentativa e vira ``EphemerisError``."""
+    server.corrupt.add("sepl_18.se1")
+
+    with pytest.raises(EphemerisError, match="Checksum inválido"):
+        manager.download([manager.entries["sepl_18.se1"]])
+
+    assert not (manager.directory / "sepl_18.se1").exists()
+    assert not (manager.directory / "sepl_18.se1.part").exists()
+    assert len(server.requests) == manager.retries + 1
+
+
+def test_corrupted_local_file_is_redownloaded(manager: EphemerisManager) -> None:
+    """Arquivo local que não confere com o manifesto conta como ausente."""
+    manager.download(manager.missing())
+    path = manager.directory / "semo_18.se1"
+    path.write_bytes(b"\0" * len(FILES["semo_18.se1"]))
+
+    assert [e.name for e in manager.missing()] == ["semo_18.se1"]
+    assert manager.ensure()
+    assert path.read_bytes() == FILES["semo_18.se1"]
+
+
+def test_ensure_reports_failure(manager: EphemerisManager, server: FileServer) -> None:
+    """``ensure`` devolve ``False`` em vez de propagar a falha do download."""
+    server.corrupt.add("seas_18.se1")
+    assert not manager.ensure()
+
+
+def test_unpinned_entries_are_refused(tmp_path: Path, server: FileServer) -> None:
+    """Sem hash e tamanho fixados, nada é pedido ao servidor."""
+    manager = EphemerisManager(tmp_path / "ephe",
+                               write_manifest(tmp_path / "manifest.json", pinned=False),
+                               base_url=server.base_url)
+
+    with pytest.raises(EphemerisError, match="Sem SHA-256"):
+        manager.download(manager.missing())
+    assert server.requests == []
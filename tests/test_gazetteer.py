@@ -0,0 +1,114 @@
+"""Testes do gazetteer offline e da sua passagem para o geocodificador externo."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, List, NamedTuple, Optional
+
+import pytest
+
+import gazetteer
+import geocoding
+import utils
+from gazetteer import parse_query
+
+if TYPE_CHECKING:
+    from _pytest.capture import CaptureFixture
+    from _pytest.fixtures import FixtureRequest
+    from _pytest.logging import LogCaptureFixture
+    from _pytest.monkeypatch import MonkeyPatch
+    from pytest_mock.plugin import MockerFixture
+
+
+class StubResult(NamedTuple):
+    """Resultado no formato de ``geocoding.GeocodeResult``."""
+
+    latitude: float
+    longitude: float
+    address: str
+
+
+class StubGeocoder:
+    """Geocodificador externo falso que registra as consultas."""
+
+    def __init__(self) -> None:
+        """Começa sem consultas."""
+        self.queries: List[str] = []
+
+    def geocode(self, query: str) -> Optional[StubResult]:
+        """Responde com Buenos Aires, na Argentina, para qualquer consulta."""
+        self.queries.append(query)
+        return StubResult(-34.6037, -58.3816, "Buenos Aires, Argentina")
+
+
+@pytest.fixture
+def external(monkeypatch: MonkeyPatch) -> StubGeocoder:
+    """Substitui o Nominatim compartilhado pelo stub."""
+    stub = StubGeocoder()
+    monkeypatch.setattr(geocoding, "get_geocoder", lambda: stub)
+    return stub
+
+
+@pytest.fixture(autouse=True)
+def index() -> None:
+    """Os testes dependem do índice versionado em ``data/gazetteer.idx``."""
+    if gazetteer.get_index() is None:
+        pytest.skip("data/gazetteer.idx ausente")
+
+
+@pytest.mark.parametrize("query", ["Buenos Aires", "Santiago", "Florida", "Campinas",
+                                   "Santa Maria", "Paris", "Campinass"])
+def test_bare_non_capital_names_are_left_to_geocoder(query: str) -> None:
+    """Sem UF ou "Brasil", homônimos de lugares de outros países não são resolvidos."""
+    assert gazetteer.lookup(query) is None
+
+
+@pytest.mark.parametrize("query, name, uf", [
+    ("Belém", "Belém", "PA"),
+    ("rio de janeiro", "Rio de Janeiro", "RJ"),
+    ("Brasília", "Brasília", "DF"),
+])
+def test_bare_capitals_resolve_offline(query: str, name: str, uf: str) -> None:
+    """Capitais são resolvidas sem qualificador, e vencem homônimos."""
+    place = gazetteer.lookup(query)
+    assert place is not None and (place.name, place.uf) == (name, uf)
+
+
+@pytest.mark.parametrize("query, name, uf", [
+    ("Buenos Aires, PE", "Buenos Aires", "PE"),
+    ("Santiago, Brasil", "Santiago", "RS"),
+    ("Campinas - SP", "Campinas", "SP"),
+    ("Campinass, SP", "Campinas", "SP"),
+    ("Santa Maria, Rio Grande do Sul", "Santa Maria", "RS"),
+])
+def test_qualified_queries_resolve_offline(query: str, name: str, uf: str) -> None:
+    """Com UF ou "Brasil", inclusive com erro de digitação, o gazetteer responde."""
+    place = gazetteer.lookup(query)
+    assert place is not None and (place.name, place.uf) == (name, uf)
+
+
+def test_ambiguous_qualified_name_is_none() -> None:
+    """"Santa Maria, Brasil" tem vários homônimos sem capital: fica para o geocodificador."""
+    assert gazetteer.lookup("Santa Maria, Brasil") is None
+
+
+def test_other_country_is_none() -> None:
+    """Qualificador que não é UF nem o Brasil indica outro país."""
+    assert parse_query("Buenos Aires, Argentina") is None
+    assert gazetteer.lookup("Buenos Aires, Argentina") is None
+
+
+def test_location_falls_through_to_geocoder(external: StubGeocoder) -> None:
+    """"Buenos Aires" sozinho chega ao geocodificador e ganha o fuso argentino."""
+    location = utils.get_location_data("Buenos Aires")
+
+    assert external.queries == ["Buenos Aires"]
+    assert location["latitude"] == pytest.approx(-34.6037)
+    assert location["timezone"] == "America/Argentina/Buenos_Aires"
+
+
+def test_brazilian_location_stays_offline(external: StubGeocoder) -> None:
+    """Município qualificado é resolvido sem consultar o geocodificador."""
+    location = utils.get_location_data("Buenos Aires, PE")
+
+    assert external.queries == []
+    assert location["timezone"] == "America/Recife"
@@ -0,0 +1,308 @@
+"""Testes do cache de geocodificação, do ``SingleFlight`` e do ``TokenBucket``."""
+
+from __future__ import annotations
+
+import threading
+from pathlib import Path
+from typing import TYPE_CHECKING, Callable, Dict, List, NamedTuple, Optional
+
+import pytest
+
+import geocoding
+from geocoding import (NOT_FOUND, CachedGeocoder, GeocodeCache, GeocodeResult, SingleFlight,
+                       TokenBucket, cache_key)
+
+if TYPE_CHECKING:
+    from _pytest.capture import CaptureFixture
+    from _pytest.fixtures import FixtureRequest
+    from _pytest.logging import LogCaptureFixture
+    from _pytest.monkeypatch import MonkeyPatch
+    from pytest_mock.plugin import MockerFixture
+
+
+class StubLocation(NamedTuple):
+    """Resposta no formato do geopy."""
+
+    latitude: float
+    longitude: float
+    address: str
+
+
+class StubGeocoder:
+    """Geocodificador falso: conta chamadas e pode segurá-las até ``release``."""
+
+    def __init__(self, places: Optional[Dict[str, StubLocation]] = None,
+                 block: bool = False) -> None:
+        """Responde com ``places`` (consulta -> local); ``block`` segura as chamadas."""
+        self.places = places or {}
+        self.calls: List[str] = []
+        self.entered = threading.Event()
+        self.release = threading.Event()
+        if not block:
+            self.release.set()
+
+    def geocode(self, query: str) -> Optional[StubLocation]:
+        """Registra a chamada e devolve o local conhecido ou ``None``."""
+        self.calls.append(query)
+        self.entered.set()
+        self.release.wait(5)
+        return self.places.get(query)
+
+
+class FakeClock:
+    """Relógio monotônico controlado pelo teste; ``sleep`` só avança o tempo."""
+
+    def __init__(self) -> None:
+        """Começa no instante 1000."""
+        self.now = 1000.0
+        self.sleeps: List[float] = []
+
+    def monotonic(self) -> float:
+        """Instante atual."""
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        """Avança o relógio sem dormir."""
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+class CountingEvent(threading.Event):
+    """``Event`` que conta quantas threads começaram a esperar."""
+
+    def __init__(self) -> None:
+        """Cria o evento sem esperas registradas."""
+        super().__init__()
+        self.waiters = 0
+
+    def wait(self, timeout: Optional[float] = None) -> bool:
+        """Registra a espera e espera normalmente."""
+        self.waiters += 1
+        return super().wait(timeout)
+
+
+class CountingFlight(geocoding._Flight):
+    """``_Flight`` cujo ``done`` conta os seguidores em espera."""
+
+    def __init__(self) -> None:
+        """Troca o evento de conclusão pelo contador."""
+        super().__init__()
+        self.done = CountingEvent()
+
+
+SAO_PAULO = StubLocation(-23.55, -46.63, "São Paulo, Brasil")
+
+
+@pytest.fixture
+def cache(tmp_path: Path) -> GeocodeCache:
+    """Cache em SQLite num diretório temporário."""
+    return GeocodeCache(tmp_path / "geocoding.sqlite3")
+
+
+@pytest.fixture
+def flights(monkeypatch: MonkeyPatch) -> List[CountingFlight]:
+    """Chamadas criadas pelo ``SingleFlight``, para saber quando os seguidores esperam."""
+    created: List[CountingFlight] = []
+
+    def make() -> CountingFlight:
+        """Cria e registra a chamada."""
+        created.append(CountingFlight())
+        return created[-1]
+
+    monkeypatch.setattr(geocoding, "_Flight", make)
+    return created
+
+
+def wait_for_followers(flights: List[CountingFlight], count: int) -> None:
+    """Espera ``count`` seguidores bloqueados na chamada em andamento."""
+    pause = threading.Event()
+    for _ in range(5000):
+        if flights and flights[0].done.waiters >= count:
+            return
+        pause.wait(0.001)
+    pytest.fail("seguidores não chegaram à chamada em andamento")
+
+
+@pytest.fixture
+def clock(monkeypatch: MonkeyPatch) -> FakeClock:
+    """Substitui ``time.monotonic`` e ``time.sleep`` usados pelo ``TokenBucket``."""
+    fake = FakeClock()
+    monkeypatch.setattr(geocoding.time, "monotonic", fake.monotonic)
+    monkeypatch.setattr(geocoding.time, "sleep", fake.sleep)
+    return fake
+
+
+def test_cache_key_ignores_accents_case_and_commas() -> None:
+    """Grafias equivalentes de um lugar caem na mesma chave."""
+    assert cache_key("São Paulo, Brasil") == cache_key("sao  paulo brasil")
+
+
+def test_cache_hit_skips_upstream(cache: GeocodeCache) -> None:
+    """A segunda consulta (mesmo com outra grafia) vem do cache."""
+    stub = StubGeocoder({"São Paulo, Brasil": SAO_PAULO})
+    geocoder = CachedGeocoder(stub, cache, TokenBucket(rate=1000.0, capacity=10.0))
+
+    first = geocoder.geocode("São Paulo, Brasil")
+    second = geocoder.geocode("sao paulo brasil")
+
+    assert first == second == GeocodeResult(*SAO_PAULO)
+    assert stub.calls == ["São Paulo, Brasil"]
+    stats = geocoder.stats()
+    assert (stats["hits"], stats["misses"], stats["upstream_calls"]) == (1, 1, 1)
+    assert stats["hit_ratio"] == 0.5
+
+
+def test_cache_persists_on_disk(tmp_path: Path) -> None:
+    """Entradas sobrevivem a reabrir o banco."""
+    path = tmp_path / "geocoding.sqlite3"
+    GeocodeCache(path).put("campinas", GeocodeResult(-22.9, -47.06, "Campinas"))
+    assert GeocodeCache(path).get("campinas") == GeocodeResult(-22.9, -47.06, "Campinas")
+
+
+def test_not_found_is_cached(cache: GeocodeCache) -> None:
+    """Lugar inexistente é gravado como ``NOT_FOUND`` e não volta ao upstream."""
+    stub = StubGeocoder()
+    geocoder = CachedGeocoder(stub, cache, TokenBucket(rate=1000.0, capacity=10.0))
+
+    assert geocoder.geocode("Lugar Nenhum") is None
+    assert geocoder.geocode("lugar nenhum") is None
+    assert cache.get(cache_key("Lugar Nenhum")) is NOT_FOUND
+    assert len(stub.calls) == 1
+
+
+def test_cache_expires_after_ttl(tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
+    """Entradas mais velhas que o TTL são descartadas; negativas usam o TTL próprio."""
+    now = [1_000_000.0]
+    monkeypatch.setattr(geocoding.time, "time", lambda: now[0])
+    cache = GeocodeCache(tmp_path / "geocoding.sqlite3", ttl=100.0, negative_ttl=10.0)
+    cache.put("campinas", GeocodeResult(-22.9, -47.06, "Campinas"))
+    cache.put("nenhum", None)
+
+    now[0] += 50.0
+    assert cache.get("campinas") is not None
+    assert cache.get("nenhum") is None
+    now[0] += 51.0
+    assert cache.get("campinas") is None
+    assert len(cache) == 0
+
+
+def test_cache_evicts_least_recently_used(tmp_path: Path, monkeypatch: MonkeyPatch) -> None:
+    """Acima de ``max_entries``, sai a entrada acessada há mais tempo."""
+    now = [1_000_000.0]
+
+    def tick() -> float:
+        """Relógio que avança um segundo por leitura."""
+        now[0] += 1.0
+        return now[0]
+
+    monkeypatch.setattr(geocoding.time, "time", tick)
+    cache = GeocodeCache(tmp_path / "geocoding.sqlite3", max_entries=2)
+    cache.put("a", GeocodeResult(1.0, 1.0, "a"))
+    cache.put("b", GeocodeResult(2.0, 2.0, "b"))
+    assert cache.get("a") is not None
+    cache.put("c", GeocodeResult(3.0, 3.0, "c"))
+
+    assert cache.get("b") is None
+    assert cache.get("a") is not None
+    assert cache.get("c") is not None
+
+
+def test_single_flight_coalesces_concurrent_calls(cache: GeocodeCache,
+                                                  flights: List[CountingFlight]) -> None:
+    """Consultas simultâneas iguais fazem uma única chamada externa."""
+    stub = StubGeocoder({"Campinas, SP": SAO_PAULO}, block=True)
+    geocoder = CachedGeocoder(stub, cache, TokenBucket(rate=1000.0, capacity=10.0))
+    results: List[Optional[GeocodeResult]] = []
+
+    def worker() -> None:
+        """Consulta e guarda o resultado."""
+        results.append(geocoder.geocode("Campinas, SP"))
+
+    threads = [threading.Thread(target=worker) for _ in range(8)]
+    threads[0].start()
+    assert stub.entered.wait(5)
+    for thread in threads[1:]:
+        thread.start()
+    # Os seguidores ficam esperando o líder, que ainda está no upstream
+    wait_for_followers(flights, len(threads) - 1)
+    stub.release.set()
+    for thread in threads:
+        thread.join(5)
+
+    assert stub.calls == ["Campinas, SP"]
+    assert results == [GeocodeResult(*SAO_PAULO)] * len(threads)
+    assert geocoder.stats()["coalesced"] == len(threads) - 1
+
+
+def test_single_flight_shares_errors(flights: List[CountingFlight]) -> None:
+    """A exceção do líder chega aos seguidores, e a chave é liberada depois."""
+    single_flight = SingleFlight()
+    release = threading.Event()
+    errors: List[BaseException] = []
+
+    def failing() -> None:
+        """Falha quando o teste liberar."""
+        release.wait(5)
+        raise ConnectionError("upstream fora do ar")
+
+    def call(fn: Callable[[], None]) -> None:
+        """Executa pela chave compartilhada e guarda a exceção."""
+        try:
+            single_flight.do("k", fn)
+        except ConnectionError as e:
+            errors.append(e)
+
+    leader = threading.Thread(target=call, args=(failing,))
+    leader.start()
+    wait_for_followers(flights, 0)
+    follower = threading.Thread(target=call, args=(lambda: None,))
+    follower.start()
+    wait_for_followers(flights, 1)
+    release.set()
+    leader.join(5)
+    follower.join(5)
+
+    assert len(errors) == 2 and errors[0] is errors[1]
+    assert single_flight.do("k", lambda: 42) == (42, False)
+
+
+def test_token_bucket_allows_burst_then_limits(clock: FakeClock) -> None:
+    """A capacidade inicial sai de uma vez; depois, uma ficha por ``1/rate``."""
+    bucket = TokenBucket(rate=1.0, capacity=2.0)
+    assert bucket.try_acquire()
+    assert bucket.try_acquire()
+    assert not bucket.try_acquire()
+
+    clock.now += 0.5
+    assert not bucket.try_acquire()
+    clock.now += 0.5
+    assert bucket.try_acquire()
+
+
+def test_token_bucket_acquire_waits_for_refill(clock: FakeClock) -> None:
+    """``acquire`` dorme só o necessário para a próxima ficha."""
+    bucket = TokenBucket(rate=2.0, capacity=1.0)
+    assert bucket.acquire()
+    assert bucket.acquire()
+    assert clock.sleeps == [pytest.approx(0.5)]
+
+
+def test_token_bucket_acquire_times_out(clock: FakeClock) -> None:
+    """Sem ficha dentro do ``timeout``, ``acquire`` desiste."""
+    bucket = TokenBucket(rate=0.1, capacity=1.0)
+    assert bucket.acquire()
+    assert not bucket.acquire(timeout=2.0)
+    assert sum(clock.sleeps) == pytest.approx(2.0)
+
+
+def test_geocoder_times_out_when_rate_limited(cache: GeocodeCache, clock: FakeClock) -> None:
+    """Com o limite esgotado, a consulta falha sem chamar o upstream."""
+    stub = StubGeocoder({"Campinas, SP": SAO_PAULO})
+    limiter = TokenBucket(rate=0.01, capacity=1.0)
+    assert limiter.try_acquire()
+    geocoder = CachedGeocoder(stub, cache, limiter, limiter_timeout=1.0)
+
+    with pytest.raises(TimeoutError):
+        geocoder.geocode("Campinas, SP")
+    assert stub.calls == []
+    assert geocoder.stats()["errors"] == 1
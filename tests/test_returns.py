@@ -0,0 +1,84 @@
+"""Testes das revoluções solares e lunares."""
+
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Iterator
+
+import numpy as np
+import pytest
+import swisseph as swe
+
+from ephemeris import EPHE_DIR, init_worker
+from returns import (TROPICAL_MONTH, TROPICAL_YEAR, natal_longitude, next_return,
+                     return_calendar, solar_return)
+
+if TYPE_CHECKING:
+    from _pytest.capture import CaptureFixture
+    from _pytest.fixtures import FixtureRequest
+    from _pytest.logging import LogCaptureFixture
+    from _pytest.monkeypatch import MonkeyPatch
+    from pytest_mock.plugin import MockerFixture
+
+# Nascimentos colados à virada do ano, onde o retorno troca de ano civil
+TURN_OF_YEAR_BIRTHS = [
+    swe.julday(1990, 1, 1, 0.1),
+    swe.julday(1990, 12, 31, 23.9),
+]
+
+
+@pytest.fixture(scope="module", autouse=True)
+def ephemeris() -> Iterator[None]:
+    """Usa os arquivos ``.se1`` do projeto."""
+    init_worker(str(EPHE_DIR))
+    yield
+
+
+def _longitude_error(jd: float, target: float) -> float:
+    """Distância angular (graus) entre o Sol em ``jd`` e ``target``."""
+    return abs((swe.calc_ut(jd, swe.SUN)[0][0] - target + 180.0) % 360.0 - 180.0)
+
+
+@pytest.mark.parametrize("natal_jd", TURN_OF_YEAR_BIRTHS)
+def test_solar_returns_are_continuous_across_years(natal_jd: float) -> None:
+    """Um retorno por aniversário, sem saltos nem repetições, mesmo em 31/12 ou 1º/1."""
+    birth_year = swe.revjul(natal_jd)[0]
+    years = range(birth_year, birth_year + 40)
+    returns = np.array([solar_return(natal_jd, year) for year in years])
+
+    assert returns[0] == pytest.approx(natal_jd, abs=1e-4)
+    gaps = np.diff(returns)
+    assert np.all(np.abs(gaps - TROPICAL_YEAR) < 0.1)
+    target = natal_longitude(natal_jd, "Sun")
+    assert max(_longitude_error(jd, target) for jd in returns) < 1e-6
+
+
+def test_solar_return_may_fall_in_previous_civil_year() -> None:
+    """Nascido em 1º/1 0h06 UT: a revolução de 1993 cai em 31/12/1992."""
+    natal_jd = TURN_OF_YEAR_BIRTHS[0]
+    assert swe.revjul(solar_return(natal_jd, 1993))[:3] == (1992, 12, 31)
+    assert swe.revjul(solar_return(natal_jd, 1994))[:3] == (1993, 12, 31)
+
+
+def test_next_return_is_first_after_date() -> None:
+    """``next_return`` nunca volta no tempo e não pula um retorno."""
+    natal_jd = swe.julday(1985, 7, 20, 15.0)
+    after = swe.julday(2024, 3, 1, 0.0)
+    jd = next_return(natal_jd, after, "Moon")
+    assert after <= jd < after + TROPICAL_MONTH + 1
+
+
+def test_lunar_calendar_matches_next_return() -> None:
+    """O calendário vetorizado reproduz ``next_return`` encadeado."""
+    natal_jd = swe.julday(1985, 7, 20, 15.0)
+    start, end = swe.julday(2024, 1, 1, 0.0), swe.julday(2025, 1, 1, 0.0)
+    calendar = return_calendar(natal_jd, start, end, "Moon")
+
+    chained, jd = [], start
+    while True:
+        jd = next_return(natal_jd, jd, "Moon")
+        if jd >= end:
+            break
+        chained.append(jd)
+        jd += 1.0
+    np.testing.assert_allclose(calendar.jds, chained, atol=1e-5)
+    assert calendar.active_at(chained[3] + 1.0) == pytest.approx(chained[3])
@@ -0,0 +1,78 @@
+"""Resolução de fusos horários compartilhada pelo processo.
+
+Os polígonos do ``timezonefinder`` são carregados uma única vez (na primeira
+consulta) e os resultados ficam em cache por coordenada quantizada.
+"""
+
+import threading
+from functools import lru_cache
+from typing import TYPE_CHECKING, List, Optional, Sequence
+
+import numpy as np
+
+from instrumentation import register_cache
+
+if TYPE_CHECKING:
+    from timezonefinder import TimezoneFinder
+
+# 1e-3 grau ≈ 110 m: bem abaixo da precisão das fronteiras de fuso
+QUANTUM = 1e-3
+CACHE_SIZE = 65536
+
+_finder = None
+_finder_lock = threading.Lock()
+
+
+def get_finder() -> "TimezoneFinder":
+    """Retorna a instância única de ``TimezoneFinder`` do processo."""
+    global _finder
+    if _finder is None:
+        with _finder_lock:
+            if _finder is None:
+                from timezonefinder import TimezoneFinder
+                _finder = TimezoneFinder(in_memory=True)
+    return _finder
+
+
+def _quantize(value: float) -> int:
+    """Converte uma coordenada em graus para a grade de cache."""
+    return int(round(value / QUANTUM))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _timezone_at_cell(qlat: int, qlon: int) -> Optional[str]:
+    """Consulta o fuso de uma célula da grade quantizada."""
+    return get_finder().timezone_at(lat=qlat * QUANTUM, lng=qlon * QUANTUM)
+
+
+def timezone_at(lat: float, lon: float) -> Optional[str]:
+    """Retorna o nome IANA do fuso em (lat, lon), ou ``None`` se não houver."""
+    return _timezone_at_cell(_quantize(lat), _quantize(lon))
+
+
+def timezones_at(lats: Sequence[float], lons: Sequence[float]) -> List[Optional[str]]:
+    """Versão em lote de ``timezone_at`` para arrays de coordenadas.
+
+    Cada célula distinta da grade é resolvida uma única vez, de modo que
+    lotes com muitas coordenadas repetidas ou próximas custam pouco. As
+    consultas em lote não passam pelo LRU para não despejar as entradas
+    usadas pelos mapas individuais.
+    """
+    qlats = np.rint(np.asarray(lats, dtype=np.float64) / QUANTUM).astype(np.int64)
+    qlons = np.rint(np.asarray(lons, dtype=np.float64) / QUANTUM).astype(np.int64)
+    if qlats.shape != qlons.shape:
+        raise ValueError("lats e lons devem ter o mesmo formato")
+
+    cells, inverse = np.unique(np.stack([qlats.ravel(), qlons.ravel()], axis=1),
+                               axis=0, return_inverse=True)
+    finder = get_finder()
+    resolved = [finder.timezone_at(lat=qlat * QUANTUM, lng=qlon * QUANTUM) for qlat, qlon in cells]
+    return [resolved[i] for i in inverse.ravel()]
+
+
+def cache_info() -> tuple:
+    """Estatísticas do cache (``functools`` ``CacheInfo``)."""
+    return _timezone_at_cell.cache_info()
+
+
+register_cache("timezones", lambda: cache_info()._asdict())
@@ -0,0 +1,283 @@
+"""Motor de eventos de trânsito: ingressos, estações, aspectos e cúspides.
+
+Em vez de amostrar densamente, cada corpo é avaliado numa grade grossa
+(passo proporcional à sua velocidade máxima). As estações são localizadas
+pelas trocas de sinal da velocidade e refinadas por Brent; entre estações a
+longitude é monótona, então cada cruzamento de um ângulo-alvo fica isolado
+num intervalo da grade e é refinado por Newton usando a velocidade do
+``swe.calc_ut`` (com bisseção como salvaguarda), até precisão de
+subsegundo.
+"""
+
+import math
+from typing import Dict, Iterator, List, Mapping, NamedTuple, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import swisseph as swe
+
+from aspects import ASPECT_ANGLES
+from ephemeris import BODY_NAMES, CALC_FLAGS, PLANETS, SIGNS, planet_positions_batch
+
+# Passo da grade em dias: menos da metade da menor retrogradação do corpo
+# (para não perder um par de estações) e menos de 180° de movimento
+STEP_DAYS = {
+    "Sun": 15.0, "Moon": 5.0, "Mercury": 7.0, "Venus": 10.0, "Mars": 15.0,
+    "Jupiter": 30.0, "Saturn": 30.0, "Uranus": 30.0, "Neptune": 30.0, "Pluto": 30.0
+}
+# Corpos que nunca ficam retrógrados em coordenadas geocêntricas
+NO_STATIONS = frozenset({"Sun", "Moon"})
+
+EVENT_KINDS = ("ingress", "station", "aspect", "cusp")
+
+# 0,1 s expresso em dias
+TIME_TOLERANCE = 0.1 / 86400
+MAX_ITERATIONS = 60
+WINDOW_DAYS = 366.0
+
+
+class TransitEvent(NamedTuple):
+    """Evento de trânsito no instante ``jd`` (UT)."""
+
+    jd: float
+    kind: str
+    body: str
+    longitude: float
+    target: str
+    aspect: Optional[str] = None
+    retrograde: bool = False
+
+
+def _wrap180(angle: float) -> float:
+    """Reduz um ângulo para o intervalo [-180, 180)."""
+    return (angle + 180.0) % 360.0 - 180.0
+
+
+def _brent(f, a: float, b: float, fa: float, fb: float, xtol: float = TIME_TOLERANCE) -> float:
+    """Raiz de ``f`` em [a, b] pelo método de Brent (``fa`` e ``fb`` com sinais opostos)."""
+    if fa == 0:
+        return a
+    if fb == 0:
+        return b
+    c, fc = a, fa
+    d = e = b - a
+    for _ in range(MAX_ITERATIONS):
+        if (fb > 0) == (fc > 0):
+            c, fc = a, fa
+            d = e = b - a
+        if abs(fc) < abs(fb):
+            a, b, c = b, c, b
+            fa, fb, fc = fb, fc, fb
+        tol = 2 * 1e-15 * abs(b) + 0.5 * xtol
+        m = 0.5 * (c - b)
+        if abs(m) <= tol or fb == 0:
+            return b
+        if abs(e) >= tol and abs(fa) > abs(fb):
+            s = fb / fa
+            if a == c:
+                p, q = 2 * m * s, 1 - s
+            else:
+                q, r = fa / fc, fb / fc
+                p = s * (2 * m * q * (q - r) - (b - a) * (r - 1))
+                q = (q - 1) * (r - 1) * (s - 1)
+            if p > 0:
+                q = -q
+            else:
+                p = -p
+            if 2 * p < min(3 * m * q - abs(tol * q), abs(e * q)):
+                e, d = d, p / q
+            else:
+                d = e = m
+        else:
+            d = e = m
+        a, fa = b, fb
+        b += d if abs(d) > tol else math.copysign(tol, m)
+        fb = f(b)
+    return b
+
+
+def _hermite_guess(a: float, b: float, fa: float, fb: float, va: float, vb: float) -> float:
+    """Estimativa inicial da raiz pela interpolação cúbica de Hermite.
+
+    Usa os valores e as velocidades já conhecidos nos extremos, o que costuma
+    deixar o Newton a uma ou duas avaliações do ``swe.calc_ut`` da raiz.
+    """
+    h = b - a
+    da, db = va * h, vb * h
+    s = fa / (fa - fb)
+    for _ in range(4):
+        s2, s3 = s * s, s * s * s
+        value = ((2 * s3 - 3 * s2 + 1) * fa + (s3 - 2 * s2 + s) * da
+                 + (-2 * s3 + 3 * s2) * fb + (s3 - s2) * db)
+        slope = ((6 * s2 - 6 * s) * fa + (3 * s2 - 4 * s + 1) * da
+                 + (-6 * s2 + 6 * s) * fb + (3 * s2 - 2 * s) * db)
+        if slope == 0:
+            break
+        s_next = s - value / slope
+        if not 0.0 < s_next < 1.0:
+            break
+        s = s_next
+    return a + s * h
+
+
+def _refine_crossing(body_id: int, target: float, a: float, b: float,
+                     fa: float, fb: float, va: float, vb: float) -> Tuple[float, float, float]:
+    """Instante em que a longitude do corpo cruza ``target`` dentro de [a, b].
+
+    ``va`` e ``vb`` são as velocidades nos extremos. Retorna
+    ``(jd, longitude, velocidade)``.
+    """
+    t = _hermite_guess(a, b, fa, fb, va, vb)
+    lon = speed = 0.0
+    for _ in range(MAX_ITERATIONS):
+        values = swe.calc_ut(t, body_id, CALC_FLAGS)[0]
+        lon, speed = values[0], values[3]
+        f = _wrap180(lon - target)
+        if f == 0:
+            break
+        if (f < 0) == (fa < 0):
+            a, fa = t, f
+        else:
+            b, fb = t, f
+        if speed:
+            t_next = t - f / speed
+            if abs(t_next - t) < TIME_TOLERANCE:
+                t = t_next
+                break
+        if not speed or not a < t_next < b:
+            # Perto de estações a velocidade é quase nula: bisseção
+            t_next = 0.5 * (a + b)
+            if b - a < TIME_TOLERANCE:
+                t = t_next
+                break
+        t = t_next
+    return t, lon, speed
+
+
+def _natal_longitudes(natal: Optional[Mapping[str, Union[float, Mapping[str, float]]]]) -> Dict[str, float]:
+    """Aceita ``{nome: longitude}`` ou a saída de ``get_planet_positions``."""
+    if not natal:
+        return {}
+    return {
+        name: float(value['longitude'] if isinstance(value, Mapping) else value)
+        for name, value in natal.items()
+    }
+
+
+def _build_targets(kinds: Sequence[str], natal: Dict[str, float],
+                   cusps: Optional[Sequence[float]],
+                   aspects: Mapping[str, float]) -> List[Tuple[float, str, str, Optional[str]]]:
+    """Lista de ângulos-alvo: ``(longitude, kind, target, aspect)``."""
+    targets = []
+    if "ingress" in kinds:
+        targets.extend((30.0 * i, "ingress", sign, None) for i, sign in enumerate(SIGNS))
+    if "aspect" in kinds:
+        for name, lon in natal.items():
+            for aspect, angle in aspects.items():
+                for offset in {angle % 360.0, -angle % 360.0}:
+                    targets.append(((lon + offset) % 360.0, "aspect", name, aspect))
+    if "cusp" in kinds and cusps is not None:
+        targets.extend((float(lon) % 360.0, "cusp", f"Casa {i}", None)
+                       for i, lon in enumerate(cusps, 1))
+    return targets
+
+
+def _body_events(name: str, start_jd: float, end_jd: float, kinds: Sequence[str],
+                 targets: List[Tuple[float, str, str, Optional[str]]]) -> List[TransitEvent]:
+    """Todos os eventos de um corpo em [start_jd, end_jd)."""
+    body_id = PLANETS[name]
+    step = STEP_DAYS.get(name, 1.0)
+    n_steps = max(1, int(math.ceil((end_jd - start_jd) / step)))
+    grid = np.linspace(start_jd, end_jd, n_steps + 1)
+    sampled = planet_positions_batch(grid, bodies=[name], workers=1)[:, 0]
+    times = grid.tolist()
+    lons = sampled[:, 0].tolist()
+    speeds = sampled[:, 3].tolist()
+
+    events: List[TransitEvent] = []
+
+    # Estações: trocas de sinal da velocidade, inseridas como nós da grade
+    if name not in NO_STATIONS:
+        def speed_at(t: float) -> float:
+            return swe.calc_ut(t, body_id, CALC_FLAGS)[0][3]
+
+        node_t, node_lon, node_speed = [times[0]], [lons[0]], [speeds[0]]
+        for i in range(1, len(times)):
+            s0, s1 = speeds[i - 1], speeds[i]
+            if (s0 < 0) != (s1 < 0):
+                t = _brent(speed_at, times[i - 1], times[i], s0, s1)
+                lon = swe.calc_ut(t, body_id, CALC_FLAGS)[0][0]
+                if start_jd <= t < end_jd and "station" in kinds:
+                    events.append(TransitEvent(t, "station", name, lon,
+                                               "retrograde" if s0 > 0 else "direct",
+                                               retrograde=s0 > 0))
+                node_t.append(t)
+                node_lon.append(lon)
+                node_speed.append(0.0)
+            node_t.append(times[i])
+            node_lon.append(lons[i])
+            node_speed.append(s1)
+        times, lons, speeds = node_t, node_lon, node_speed
+
+    if not targets:
+        return events
+
+    # Entre nós consecutivos a longitude é monótona: cada alvo cruza no máximo uma vez
+    unwrapped = np.degrees(np.unwrap(np.radians(lons)))
+    target_lons = np.array([t[0] for t in targets])
+    turns = np.floor((unwrapped[:, None] - target_lons[None, :]) / 360.0)
+    intervals, target_idx = np.nonzero(turns[1:] != turns[:-1])
+
+    for i, j in zip(intervals.tolist(), target_idx.tolist()):
+        target_lon, kind, target, aspect = targets[j]
+        a, b = times[i], times[i + 1]
+        fa = _wrap180(lons[i] - target_lon)
+        fb = _wrap180(lons[i + 1] - target_lon)
+        if fa == fb:
+            continue
+        t, lon, speed = _refine_crossing(body_id, target_lon, a, b, fa, fb,
+                                         speeds[i], speeds[i + 1])
+        if kind == "ingress" and speed < 0:
+            # Retrógrado: cruzar o início de um signo é voltar para o anterior
+            target = SIGNS[(SIGNS.index(target) - 1) % 12]
+        if start_jd <= t < end_jd:
+            events.append(TransitEvent(t, kind, name, lon, target, aspect, speed < 0))
+    return events
+
+
+def transit_events(start_jd: float, end_jd: float,
+                   natal: Optional[Mapping[str, Union[float, Mapping[str, float]]]] = None,
+                   cusps: Optional[Sequence[float]] = None,
+                   bodies: Optional[Sequence[str]] = None,
+                   kinds: Sequence[str] = EVENT_KINDS,
+                   aspects: Mapping[str, float] = ASPECT_ANGLES,
+                   window_days: float = WINDOW_DAYS) -> Iterator[TransitEvent]:
+    """Gera, em ordem cronológica, os eventos de trânsito em [start_jd, end_jd).
+
+    Args:
+        start_jd: Início do período (dia juliano UT).
+        end_jd: Fim do período (exclusivo).
+        natal: Pontos natais para aspectos, como ``{nome: longitude}`` ou a
+            saída de ``get_planet_positions``.
+        cusps: Cúspides natais (ex.: ``calculate_houses(...)['cusps']``).
+        bodies: Corpos em trânsito; por padrão, todos de ``PLANETS``.
+        kinds: Subconjunto de ``EVENT_KINDS`` a gerar.
+        aspects: Aspectos considerados, ``{nome: ângulo}``.
+        window_days: O período é processado em janelas deste tamanho, o que
+            mantém a memória limitada e permite consumir os primeiros eventos
+            sem esperar o período inteiro.
+    """
+    unknown = set(kinds) - set(EVENT_KINDS)
+    if unknown:
+        raise ValueError(f"Tipos de evento desconhecidos: {sorted(unknown)}")
+    names = BODY_NAMES if bodies is None else tuple(bodies)
+    targets = _build_targets(kinds, _natal_longitudes(natal), cusps, aspects)
+
+    window_start = start_jd
+    while window_start < end_jd:
+        window_end = min(window_start + window_days, end_jd)
+        events: List[TransitEvent] = []
+        for name in names:
+            events.extend(_body_events(name, window_start, window_end, kinds, targets))
+        events.sort()
+        yield from events
+        window_start = window_end
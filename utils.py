@@ -1,43 +1,45 @@
 import swisseph as swe
 from datetime import datetime
 import pytz
-from geopy.geocoders import Nominatim
-from timezonefinder import TimezoneFinder
-import requests
-from pathlib import Path
+import ephe_manager
+import gazetteer
+import geocoding
+from timezones import timezone_at
+from ephemeris import BODY_NAMES, planet_positions_batch
+from instrumentation import timed, timer
 
+@timed("utils.download_ephe_files")
 def download_ephe_files():
-    """Download and configure ephemeris files."""
-    ephe_dir = Path("ephe")
-    ephe_dir.mkdir(exist_ok=True)
-    
-    base_url = "https://raw.githubusercontent.com/aloistr/swisseph/master/ephe/"
-    essential_files = ["seas_18.se1", "semo_18.se1", "sepl_18.se1"]
-    
-    for filename in essential_files:
-        file_path = ephe_dir / filename
-        if not file_path.exists():
-            try:
-                response = requests.get(f"{base_url}{filename}")
-                response.raise_for_status()
-                with open(file_path, "wb") as f:
-                    f.write(response.content)
-            except Exception:
-                return False
-    
-    swe.set_ephe_path(str(ephe_dir))
-    return True
+    """Garante e configura os arquivos de efemérides (uma vez por processo)."""
+    return ephe_manager.ensure_ephemeris()
 
+@timed("utils.get_location_data")
 def get_location_data(location_string):
-    """Obtém coordenadas e fuso horário para uma localização."""
-    geolocator = Nominatim(user_agent="mystical_chart", timeout=10)  # Aumentado o timeout para 10 segundos
+    """Obtém coordenadas e fuso horário para uma localização.
+
+    Capitais e municípios com UF ou "Brasil" na consulta são resolvidos pelo
+    gazetteer offline; o resto (inclusive nomes soltos como "Buenos Aires",
+    que também é município brasileiro) vai para o Nominatim.
+    """
+    with timer("geocoding.gazetteer"):
+        place = gazetteer.lookup(location_string)
+    if place is not None:
+        return {
+            'latitude': place.latitude,
+            'longitude': place.longitude,
+            'timezone': place.timezone
+        }
+
+    # Nominatim com timeout de 10 segundos, cache em disco e limite de 1 req/s
+    geolocator = geocoding.get_geocoder()
     try:
-        location = geolocator.geocode(location_string)
+        with timer("geocoding.nominatim"):
+            location = geolocator.geocode(location_string)
         if not location:
             raise ValueError("Localização não encontrada")
 
-        tf = TimezoneFinder()
-        timezone_str = tf.timezone_at(lat=location.latitude, lng=location.longitude)
+        with timer("timezone.lookup"):
+            timezone_str = timezone_at(location.latitude, location.longitude)
 
         if not timezone_str:
             raise ValueError("Fuso horário não encontrado para esta localização")
@@ -50,6 +52,7 @@ def get_location_data(location_string):
     except Exception as e:
         raise ValueError(f"Erro ao buscar localização: {str(e)}")
 
+@timed("utils.calculate_julian_day")
 def calculate_julian_day(date, time, timezone_str):
     """Calculate Julian Day from date and time."""
     tz = pytz.timezone(timezone_str)
@@ -65,35 +68,29 @@ def calculate_julian_day(date, time, timezone_str):
     
     return jd
 
+@timed("utils.get_planet_positions")
 def get_planet_positions(jd):
-    """Calculate positions for all planets."""
-    planets = {
-        "Sun": swe.SUN,
-        "Moon": swe.MOON,
-        "Mercury": swe.MERCURY,
-        "Venus": swe.VENUS,
-        "Mars": swe.MARS,
-        "Jupiter": swe.JUPITER,
-        "Saturn": swe.SATURN,
-        "Uranus": swe.URANUS,
-        "Neptune": swe.NEPTUNE,
-        "Pluto": swe.PLUTO
-    }
-    
+    """Calculate positions for all planets.
+
+    Thin wrapper over ``ephemeris.planet_positions_batch`` for a single instant.
+    """
+    with timer("swe.calc_ut"):
+        result = planet_positions_batch([jd], workers=1)[0].tolist()
     positions = {}
-    for name, planet_id in planets.items():
-        result = swe.calc_ut(jd, planet_id)
+    for name, values in zip(BODY_NAMES, result):
         positions[name] = {
-            'longitude': result[0][0],
-            'latitude': result[0][1],
-            'distance': result[0][2]
+            'longitude': values[0],
+            'latitude': values[1],
+            'distance': values[2]
         }
     
     return positions
 
-def calculate_houses(jd, lat, lon):
-    """Calculate house cusps using Placidus system."""
-    houses, angles = swe.houses(jd, lat, lon, b'P')
+@timed("utils.calculate_houses")
+def calculate_houses(jd, lat, lon, house_system=b'P'):
+    """Calculate house cusps (Placidus by default)."""
+    with timer("swe.houses"):
+        houses, angles = swe.houses(jd, lat, lon, house_system)
     return {
         'cusps': houses,
         'ascendant': angles[0],